@@ -0,0 +1,104 @@
+from collections import OrderedDict
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The entry removed from a full cache: the least recently used one or the oldest one.
+EVICTION_POLICIES = ['lru', 'fifo']
+
+
+class BoundedCache(object):
+	"""
+	A dictionary with a maximum number of entries. When the cache is full, adding an entry removes another one
+	according to the eviction policy. The hits, the misses and the evictions are counted.
+	"""
+
+	def __init__(self, max_size, eviction="lru"):
+		"""
+		@type max_size: int
+		@param max_size: The maximum number of entries.
+
+		@type eviction: str
+		@param eviction: 'lru' for removing the least recently used entry or 'fifo' for removing the oldest entry.
+		With 'fifo', the hits don't change the order of the entries, so they are a bit faster.
+		"""
+		if eviction not in EVICTION_POLICIES:
+			raise ValueError("The eviction policy should be one of: " + ", ".join(EVICTION_POLICIES))
+
+		self.max_size = max(max_size, 1)
+		self.eviction = eviction
+		self.entries = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def get(self, key, default=None):
+		"""
+		Returns the value of the key, or the default value if the key is not in the cache.
+		"""
+		try:
+			value = self.entries[key]
+		except KeyError:
+			self.misses += 1
+			return default
+
+		self.hits += 1
+		if self.eviction == 'lru':
+			del self.entries[key]
+			self.entries[key] = value
+		return value
+
+	def put(self, key, value):
+		if key in self.entries:
+			del self.entries[key]
+		elif len(self.entries) >= self.max_size:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+		self.entries[key] = value
+
+	def counters(self):
+		"""
+		@rtype: tuple
+		@return: returns the number of the hits, the misses and the evictions until now.
+		"""
+		return self.hits, self.misses, self.evictions
+
+
+def format_cache_report(hits, misses, evictions):
+	lookups = max(hits + misses, 1)
+	return "hits: %d, misses: %d (%.1f%% hit rate), evictions: %d" % (hits, misses, 100.0 * hits / lookups, evictions)
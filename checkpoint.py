@@ -0,0 +1,93 @@
+import os
+import cPickle
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The checkpoints of other versions are not resumed.
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(file_name, state):
+	"""
+	Writes the state of a run in the checkpoint file. The state is written in a temporary file which replaces the
+	checkpoint file at the end, so the checkpoint file is never partial.
+
+	@type state: dict
+	@param state: The state made by TMManager.make_checkpoint().
+	"""
+	state = dict(state)
+	state["version"] = CHECKPOINT_VERSION
+
+	tmp_file_name = file_name + ".tmp"
+	f = open(tmp_file_name, "wb")
+	cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+	f.flush()
+	os.fsync(f.fileno())
+	f.close()
+	os.rename(tmp_file_name, file_name)
+
+
+def load_checkpoint(file_name):
+	"""
+	Reads the state of a run from the checkpoint file.
+
+	@rtype: dict
+	@return: returns the state, or None if there is no checkpoint of this version.
+	"""
+	if not os.path.isfile(file_name):
+		return None
+
+	f = open(file_name, "rb")
+	state = cPickle.load(f)
+	f.close()
+
+	if state.get("version") != CHECKPOINT_VERSION:
+		return None
+	return state
+
+
+def remove_checkpoint(file_name):
+	if os.path.isfile(file_name):
+		os.remove(file_name)
+
+
+def reopen_file(file_name, size):
+	"""
+	Opens an output file of a resumed run for appending. What is written after the checkpoint is removed.
+
+	@type size: int
+	@param size: The size of the file at the checkpoint.
+	"""
+	f = open(file_name, "r+b")
+	f.truncate(size)
+	f.seek(size)
+	return f
@@ -0,0 +1,224 @@
+import io
+import os
+import bz2
+import zlib
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The compressed formats with the magic bytes at the start of their files and the extensions of their file names.
+CODECS = [
+	("gz", "\x1f\x8b", [".gz", ".gzip"]),
+	("bz2", "BZh", [".bz2"]),
+	("xz", "\xfd7zXZ\x00", [".xz"]),
+]
+
+# The extensions of the compressed output files.
+OUTPUT_EXTENSIONS = {"gz": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+# The number of compressed bytes read at once and the size of the buffer of the decompressed lines.
+READ_SIZE = 1 << 20
+BUFFER_SIZE = 1 << 20
+
+
+def import_lzma():
+	"""
+	Imports the lzma module for the xz files. In Python 2 it is in the 'backports.lzma' package.
+	"""
+	try:
+		import lzma
+	except ImportError:
+		try:
+			from backports import lzma
+		except ImportError:
+			raise ImportError("The xz files need the 'backports.lzma' package.")
+	return lzma
+
+
+def detect_codec(file_name):
+	"""
+	Finds the compression of a file by its first bytes. The extension of the name is used for the empty files.
+
+	@rtype: str
+	@return: returns 'gz', 'bz2' or 'xz', or None if the file is not compressed.
+	"""
+	f = open(file_name, 'rb')
+	head = f.read(8)
+	f.close()
+
+	for codec, magic, extensions in CODECS:
+		if head.startswith(magic):
+			return codec
+
+	if len(head) == 0:
+		for codec, magic, extensions in CODECS:
+			if os.path.splitext(file_name)[1].lower() in extensions:
+				return codec
+	return None
+
+
+def strip_extension(file_name):
+	"""
+	Removes the extension of the compressed formats from a file name (e.g. 'tm.tmx.gz' -> 'tm.tmx').
+	"""
+	name, extension = os.path.splitext(file_name)
+	for codec, magic, extensions in CODECS:
+		if extension.lower() in extensions:
+			return name
+	return file_name
+
+
+def make_decompressor(codec):
+	if codec == "gz":
+		# The gzip header and trailer are read by zlib.
+		return zlib.decompressobj(16 + zlib.MAX_WBITS)
+	if codec == "bz2":
+		return bz2.BZ2Decompressor()
+	return import_lzma().LZMADecompressor()
+
+
+def compress_block(codec, block):
+	"""
+	Compresses a block of an output file as a complete stream of the format. The streams of the blocks are written
+	one after the other, which is a valid file for the gzip, bzip2 and xz tools and for open_input().
+	"""
+	if codec == "gz":
+		compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+		return compressor.compress(block) + compressor.flush()
+	if codec == "bz2":
+		return bz2.compress(block)
+	return import_lzma().compress(block)
+
+
+class DecompressingReader(io.RawIOBase):
+	"""
+	Reads the decompressed bytes of a compressed file. The files with several streams (e.g. written by
+	compress_block()) are read to the end.
+	Seeking is done by reading from the start of the file or from the current position, so the offsets are the offsets
+	in the decompressed bytes, like the offsets kept in the checkpoints.
+	"""
+
+	def __init__(self, file_name, codec):
+		io.RawIOBase.__init__(self)
+		self.name = file_name
+		self.codec = codec
+
+		self.raw_file = open(file_name, 'rb')
+		self.decompressor = make_decompressor(codec)
+		self.buffer = ""
+		self.buffer_position = 0
+		self.position = 0
+		self.eof = False
+
+	def readable(self):
+		return True
+
+	def seekable(self):
+		return True
+
+	def fill(self):
+		data = self.raw_file.read(READ_SIZE)
+		if not data:
+			self.eof = True
+			return
+
+		parts = []
+		while data:
+			try:
+				parts.append(self.decompressor.decompress(data))
+			except EOFError:
+				# The previous stream ended at the end of the last read.
+				self.decompressor = make_decompressor(self.codec)
+				continue
+
+			# The bytes after the end of a stream are the start of the next stream.
+			data = self.decompressor.unused_data
+			if data:
+				self.decompressor = make_decompressor(self.codec)
+
+		self.buffer = "".join(parts)
+		self.buffer_position = 0
+
+	def readinto(self, b):
+		while self.buffer_position >= len(self.buffer) and not self.eof:
+			self.fill()
+
+		n = min(len(b), len(self.buffer) - self.buffer_position)
+		b[:n] = self.buffer[self.buffer_position:self.buffer_position + n]
+		self.buffer_position += n
+		self.position += n
+		return n
+
+	def tell(self):
+		return self.position
+
+	def seek(self, offset, whence=0):
+		if whence == 1:
+			offset += self.position
+		elif whence != 0:
+			raise IOError("The compressed files could not be read from their end.")
+
+		if offset < self.position:
+			self.raw_file.seek(0)
+			self.decompressor = make_decompressor(self.codec)
+			self.buffer = ""
+			self.buffer_position = 0
+			self.position = 0
+			self.eof = False
+
+		while self.position < offset:
+			while self.buffer_position >= len(self.buffer) and not self.eof:
+				self.fill()
+			if self.eof:
+				break
+
+			n = min(offset - self.position, len(self.buffer) - self.buffer_position)
+			self.buffer_position += n
+			self.position += n
+		return self.position
+
+	def close(self):
+		if not self.closed:
+			self.raw_file.close()
+		io.RawIOBase.close(self)
+
+
+def open_input(file_name):
+	"""
+	Opens an input file for reading. The gzip, bzip2 and xz files are decompressed while they are read.
+
+	@rtype: file
+	@return: returns the file, or a buffered reader with the same methods for the compressed files.
+	"""
+	codec = detect_codec(file_name)
+	if codec is None:
+		return open(file_name, 'rb')
+	return io.BufferedReader(DecompressingReader(file_name, codec), BUFFER_SIZE)
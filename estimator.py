@@ -0,0 +1,481 @@
+import os
+import sys
+import copy
+import json
+import math
+import time
+import random
+import shutil
+import multiprocessing
+from Queue import Empty
+from collections import OrderedDict
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The sample is taken with this seed, so the estimates of the same input are the same.
+RANDOM_SEED = 1
+
+# The z value of the confidence intervals of the rates (95%).
+Z_VALUE = 1.96
+
+# The name of the sampled input file. The outputs of the sample runs are named by it.
+SAMPLE_FILE_NAME = "sample.csv"
+
+
+def uniform(rand):
+	# A random number in (0, 1), so its logarithm is defined.
+	u = rand.random()
+	while u == 0.0:
+		u = rand.random()
+	return u
+
+
+def reservoir_sample(records, size, rand):
+	"""
+	Takes a uniform sample of the records without knowing their number, keeping only the sample in memory.
+	After the first 'size' records, the number of records to skip before the next one is taken is drawn at once
+	(Algorithm L of Li, 1994), so the random numbers are drawn only for the records which are taken.
+
+	@type records: iterator
+	@param records: The records, e.g. the lines of the input files given by TMManager.read_tm().
+
+	@rtype: tuple
+	@return: returns a tuple of the form (sample, number of records).
+	"""
+	sample = []
+	if size <= 0:
+		return sample, sum(1 for x in records)
+
+	w = math.exp(math.log(uniform(rand)) / size)
+	next_index = size + int(math.floor(math.log(uniform(rand)) / math.log(1.0 - w)))
+
+	count = 0
+	for record in records:
+		if count < size:
+			sample.append(record)
+		elif count == next_index:
+			sample[rand.randrange(size)] = record
+			w *= math.exp(math.log(uniform(rand)) / size)
+			next_index += int(math.floor(math.log(uniform(rand)) / math.log(1.0 - w))) + 1
+		count += 1
+
+	return sample, count
+
+
+def wilson_interval(successes, size, population, z=Z_VALUE):
+	"""
+	Finds the Wilson score interval of a proportion in a sample taken from a finite population without replacement.
+	The variance is corrected by the finite population correction, so the interval is empty if the sample is the
+	whole population.
+
+	@rtype: tuple
+	@return: returns the lower and the upper bounds of the proportion.
+	"""
+	if size == 0:
+		return 0.0, 1.0
+
+	p = float(successes) / size
+	if population <= size:
+		return p, p
+
+	z2 = z * z * (population - size) / float(population - 1)
+	denominator = 1.0 + z2 / size
+	center = (p + z2 / (2.0 * size)) / denominator
+	half_width = math.sqrt(z2) * math.sqrt(p * (1.0 - p) / size + z2 / (4.0 * size * size)) / denominator
+	return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+def extrapolate(points, size):
+	"""
+	Extrapolates a measure (e.g. the time of a filter) to the given size with a line through the measures of the
+	samples. If the measure is not larger in the larger sample, it is taken as a fixed cost (e.g. loading a model).
+	With one sample, the measure is taken as proportional to the size.
+
+	@type points: list
+	@param points: list of tuples of the form (sample size, measure), sorted by the sample size.
+	"""
+	n2, v2 = points[-1]
+	if len(points) == 1 or points[-2][0] == n2:
+		if n2 == 0:
+			return v2
+		return float(v2) * size / n2
+
+	n1, v1 = points[-2]
+	slope = max(float(v2 - v1) / (n2 - n1), 0.0)
+	return v2 + slope * (size - n2)
+
+
+def _run_sample(config_file_name, log_file_name, queue):
+	"""
+	Runs the cleaner on a sample in a child process, so its peak memory is measured alone.
+	"""
+	from tm_manager import TMManager
+	stdout = sys.stdout
+	sys.stdout = open(log_file_name, "w")
+
+	start = time.time()
+	try:
+		TMManager(config_file_name).run()
+	except Exception, e:
+		print "The Exception:"
+		print repr(e)
+	seconds = time.time() - start
+	sys.stdout.close()
+	sys.stdout = stdout
+
+	peak = None
+	try:
+		import resource
+		peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+		if sys.platform != "darwin":
+			peak *= 1024
+	except ImportError:
+		pass
+
+	queue.put({"seconds": seconds, "peak bytes": peak})
+
+
+def count_lines(file_name):
+	from compression import open_input
+	f = open_input(file_name)
+	count = sum(1 for x in f)
+	f.close()
+	return count
+
+
+class Estimator(object):
+	"""
+	Estimates the decisions of a run and its time and memory from a sample of the input (see estimate()).
+	Taking the first lines ('max decision') is biased on the sorted memories, so the lines are sampled uniformly
+	from the whole input. The cleaner runs on the sample with all its sections, in a folder of the output folder
+	('estimate__<input file>'), with its own models, so the models of the input are not used or changed.
+	The cleaner runs on half of the sample too, so the time and the memory are extrapolated with a line through the
+	two runs and the fixed costs (e.g. loading the libraries) are not multiplied by the size of the input.
+	"""
+
+	def __init__(self, manager):
+		"""
+		@type manager: TMManager
+		@param manager: The manager of the run, with its options loaded and its input files set.
+		"""
+		self.manager = manager
+		self.options = manager.options
+
+		config_file_name = manager.config_file_name or "config.json"
+		f = open(config_file_name)
+		self.config = json.load(f)
+		f.close()
+
+		self.folder = os.path.join(os.getcwd(), self.options['output folder'], "estimate__" + manager.output_name)
+		self.num_of_lines = 0
+		self.runs = []
+
+	def write_sample(self, lines, folder):
+		"""
+		Writes the sampled lines of the input, the alignment and the token files in the folder of a sample run and
+		makes its config file.
+
+		@type lines: list
+		@param lines: list of tuples of the form (line_no, line, align_line, token_line), sorted by the line number.
+
+		@rtype: str
+		@return: returns the name of the config file.
+		"""
+		os.makedirs(folder)
+
+		data_folder = os.path.join(os.getcwd(), "data")
+		config = copy.deepcopy(self.config)
+		options = config['options']
+
+		files = [('input file', 1, SAMPLE_FILE_NAME)]
+		if self.manager.have_alignment:
+			files.append(('align file', 2, "sample_align"))
+		if self.manager.have_token:
+			files.append(('token file', 3, "sample_token"))
+
+		for option, column, file_name in files:
+			file_name = os.path.join(folder, file_name)
+			f = open(file_name, "wb")
+			for line in lines:
+				f.write(line[column])
+				if not line[column].endswith("\n"):
+					f.write("\n")
+			f.close()
+			options[option] = os.path.relpath(file_name, data_folder)
+
+		# The TMX files are given in the tab separated format by read_tm().
+		options['input format'] = "csv"
+		options['output folder'] = os.path.relpath(folder, os.getcwd())
+		options['models folder'] = os.path.relpath(os.path.join(folder, "models"), os.getcwd())
+		options['profile'] = "true"
+		options['no out files'] = "false"
+		options['max decision'] = -1
+		options['line index'] = "false"
+		options['checkpoint interval'] = 0
+		options['progress file'] = ""
+
+		config_file_name = os.path.join(folder, "config.json")
+		f = open(config_file_name, "w")
+		json.dump(config, f, indent=1)
+		f.close()
+		return config_file_name
+
+	def run_sample(self, lines):
+		"""
+		Runs the cleaner on the given lines in a child process and reads its decisions, its timings and the sizes of
+		the states of its filters.
+
+		@rtype: dict
+		@return: returns the results of the run, or None if the run is not finished.
+		"""
+		folder = os.path.join(self.folder, "sample_%d" % len(lines))
+		config_file_name = self.write_sample(lines, folder)
+
+		print "Running the cleaner on", len(lines), "lines (the messages are in " + os.path.join(folder, "log") + ") ..."
+		queue = multiprocessing.Queue()
+		process = multiprocessing.Process(target=_run_sample, args=(config_file_name, os.path.join(folder, "log"), queue))
+		process.start()
+
+		# The child could stop without giving its result (e.g. a SystemExit of a filter, a crash of a library or
+		# the OOM killer), so the queue is polled while it is running.
+		result = None
+		while result is None and process.is_alive():
+			try:
+				result = queue.get(timeout=1)
+			except Empty:
+				pass
+		if result is None:
+			try:
+				result = queue.get(timeout=1)
+			except Empty:
+				pass
+		process.join()
+
+		if result is None or process.exitcode != 0:
+			print "The cleaner is not finished on the sample (exit code " + str(process.exitcode) + "). See the messages in its log."
+			return None
+
+		from compression import strip_extension
+		profile_file_name = os.path.join(folder, "profile__" + SAMPLE_FILE_NAME + ".json")
+		if not os.path.isfile(profile_file_name):
+			print "The cleaner is not finished on the sample. See the messages in its log."
+			return None
+
+		f = open(profile_file_name)
+		profile = json.load(f)
+		f.close()
+
+		# The output files are named '<answer>_<policy>__sample.csv'.
+		policy_names = sorted([x[0] for x in self.config.get('policies', [])], key=len, reverse=True)
+		answers = OrderedDict()
+		skipped = 0
+		for file_name in sorted(os.listdir(folder)):
+			name = strip_extension(file_name)
+			if not name.endswith("__" + SAMPLE_FILE_NAME):
+				continue
+			name = name[:-len("__" + SAMPLE_FILE_NAME)]
+
+			if name == "skipped":
+				skipped = count_lines(os.path.join(folder, file_name))
+				continue
+
+			for policy_name in policy_names:
+				if name.endswith("_" + policy_name):
+					answer = name[:-len("_" + policy_name)]
+					answers.setdefault(policy_name, OrderedDict())[answer] = count_lines(os.path.join(folder, file_name))
+					break
+
+		times = OrderedDict()
+		sections = OrderedDict([("learning", 0.0), ("decision", 0.0)])
+		for record in profile["timings"]:
+			if record["kind"] == "section":
+				if record["name"] in sections:
+					sections[record["name"]] += record["total seconds"]
+				continue
+			key = record["kind"] + " " + record["name"]
+			times[key] = times.get(key, 0.0) + record["total seconds"]
+
+		sizes = OrderedDict((x["kind"] + " " + x["name"], x["state bytes"]) for x in profile.get("state sizes", []))
+
+		return {"lines": len(lines), "answers": answers, "skipped": skipped, "seconds": result["seconds"],
+			"sections": sections, "times": times, "peak bytes": result["peak bytes"], "state sizes": sizes}
+
+	def run(self, sample_size):
+		"""
+		Samples the input and runs the cleaner on the sample and on half of it.
+
+		@rtype: bool
+		@return: returns False if the input is empty or the cleaner is not finished on the sample.
+		"""
+		print "Sampling", sample_size, "lines of the input ..."
+		rand = random.Random(RANDOM_SEED)
+		sample, self.num_of_lines = reservoir_sample(self.manager.read_tm(), sample_size, rand)
+		print "Number of lines of the input:", self.num_of_lines
+
+		if len(sample) == 0:
+			print "The input is empty."
+			return False
+
+		if os.path.isdir(self.folder):
+			shutil.rmtree(self.folder)
+
+		# A random half of a uniform sample is a uniform sample too.
+		half = sorted(rand.sample(sample, len(sample) // 2))
+		sample.sort()
+
+		self.runs = []
+		for lines in [half, sample]:
+			if len(lines) == 0:
+				continue
+			result = self.run_sample(lines)
+			if result is None:
+				return False
+			self.runs.append(result)
+		return True
+
+	def report(self):
+		"""
+		@rtype: dict
+		@return: returns the estimates for the whole input.
+		"""
+		run = self.runs[-1]
+		size = run["lines"]
+		population = self.num_of_lines
+
+		report = OrderedDict()
+		report["input lines"] = population
+		report["sample lines"] = [x["lines"] for x in self.runs]
+
+		policies = OrderedDict()
+		counts = [(policy_name, answer, count) for policy_name, answers in run["answers"].items()
+			for answer, count in answers.items()]
+		counts.append(("-", "skipped", run["skipped"]))
+		for policy_name, answer, count in counts:
+			low, high = wilson_interval(count, size, population)
+			record = OrderedDict()
+			record["sample count"] = count
+			record["rate"] = float(count) / size
+			record["rate interval"] = [low, high]
+			record["projected lines"] = int(round(record["rate"] * population))
+			record["projected interval"] = [int(math.floor(low * population)), int(math.ceil(high * population))]
+			policies.setdefault(policy_name, OrderedDict())[answer] = record
+		report["decisions"] = policies
+
+		def project(values):
+			points = [(x["lines"], values(x)) for x in self.runs]
+			if any(x[1] is None for x in points):
+				return None
+			return OrderedDict([("samples", [x[1] for x in points]), ("projected", extrapolate(points, population))])
+
+		report["wall clock seconds"] = project(lambda x: x["seconds"])
+		report["peak resident bytes"] = project(lambda x: x["peak bytes"])
+		report["section seconds"] = OrderedDict((name, project(lambda x: x["sections"].get(name, 0.0)))
+			for name in run["sections"])
+		report["seconds"] = OrderedDict((name, project(lambda x: x["times"].get(name, 0.0)))
+			for name in sorted(run["times"], key=lambda x: -run["times"][x]))
+		report["state bytes"] = OrderedDict((name, project(lambda x: x["state sizes"].get(name, 0)))
+			for name in run["state sizes"])
+		return report
+
+	def print_report(self, report):
+		print "======================================================================"
+		print "Estimates for the", report["input lines"], "lines of the input, from samples of",
+		print " and ".join([str(x) for x in report["sample lines"]]), "lines:"
+		print
+		print "%-20s%-12s%10s%10s%20s%16s%28s" % ("Policy", "Answer", "Sample", "Rate", "%d%% interval" % 95,
+			"Projected", "Projected interval")
+		for policy_name, answers in report["decisions"].items():
+			for answer, record in answers.items():
+				print "%-20s%-12s%10d%9.2f%%%9.2f%% - %6.2f%%%16d%13d - %d" % (policy_name, answer, record["sample count"],
+					100.0 * record["rate"], 100.0 * record["rate interval"][0], 100.0 * record["rate interval"][1],
+					record["projected lines"], record["projected interval"][0], record["projected interval"][1])
+
+		print
+		print "Time and memory, extrapolated with a line through the samples:"
+		print "%-40s%30s%16s" % ("", "Samples", "Projected")
+
+		def print_line(name, record, unit_format):
+			if record is None:
+				return
+			samples = " / ".join([unit_format(x) for x in record["samples"]])
+			print "%-40s%30s%16s" % (name, samples, unit_format(record["projected"]))
+
+		seconds_format = lambda x: "%.2f s" % x
+		def bytes_format(x):
+			if x < 1048576:
+				return "%.1f KB" % (x / 1024.0)
+			return "%.1f MB" % (x / 1048576.0)
+
+		print_line("Wall clock", report["wall clock seconds"], seconds_format)
+		print_line("Peak resident memory", report["peak resident bytes"], bytes_format)
+		for name, record in report["section seconds"].items():
+			print_line("Section " + name, record, seconds_format)
+		for name, record in report["seconds"].items():
+			print_line(name, record, seconds_format)
+		for name, record in report["state bytes"].items():
+			print_line(name + " (state)", record, bytes_format)
+		print "======================================================================"
+
+
+def estimate(manager):
+	"""
+	Estimates the decisions of the policies, the time and the memory of a run on the whole input from a uniform
+	sample of 'estimate sample size' lines (see Estimator). The estimates are printed and written in the output
+	folder ('estimate__<input file>.json').
+
+	@type manager: TMManager
+	@param manager: The manager of the run. Its filters are not loaded.
+
+	@rtype: bool
+	@return: returns False if the estimates could not be made.
+	"""
+	print "Estimating the run from a sample of the input ..."
+	if manager.load_options_from_config_file() > 0 or not manager.set_input_files():
+		print "Exiting before finishing."
+		print "-------------------------"
+		return False
+
+	estimator = Estimator(manager)
+	if not estimator.run(manager.estimate_sample_size):
+		print "Exiting before finishing."
+		print "-------------------------"
+		return False
+
+	report = estimator.report()
+	file_name = os.path.join(os.getcwd(), manager.options['output folder'], "estimate__" + manager.output_name + ".json")
+	f = open(file_name, "w")
+	json.dump(report, f, indent=1)
+	f.close()
+
+	estimator.print_report(report)
+	print "The estimates are written in " + file_name + "."
+	return True
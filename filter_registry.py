@@ -0,0 +1,118 @@
+import os
+import imp
+import json
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The manifest of the filters. Each filter has an entry of the form
+# "name": {"module": module name, "class": class name, "requires": [names of the libraries it needs], "cost": cost}
+# The module is looked for in the folder of the filter ('filters/<name>/').
+# The cost is the relative time of the filter for a TU, which orders the filters in the decision section
+# (see filter_scheduler.py).
+REGISTRY_FILE_NAME = "filters/filters.json"
+
+# The shared services which could be used by the filters (see TMManager.get_service()).
+# The modules of the services are in the 'filters/' folder.
+SERVICES = {
+	"embeddings": {"module": "embedding_service", "class": "EmbeddingService", "requires": ["numpy", "scipy", "gensim"]},
+	"alignment": {"module": "alignment_service", "class": "AlignmentService", "requires": ["numpy"]},
+}
+
+
+def load_registry(file_name=REGISTRY_FILE_NAME):
+	"""
+	Reads the manifest of the filters without importing any of them.
+
+	@rtype: dict
+	@return: returns the entries of the manifest. The keys are the names of the filters.
+	"""
+	if not os.path.isfile(file_name):
+		return {}
+
+	f = open(file_name)
+	registry = json.load(f)
+	f.close()
+
+	return registry
+
+
+def missing_dependencies(entry):
+	"""
+	Finds the libraries required by a filter which are not installed. The libraries are not imported.
+
+	@rtype: list
+	@return: returns the names of the missing libraries.
+	"""
+	missing = []
+	for library in entry.get("requires", []):
+		try:
+			imp.find_module(library)
+		except ImportError:
+			missing.append(library)
+	return missing
+
+
+def list_filters(config_file_name=""):
+	"""
+	Prints the filters of the manifest with their state in the config file and their missing libraries.
+	Nothing is imported from the filters or their libraries.
+	"""
+	if not config_file_name:
+		config_file_name = "config.json"
+
+	states = {}
+	if os.path.isfile(config_file_name):
+		f = open(config_file_name)
+		try:
+			states = dict((option[0], option[1]) for option in json.load(f).get('filters', []))
+		except ValueError:
+			print "The config file could not be decoded."
+		f.close()
+
+	registry = load_registry()
+
+	# The filters with a folder and without an entry in the manifest are found by the manager as before.
+	names = list(registry.keys())
+	for name in sorted(os.listdir("filters")):
+		if name not in registry and os.path.isfile(os.path.join("filters", name, name + ".py")):
+			names.append(name)
+
+	print "%-30s%-6s%-30s%s" % ("Filter", "State", "Requires", "Missing")
+	print "-" * 80
+	for name in sorted(names):
+		entry = registry.get(name, {})
+		requires = ", ".join(entry.get("requires", [])) or "-"
+		if name not in registry:
+			requires = "(not in the manifest)"
+		missing = ", ".join(missing_dependencies(entry)) or "-"
+
+		print "%-30s%-6s%-30s%s" % (name, states.get(name, "-"), requires, missing)
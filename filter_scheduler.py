@@ -0,0 +1,112 @@
+import time
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+
+# The cost of the filters which have no cost in the manifest, as the cost of the simple filters of the phrases.
+DEFAULT_COST = 1
+
+
+class FilterScheduler(object):
+	"""
+	Orders the filters of the decision section by their cost. The cost of a filter is its relative time for a TU,
+	as it is given in the manifest of the filters ('cost' in filters/filters.json). The cheap filters are given the
+	TUs first, so the decisions of the policies are often fixed before the expensive filters are called
+	(see TMManager.evaluate_tus()).
+	The order is fixed for the whole run and the filters with the same cost keep the order of the config file, so the
+	'not_evaluated' answers in the decision log are the same in every run, in the worker processes and in the resumed
+	runs. The time and the rejections of each filter are measured only for the report, to help setting the costs.
+	"""
+
+	def __init__(self, filter_names, costs=None):
+		"""
+		@type costs: list
+		@param costs: The cost of each filter. The filters without a cost have DEFAULT_COST.
+		"""
+		self.filter_names = filter_names
+		if costs is None:
+			costs = [DEFAULT_COST] * len(filter_names)
+		self.costs = costs
+		self.filter_order = sorted(range(len(filter_names)), key=lambda i: self.costs[i])
+
+		# The time spent by each filter, and the number of the TUs it has decided and rejected.
+		self.times = [0.0] * len(filter_names)
+		self.counts = [0] * len(filter_names)
+		self.rejects = [0] * len(filter_names)
+
+	def order(self):
+		"""
+		@rtype: list
+		@return: returns the indexes of the filters in the order they should be evaluated.
+		"""
+		return self.filter_order
+
+	def decide_batch(self, i, filter_object, tus):
+		"""
+		Gives a batch of TUs to a filter and measures its time and its rejections.
+
+		@rtype: list
+		@return: returns the answers of the filter.
+		"""
+		start = time.time()
+		answers = filter_object.decide_batch(tus)
+		self.times[i] += time.time() - start
+
+		self.counts[i] += len(tus)
+		self.rejects[i] += len([1 for x in answers if x == "reject"])
+		return answers
+
+	def get_state(self):
+		"""
+		Returns the measured times and rejections for the checkpoints of the manager. The order does not depend on
+		them, so a resumed run makes the same decisions and reports the whole decision section.
+		"""
+		return {"times": self.times, "counts": self.counts, "rejects": self.rejects}
+
+	def set_state(self, state):
+		self.times = list(state["times"])
+		self.counts = list(state["counts"])
+		self.rejects = list(state["rejects"])
+
+	def report(self):
+		"""
+		@rtype: list
+		@return: returns the lines of a table of the filters in their order, with their cost and rejection rate.
+		"""
+		lines = ["%-30s%8s%12s%12s%12s" % ("Filter", "Cost", "TUs", "ms/TU", "Rejected")]
+		for i in self.order():
+			if self.counts[i] == 0:
+				lines.append("%-30s%8g%12d%12s%12s" % (self.filter_names[i], self.costs[i], 0, "-", "-"))
+				continue
+			lines.append("%-30s%8g%12d%12.4f%11.1f%%" % (self.filter_names[i], self.costs[i], self.counts[i],
+				1000.0 * self.times[i] / self.counts[i], 100.0 * self.rejects[i] / self.counts[i]))
+		return lines
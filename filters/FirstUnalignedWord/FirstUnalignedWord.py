@@ -1,11 +1,14 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from quantile_sketch import QuantileSketch, DEFAULT_SKETCH_SIZE
+from running_stats import RunningStats
 import os.path
-import math
-import numpy as np
 
 
 class FirstUnalignedWord(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('src_stats', 'trg_stats', 'src_scores', 'trg_scores')
+
 	def __init__(self):
 		self.var_mult = 2
 
@@ -13,20 +16,17 @@ class FirstUnalignedWord(AbstractFilter):
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.n = 0.0
 
-		self.src_sum = 0.0
-		self.src_sum_sq = 0.0
-		self.trg_sum = 0.0
-		self.trg_sum_sq = 0.0
+		self.src_stats = RunningStats()
+		self.trg_stats = RunningStats()
 
 		self.src_mean = 0.0
 		self.src_var = 0.0
 		self.trg_mean = 0.0
 		self.trg_var = 0.0
 
-		self.src_scores = []
-		self.trg_scores = []
+		self.src_scores = QuantileSketch()
+		self.trg_scores = QuantileSketch()
 		self.s_thresh = 0.0
 		self.t_thresh = 0.0
 
@@ -38,37 +38,26 @@ class FirstUnalignedWord(AbstractFilter):
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.model_filename = "models/FirstUnalignedWord.stats"
-		if self.normalize:
-			self.model_filename += "_n"
-
-		if os.path.isfile(self.model_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.model_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
-
-				l = f.readline().strip().split("\t")
-				self.src_mean = float(l[1])
-				self.src_var = float(l[2])
 
-				l = f.readline().strip().split("\t")
-				self.trg_mean = float(l[1])
-				self.trg_var = float(l[2])
-
-				break
-
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+		# The scores are kept in sketches for their percentiles.
+		sketch_size = extra_args.get('quantile sketch size', DEFAULT_SKETCH_SIZE)
+		self.src_scores = QuantileSketch(sketch_size)
+		self.trg_scores = QuantileSketch(sketch_size)
+
+		# The statistics learned in a previous run for the same languages and the same source of the alignments
+		# (see model_registry.py).
+		self.models = extra_args['model registry']
+		self.model_parameters = {"alignment": extra_args.get('alignment source', {})}
+		model = self.models.load("FirstUnalignedWord", self.src_language, self.trg_language, self.normalize, self.model_parameters)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
+
+			self.src_mean = model['values']['source mean']
+			self.src_var = model['values']['source deviation']
+			self.trg_mean = model['values']['target mean']
+			self.trg_var = model['values']['target deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -78,60 +67,43 @@ class FirstUnalignedWord(AbstractFilter):
 		if self.model_exist:
 			return
 
-		self.src_mean = self.src_sum / self.n
-		self.src_var = (self.src_sum_sq - (self.src_sum * self.src_sum) / self.n) / (self.n - 1)
-		self.src_var = math.sqrt(self.src_var)
-
-		self.trg_mean = self.trg_sum / self.n
-		self.trg_var = (self.trg_sum_sq - (self.trg_sum * self.trg_sum) / self.n) / (self.n - 1)
-		self.trg_var = math.sqrt(self.trg_var)
+		self.src_mean = self.src_stats.mean
+		self.src_var = self.src_stats.std()
 
-		f = open(self.model_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
+		self.trg_mean = self.trg_stats.mean
+		self.trg_var = self.trg_stats.std()
 
-		f.write("source\t" + str(self.src_mean) + "\t" + str(self.src_var) + "\n")
-		f.write("target\t" + str(self.trg_mean) + "\t" + str(self.trg_var) + "\n")
+		self.models.save("FirstUnalignedWord", self.src_language, self.trg_language, self.normalize, self.model_parameters, values={
+			"source mean": self.src_mean, "source deviation": self.src_var,
+			"target mean": self.trg_mean, "target deviation": self.trg_var})
 
-		f.close()
-
-		self.s_thresh = np.percentile(self.src_scores, self.var_mult)
-		self.t_thresh = np.percentile(self.trg_scores, self.var_mult)
+		self.s_thresh = self.src_scores.percentile(self.var_mult)
+		self.t_thresh = self.trg_scores.percentile(self.var_mult)
 
 		f = open("models/quartiles", "a")
 
 		f.write("FirstUnalignedWord")
-		f.write("\t" + str(np.percentile(self.src_scores, 25)))
-		f.write("\t" + str(np.percentile(self.src_scores, 50)))
-		f.write("\t" + str(np.percentile(self.src_scores, 75)))
+		f.write("\t" + str(self.src_scores.percentile(25)))
+		f.write("\t" + str(self.src_scores.percentile(50)))
+		f.write("\t" + str(self.src_scores.percentile(75)))
 
-		f.write("\t" + str(np.percentile(self.trg_scores, 25)))
-		f.write("\t" + str(np.percentile(self.trg_scores, 50)))
-		f.write("\t" + str(np.percentile(self.trg_scores, 75)))
+		f.write("\t" + str(self.trg_scores.percentile(25)))
+		f.write("\t" + str(self.trg_scores.percentile(50)))
+		f.write("\t" + str(self.trg_scores.percentile(75)))
 		f.write("\n")
 
 		f.close()
 
 	#
 	def process_tu(self, tu, num_of_finished_scans):
-		src_set = set([x[0] for x in tu.alignment])
-		trg_set = set([x[1] for x in tu.alignment])
-
 		src_size = float(len(tu.src_tokens))
 		trg_size = float(len(tu.trg_tokens))
 
 		if src_size == 0 or trg_size == 0:
 			return [0.0, 0.0]
 
-		self.n += 1
-		src_bar = set([i for i in range(int(src_size))])
-		trg_bar = set([i for i in range(int(trg_size))])
-		src_set = src_bar - src_set
-		trg_set = trg_bar - trg_set
-		if len(src_set) == 0:
-			src_set.add(src_size)
-		if len(trg_set) == 0:
-			trg_set.add(trg_size)
+		src_set = tu.feature('src_unaligned') or (src_size,)
+		trg_set = tu.feature('trg_unaligned') or (trg_size,)
 
 		first_src = float(min(src_set)) / src_size
 		first_trg = float(min(trg_set)) / trg_size
@@ -140,13 +112,11 @@ class FirstUnalignedWord(AbstractFilter):
 			first_src = 1.0 - min(first_src, 1.0)
 			first_trg = 1.0 - min(first_trg, 1.0)
 
-		self.src_sum += first_src
-		self.src_sum_sq += first_src * first_src
-		self.trg_sum += first_trg
-		self.trg_sum_sq += first_trg * first_trg
+		self.src_stats.add(first_src)
+		self.trg_stats.add(first_trg)
 
-		self.src_scores.append(first_src)
-		self.trg_scores.append(first_trg)
+		self.src_scores.add(first_src)
+		self.trg_scores.add(first_trg)
 
 		return [first_src, first_trg]
 
@@ -155,22 +125,14 @@ class FirstUnalignedWord(AbstractFilter):
 		pass
 
 	def decide(self, tu):
-		src_set = set([x[0] for x in tu.alignment])
-		trg_set = set([x[1] for x in tu.alignment])
 		src_size = float(len(tu.src_tokens))
 		trg_size = float(len(tu.trg_tokens))
 
 		if src_size == 0 or trg_size == 0:
 			return 'reject'
 
-		src_bar = set([i for i in range(int(src_size))])
-		trg_bar = set([i for i in range(int(trg_size))])
-		src_set = src_bar - src_set
-		trg_set = trg_bar - trg_set
-		if len(src_set) == 0:
-			src_set.add(src_size)
-		if len(trg_set) == 0:
-			trg_set.add(trg_size)
+		src_set = tu.feature('src_unaligned') or (src_size,)
+		trg_set = tu.feature('trg_unaligned') or (trg_size,)
 
 		first_src = float(min(src_set)) / src_size
 		first_trg = float(min(trg_set)) / trg_size
@@ -1,9 +1,14 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
-import langid
+
+# langid is imported in initialize(), because importing it and loading its model is slow.
+langid = None
 
 
 class Lang_Identifier(AbstractFilter):
+	# The filter learns nothing in the scans, they only give the scores (see AbstractFilter.statistics).
+	statistics = ()
+
 	def __init__(self):
 		self.num_of_scans = 0
 		self.src_language = ""
@@ -17,6 +22,9 @@ class Lang_Identifier(AbstractFilter):
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
+
+		global langid
+		import langid
 		langid.load_model()
 		return
 
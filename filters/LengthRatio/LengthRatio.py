@@ -1,25 +1,48 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from quantile_sketch import QuantileSketch, DEFAULT_SKETCH_SIZE
+from running_stats import RunningStats
 import os.path
-import math
 import numpy as np
 
 
+def round_array(values, ndigits):
+	"""
+	Rounds the values like round() of Python 2 (half away from zero), so the batch results are the same as the results
+	of process_tu() and decide().
+
+	@type values: numpy.ndarray
+	@rtype: numpy.ndarray
+	"""
+	scale = 10.0 ** ndigits
+	scaled = np.abs(values) * scale
+	rounded = np.floor(scaled + 0.5)
+	result = np.copysign(rounded / scale, values)
+
+	# Near the halfway points the scaled values are not exact, so these values are rounded one by one.
+	distance = scaled + 0.5 - rounded
+	for i in np.flatnonzero((distance < 1e-6) | (distance > 1.0 - 1e-6)):
+		result[i] = round(values[i], ndigits)
+
+	return result
+
+
 class LengthRatio(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('stats', 'scores')
+
 	def __init__(self):
 		self.var_mult = 2
 
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.n = 0.0
-		self.sum = 0.0
-		self.sum_sq = 0.0
+		self.stats = RunningStats()
 
 		self.mean = 0.0
 		self.var = 0.0
 
-		self.scores = []
+		self.scores = QuantileSketch()
 		self.thresh = 0.0
 
 		self.model_exist = False
@@ -29,33 +52,21 @@ class LengthRatio(AbstractFilter):
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.model_filename = "models/LengthRatio.stats"
-		if self.normalize:
-			self.model_filename += "_n"
-
-		if os.path.isfile(self.model_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.model_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
 
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
+		# The scores are kept in sketches for their percentiles.
+		sketch_size = extra_args.get('quantile sketch size', DEFAULT_SKETCH_SIZE)
+		self.scores = QuantileSketch(sketch_size)
 
-				l = f.readline().strip().split("\t")
-				self.mean = float(l[1])
-				self.var = float(l[2])
+		# The statistics learned in a previous run for the same languages (see model_registry.py).
+		self.models = extra_args['model registry']
+		model = self.models.load("LengthRatio", self.src_language, self.trg_language, self.normalize)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
 
-				break
-
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+			self.mean = model['values']['mean']
+			self.var = model['values']['deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -65,28 +76,20 @@ class LengthRatio(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.n == 0:
-			self.n += 1.0
-		self.mean = self.sum / self.n
-		self.var = (self.sum_sq - (self.sum * self.sum) / self.n) / (self.n - 1)
-		self.var = math.sqrt(self.var)
-
-		f = open(self.model_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
-
-		f.write("source\t" + str(self.mean) + "\t" + str(self.var) + "\n")
+		self.mean = self.stats.mean
+		self.var = self.stats.std()
 
-		f.close()
+		self.models.save("LengthRatio", self.src_language, self.trg_language, self.normalize, values={
+			"mean": self.mean, "deviation": self.var})
 
-		self.thresh = np.percentile(self.scores, self.var_mult)
+		self.thresh = self.scores.percentile(self.var_mult)
 
 		f = open("quartiles", "a")
 
 		f.write("LengthRatio")
-		f.write("\t" + str(np.percentile(self.scores, 25)))
-		f.write("\t" + str(np.percentile(self.scores, 50)))
-		f.write("\t" + str(np.percentile(self.scores, 75)))
+		f.write("\t" + str(self.scores.percentile(25)))
+		f.write("\t" + str(self.scores.percentile(50)))
+		f.write("\t" + str(self.scores.percentile(75)))
 
 		f.write("\n")
 
@@ -100,11 +103,9 @@ class LengthRatio(AbstractFilter):
 			ratio = min(ratio, 3.0)
 			ratio = 1.0 - (abs(1.0 - ratio) / 2.0)
 
-		self.n += 1
-		self.sum += ratio
-		self.sum_sq += ratio * ratio
+		self.stats.add(ratio)
 
-		self.scores.append(ratio)
+		self.scores.add(ratio)
 
 		return [ratio]
 
@@ -125,3 +126,36 @@ class LengthRatio(AbstractFilter):
 		# if ratio <= self.thresh:
 			return 'accept'
 		return 'reject'
+
+	def batch_ratios(self, tus):
+		"""
+		Computes the ratios of a batch of TUs at once, with the same arithmetic as process_tu() and decide().
+
+		@rtype: numpy.ndarray
+		"""
+		src_sizes = np.array([len(tu.src_phrase) for tu in tus], dtype=np.int64)
+		trg_sizes = np.array([len(tu.trg_phrase) for tu in tus], dtype=np.int64)
+
+		# max() keeps the int length when it is not zero, so process_tu() and decide() make an integer division.
+		ratios = np.where(trg_sizes > 0, src_sizes // np.maximum(trg_sizes, 1), src_sizes).astype(np.float64)
+
+		if self.normalize:
+			ratios = round_array(ratios, 3)
+			ratios = np.minimum(ratios, 3.0)
+			ratios = 1.0 - (np.abs(1.0 - ratios) / 2.0)
+
+		return ratios
+
+	def process_batch(self, tus, num_of_finished_scans):
+		ratios = self.batch_ratios(tus)
+
+		self.stats.extend(ratios)
+
+		ratios = ratios.tolist()
+		self.scores.extend(ratios)
+
+		return [[ratio] for ratio in ratios]
+
+	def decide_batch(self, tus):
+		accepted = np.abs(self.batch_ratios(tus) - self.mean) <= self.var_mult * self.var
+		return ['accept' if x else 'reject' for x in accepted.tolist()]
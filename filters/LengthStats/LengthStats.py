@@ -1,18 +1,21 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from running_stats import RunningStats
 import math
 
 
 class LengthStats(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('src_lengths', 'trg_lengths', 'src_words', 'trg_words')
+
 	def __init__(self):
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.n = 0.0
-		self.src_sum = 0.0
-		self.trg_sum = 0.0
-		self.src_wsum = 0.0
-		self.trg_wsum = 0.0
+		self.src_lengths = RunningStats()
+		self.trg_lengths = RunningStats()
+		self.src_words = RunningStats()
+		self.trg_words = RunningStats()
 
 		self.src_mean = 0.0
 		self.trg_mean = 0.0
@@ -25,22 +28,19 @@ class LengthStats(AbstractFilter):
 		return
 
 	def finalize(self):
-		if self.n == 0:
-			self.n += 1.0
-		self.src_mean = self.src_sum / self.n
-		self.trg_mean = self.trg_sum / self.n
+		self.src_mean = self.src_lengths.mean
+		self.trg_mean = self.trg_lengths.mean
 
 		print 'src length mean:', self.src_mean
 		print 'trg length mean:', self.trg_mean
-		print 'src word mean:', self.src_wsum / self.n
-		print 'trg word mean:', self.trg_wsum / self.n
+		print 'src word mean:', self.src_words.mean
+		print 'trg word mean:', self.trg_words.mean
 
 	def process_tu(self, tu, num_of_finished_scans):
-		self.src_wsum += len(tu.src_tokens)
-		self.trg_wsum += len(tu.trg_tokens)
-		self.src_sum += len(tu.src_phrase)
-		self.trg_sum += len(tu.trg_phrase)
-		self.n += 1
+		self.src_words.add(len(tu.src_tokens))
+		self.trg_words.add(len(tu.trg_tokens))
+		self.src_lengths.add(len(tu.src_phrase))
+		self.trg_lengths.add(len(tu.trg_phrase))
 
 		return None
 
@@ -49,3 +49,14 @@ class LengthStats(AbstractFilter):
 
 	def decide(self, tu):
 		return 'neutral'
+
+	def process_batch(self, tus, num_of_finished_scans):
+		self.src_words.extend([len(tu.src_tokens) for tu in tus])
+		self.trg_words.extend([len(tu.trg_tokens) for tu in tus])
+		self.src_lengths.extend([len(tu.src_phrase) for tu in tus])
+		self.trg_lengths.extend([len(tu.trg_phrase) for tu in tus])
+
+		return [None] * len(tus)
+
+	def decide_batch(self, tus):
+		return ['neutral'] * len(tus)
@@ -4,6 +4,9 @@ import re
 
 
 class RepeatedWords(AbstractFilter):
+	# The filter learns nothing in the scans, they only give the scores (see AbstractFilter.statistics).
+	statistics = ()
+
 	def __init__(self):
 		self.num_of_scans = 0
 		self.src_language = ""
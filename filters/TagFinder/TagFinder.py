@@ -4,6 +4,9 @@ import re
 
 
 class TagFinder(AbstractFilter):
+	# The filter learns nothing in the scans, they only give the scores (see AbstractFilter.statistics).
+	statistics = ()
+
 	def __init__(self):
 		self.num_of_scans = 0
 		self.src_language = ""
@@ -65,66 +68,70 @@ class TagFinder(AbstractFilter):
 	def process_tu(self, tu, num_of_finished_scans):
 		minus_points = 0
 
+		# The TU can't be changed, so the tags are removed from local copies of the phrases.
+		src_phrase = tu.src_phrase
+		trg_phrase = tu.trg_phrase
+
 		# - Dates ----------------------------------------------------------------
-		src_dates = len(self.date_re.findall(tu.src_phrase))
-		trg_dates = len(self.date_re.findall(tu.trg_phrase))
+		src_dates = len(self.date_re.findall(src_phrase))
+		trg_dates = len(self.date_re.findall(trg_phrase))
 		if src_dates != trg_dates:
 			minus_points += 1
 			# print "date"
 
-		tu.src_phrase = self.date_re.sub("", tu.src_phrase)
-		tu.trg_phrase = self.date_re.sub("", tu.trg_phrase)
+		src_phrase = self.date_re.sub("", src_phrase)
+		trg_phrase = self.date_re.sub("", trg_phrase)
 
 		# - Numbers --------------------------------------------------------------
-		src_nums = len(self.num_re.findall(tu.src_phrase))
-		trg_nums = len(self.num_re.findall(tu.trg_phrase))
+		src_nums = len(self.num_re.findall(src_phrase))
+		trg_nums = len(self.num_re.findall(trg_phrase))
 		if src_nums != trg_nums:
 			minus_points += 1
 			# print "num"
-			# print tu.src_phrase
-			# print tu.trg_phrase
+			# print src_phrase
+			# print trg_phrase
 
 		# - Reference tags -------------------------------------------------------
-		src_ref = len(self.ref_re.findall(tu.src_phrase))
-		trg_ref = len(self.ref_re.findall(tu.trg_phrase))
+		src_ref = len(self.ref_re.findall(src_phrase))
+		trg_ref = len(self.ref_re.findall(trg_phrase))
 		if src_ref != trg_ref:
 			minus_points += 1
 			# print "ref"
 
-		tu.src_phrase = self.ref_re.sub("", tu.src_phrase)
-		tu.trg_phrase = self.ref_re.sub("", tu.trg_phrase)
+		src_phrase = self.ref_re.sub("", src_phrase)
+		trg_phrase = self.ref_re.sub("", trg_phrase)
 
 		# - XML tags -------------------------------------------------------------
-		src_xml_tag = len(self.xml_re.findall(tu.src_phrase))
-		trg_xml_tag = len(self.xml_re.findall(tu.trg_phrase))
+		src_xml_tag = len(self.xml_re.findall(src_phrase))
+		trg_xml_tag = len(self.xml_re.findall(trg_phrase))
 		if src_xml_tag != trg_xml_tag:
 			minus_points += 1
 			# print "xml"
 
 		# - Emails ---------------------------------------------------------------
-		src_emails = len(self.email_re.findall(tu.src_phrase))
-		trg_emails = len(self.email_re.findall(tu.trg_phrase))
+		src_emails = len(self.email_re.findall(src_phrase))
+		trg_emails = len(self.email_re.findall(trg_phrase))
 		if src_emails != trg_emails:
 			minus_points += 1
 			# print "email"
 
 		# - URLs -----------------------------------------------------------------
-		src_urls = len(self.url_re.findall(tu.src_phrase))
-		trg_urls = len(self.url_re.findall(tu.trg_phrase))
+		src_urls = len(self.url_re.findall(src_phrase))
+		trg_urls = len(self.url_re.findall(trg_phrase))
 		if src_urls != trg_urls:
 			minus_points += 1
 			# print "url"
 
 		# - Image tags -----------------------------------------------------------
-		src_img_tag = len(self.image_re.findall(tu.src_phrase))
-		trg_img_tag = len(self.image_re.findall(tu.trg_phrase))
+		src_img_tag = len(self.image_re.findall(src_phrase))
+		trg_img_tag = len(self.image_re.findall(trg_phrase))
 		if src_img_tag != trg_img_tag:
 			minus_points += 1
 			# print "img"
 
 		# - Category tags --------------------------------------------------------
-		src_cat_tag = len(self.category_re.findall(tu.src_phrase))
-		trg_cat_tag = len(self.category_re.findall(tu.trg_phrase))
+		src_cat_tag = len(self.category_re.findall(src_phrase))
+		trg_cat_tag = len(self.category_re.findall(trg_phrase))
 		if src_cat_tag != trg_cat_tag:
 			minus_points += 1
 			# print "cat"
@@ -139,66 +146,70 @@ class TagFinder(AbstractFilter):
 	def decide(self, tu):
 		minus_points = 0
 
+		# The TU can't be changed, so the tags are removed from local copies of the phrases.
+		src_phrase = tu.src_phrase
+		trg_phrase = tu.trg_phrase
+
 		# - Dates ----------------------------------------------------------------
-		src_dates = len(self.date_re.findall(tu.src_phrase))
-		trg_dates = len(self.date_re.findall(tu.trg_phrase))
+		src_dates = len(self.date_re.findall(src_phrase))
+		trg_dates = len(self.date_re.findall(trg_phrase))
 		if src_dates != trg_dates:
 			minus_points += 1
 			# print "date"
 
-		tu.src_phrase = self.date_re.sub("", tu.src_phrase)
-		tu.trg_phrase = self.date_re.sub("", tu.trg_phrase)
+		src_phrase = self.date_re.sub("", src_phrase)
+		trg_phrase = self.date_re.sub("", trg_phrase)
 
 		# - Numbers --------------------------------------------------------------
-		src_nums = len(self.num_re.findall(tu.src_phrase))
-		trg_nums = len(self.num_re.findall(tu.trg_phrase))
+		src_nums = len(self.num_re.findall(src_phrase))
+		trg_nums = len(self.num_re.findall(trg_phrase))
 		if src_nums != trg_nums:
 			minus_points += 1
 			# print "num"
-			# print tu.src_phrase
-			# print tu.trg_phrase
+			# print src_phrase
+			# print trg_phrase
 
 		# - Reference tags -------------------------------------------------------
-		src_ref = len(self.ref_re.findall(tu.src_phrase))
-		trg_ref = len(self.ref_re.findall(tu.trg_phrase))
+		src_ref = len(self.ref_re.findall(src_phrase))
+		trg_ref = len(self.ref_re.findall(trg_phrase))
 		if src_ref != trg_ref:
 			minus_points += 1
 			# print "ref"
 
-		tu.src_phrase = self.ref_re.sub("", tu.src_phrase)
-		tu.trg_phrase = self.ref_re.sub("", tu.trg_phrase)
+		src_phrase = self.ref_re.sub("", src_phrase)
+		trg_phrase = self.ref_re.sub("", trg_phrase)
 
 		# - XML tags -------------------------------------------------------------
-		src_xml_tag = len(self.xml_re.findall(tu.src_phrase))
-		trg_xml_tag = len(self.xml_re.findall(tu.trg_phrase))
+		src_xml_tag = len(self.xml_re.findall(src_phrase))
+		trg_xml_tag = len(self.xml_re.findall(trg_phrase))
 		if src_xml_tag != trg_xml_tag:
 			minus_points += 1
 			# print "xml"
 
 		# - Emails ---------------------------------------------------------------
-		src_emails = len(self.email_re.findall(tu.src_phrase))
-		trg_emails = len(self.email_re.findall(tu.trg_phrase))
+		src_emails = len(self.email_re.findall(src_phrase))
+		trg_emails = len(self.email_re.findall(trg_phrase))
 		if src_emails != trg_emails:
 			minus_points += 1
 			# print "email"
 
 		# - URLs -----------------------------------------------------------------
-		src_urls = len(self.url_re.findall(tu.src_phrase))
-		trg_urls = len(self.url_re.findall(tu.trg_phrase))
+		src_urls = len(self.url_re.findall(src_phrase))
+		trg_urls = len(self.url_re.findall(trg_phrase))
 		if src_urls != trg_urls:
 			minus_points += 1
 			# print "url"
 
 		# - Image tags -----------------------------------------------------------
-		src_img_tag = len(self.image_re.findall(tu.src_phrase))
-		trg_img_tag = len(self.image_re.findall(tu.trg_phrase))
+		src_img_tag = len(self.image_re.findall(src_phrase))
+		trg_img_tag = len(self.image_re.findall(trg_phrase))
 		if src_img_tag != trg_img_tag:
 			minus_points += 1
 			# print "img"
 
 		# - Category tags --------------------------------------------------------
-		src_cat_tag = len(self.category_re.findall(tu.src_phrase))
-		trg_cat_tag = len(self.category_re.findall(tu.trg_phrase))
+		src_cat_tag = len(self.category_re.findall(src_phrase))
+		trg_cat_tag = len(self.category_re.findall(trg_phrase))
 		if src_cat_tag != trg_cat_tag:
 			minus_points += 1
 			# print "cat"
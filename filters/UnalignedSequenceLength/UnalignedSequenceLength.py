@@ -1,11 +1,14 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from quantile_sketch import QuantileSketch, DEFAULT_SKETCH_SIZE
+from running_stats import RunningStats
 import os.path
-import math
-import numpy as np
 
 
 class UnalignedSequenceLength(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('src_stats', 'trg_stats', 'src_scores', 'trg_scores')
+
 	def __init__(self):
 		self.var_mult = 2
 
@@ -13,21 +16,16 @@ class UnalignedSequenceLength(AbstractFilter):
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.src_n = 0.0
-		self.trg_n = 0.0
-
-		self.src_sum = 0.0
-		self.src_sum_sq = 0.0
-		self.trg_sum = 0.0
-		self.trg_sum_sq = 0.0
+		self.src_stats = RunningStats()
+		self.trg_stats = RunningStats()
 
 		self.src_mean = 0.0
 		self.src_var = 0.0
 		self.trg_mean = 0.0
 		self.trg_var = 0.0
 
-		self.src_scores = []
-		self.trg_scores = []
+		self.src_scores = QuantileSketch()
+		self.trg_scores = QuantileSketch()
 		self.s_thresh = 0.0
 		self.t_thresh = 0.0
 
@@ -39,37 +37,26 @@ class UnalignedSequenceLength(AbstractFilter):
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.model_filename = "models/UnalignedSequenceLength.stats"
-		if self.normalize:
-			self.model_filename += "_n"
-
-		if os.path.isfile(self.model_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.model_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
-
-				l = f.readline().strip().split("\t")
-				self.src_mean = float(l[1])
-				self.src_var = float(l[2])
-
-				l = f.readline().strip().split("\t")
-				self.trg_mean = float(l[1])
-				self.trg_var = float(l[2])
 
-				break
-
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+		# The scores are kept in sketches for their percentiles.
+		sketch_size = extra_args.get('quantile sketch size', DEFAULT_SKETCH_SIZE)
+		self.src_scores = QuantileSketch(sketch_size)
+		self.trg_scores = QuantileSketch(sketch_size)
+
+		# The statistics learned in a previous run for the same languages and the same source of the alignments
+		# (see model_registry.py).
+		self.models = extra_args['model registry']
+		self.model_parameters = {"alignment": extra_args.get('alignment source', {})}
+		model = self.models.load("UnalignedSequenceLength", self.src_language, self.trg_language, self.normalize, self.model_parameters)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
+
+			self.src_mean = model['values']['source mean']
+			self.src_var = model['values']['source deviation']
+			self.trg_mean = model['values']['target mean']
+			self.trg_var = model['values']['target deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -79,98 +66,58 @@ class UnalignedSequenceLength(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.src_n <= 1:
-			self.src_n = 2.0
-		self.src_mean = self.src_sum / self.src_n
-		self.src_var = (self.src_sum_sq - (self.src_sum * self.src_sum) / self.src_n) / (self.src_n - 1)
-		self.src_var = math.sqrt(self.src_var)
-
-		if self.trg_n <= 1:
-			self.trg_n = 2.0
-		self.trg_mean = self.trg_sum / self.trg_n
-		self.trg_var = (self.trg_sum_sq - (self.trg_sum * self.trg_sum) / self.trg_n) / (self.trg_n - 1)
-		self.trg_var = math.sqrt(self.trg_var)
+		self.src_mean = self.src_stats.mean
+		self.src_var = self.src_stats.std()
 
-		f = open(self.model_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
+		self.trg_mean = self.trg_stats.mean
+		self.trg_var = self.trg_stats.std()
 
-		f.write("source\t" + str(self.src_mean) + "\t" + str(self.src_var) + "\n")
-		f.write("target\t" + str(self.trg_mean) + "\t" + str(self.trg_var) + "\n")
-
-		f.close()
+		self.models.save("UnalignedSequenceLength", self.src_language, self.trg_language, self.normalize, self.model_parameters, values={
+			"source mean": self.src_mean, "source deviation": self.src_var,
+			"target mean": self.trg_mean, "target deviation": self.trg_var})
 
-		self.s_thresh = np.percentile(self.src_scores, self.var_mult)
-		self.t_thresh = np.percentile(self.trg_scores, self.var_mult)
+		self.s_thresh = self.src_scores.percentile(self.var_mult)
+		self.t_thresh = self.trg_scores.percentile(self.var_mult)
 
 		f = open("quartiles", "a")
 
 		f.write("UnalignedSequenceLength")
-		f.write("\t" + str(np.percentile(self.src_scores, 25)))
-		f.write("\t" + str(np.percentile(self.src_scores, 50)))
-		f.write("\t" + str(np.percentile(self.src_scores, 75)))
+		f.write("\t" + str(self.src_scores.percentile(25)))
+		f.write("\t" + str(self.src_scores.percentile(50)))
+		f.write("\t" + str(self.src_scores.percentile(75)))
 
-		f.write("\t" + str(np.percentile(self.trg_scores, 25)))
-		f.write("\t" + str(np.percentile(self.trg_scores, 50)))
-		f.write("\t" + str(np.percentile(self.trg_scores, 75)))
+		f.write("\t" + str(self.trg_scores.percentile(25)))
+		f.write("\t" + str(self.trg_scores.percentile(50)))
+		f.write("\t" + str(self.trg_scores.percentile(75)))
 		f.write("\n")
 
 		f.close()
 
 	#
 	def process_tu(self, tu, num_of_finished_scans):
-		src_set = set([x[0] for x in tu.alignment])
-		trg_set = set([x[1] for x in tu.alignment])
-
 		src_size = float(len(tu.src_tokens))
 		trg_size = float(len(tu.trg_tokens))
 
 		if src_size == 0 or trg_size == 0:
 			return [0.0, 0.0]
 
-		last = -1
-		n = 0.0
-		smean = 0.0
-		for current in src_set:
-			if current - last > 1:
-				n += 1
-				smean += (current - last - 1)
-			last = current
-		if src_size - last > 1:
-			n += 1
-			smean += (src_size - last - 1)
-
-		smean /= max(n, 1.0)
+		src_runs = tu.feature('src_unaligned_runs')
+		smean = float(sum(src_runs)) / max(len(src_runs), 1)
 		if self.normalize:
 			smean = 1.0 - (min(smean, 4.0) / 4.0)
 
-		self.src_n += 1
-		self.src_sum += smean
-		self.src_sum_sq += smean * smean
-
-		last = -1
-		n = 0.0
-		tmean = 0.0
-		for current in trg_set:
-			if current - last > 1:
-				n += 1
-				tmean += (current - last - 1)
-			last = current
-		if trg_size - last > 1:
-			n += 1
-			tmean += (trg_size - last - 1)
+		self.src_stats.add(smean)
 
-		tmean /= max(n, 1.0)
+		trg_runs = tu.feature('trg_unaligned_runs')
+		tmean = float(sum(trg_runs)) / max(len(trg_runs), 1)
 
 		if self.normalize:
 			tmean = 1.0 - (min(tmean, 4.0) / 4.0)
 
-		self.trg_n += 1
-		self.trg_sum += tmean
-		self.trg_sum_sq += tmean * tmean
+		self.trg_stats.add(tmean)
 
-		self.src_scores.append(smean)
-		self.trg_scores.append(tmean)
+		self.src_scores.add(smean)
+		self.trg_scores.add(tmean)
 
 		return [smean, tmean]
 
@@ -179,40 +126,14 @@ class UnalignedSequenceLength(AbstractFilter):
 		pass
 
 	def decide(self, tu):
-		src_set = set([x[0] for x in tu.alignment])
-		trg_set = set([x[1] for x in tu.alignment])
 		src_size = float(len(tu.src_tokens))
 		trg_size = float(len(tu.trg_tokens))
 
-		n = 0.0
-		src_mean = 0.0
-		last = -1
-		for current in src_set:
-			if current - last > 1:
-				n += 1
-				src_mean += (current - last - 1)
-			last = current
-		if src_size - last > 1:
-			n += 1
-			src_mean += (src_size - last - 1)
-		if n < 1:
-			n = 1.0
-		src_mean /= n
-
-		n = 0.0
-		trg_mean = 0.0
-		last = -1
-		for current in trg_set:
-			if current - last > 1:
-				n += 1
-				trg_mean += (current - last - 1)
-			last = current
-		if trg_size - last > 1:
-			n += 1
-			trg_mean += (trg_size - last - 1)
-		if n < 1:
-			n = 1.0
-		trg_mean /= n
+		src_runs = tu.feature('src_unaligned_runs')
+		src_mean = float(sum(src_runs)) / max(len(src_runs), 1)
+
+		trg_runs = tu.feature('trg_unaligned_runs')
+		trg_mean = float(sum(trg_runs)) / max(len(trg_runs), 1)
 
 		if self.normalize:
 			src_mean = 1.0 - (min(src_mean, 4.0) / 4.0)
@@ -1,38 +1,32 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
-from collections import Counter
-from scipy.sparse import lil_matrix
-from scipy.spatial.distance import cosine
-from gensim.matutils import Sparse2Corpus
-from gensim.models import lsimodel
-import numpy as np
+from running_stats import RunningStats
 import os.path
 import math
 # from sklearn.decomposition import TruncatedSVD as SVD
 
+# scipy is imported in initialize(), when the filter is really used.
+cosine = None
+
 
 class WE_BestAlignScore(AbstractFilter):
+	# The shared word vectors are not kept in the checkpoints.
+	transient_attributes = ('embeddings',)
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('stats',)
+
 	def __init__(self):
 		self.var_mult = 2.0
 
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.min_count = 3
-		self.num_of_features = 100
 		self.thresh = 0.55
 
-		self.all_words = []
-		self.vocab = None
-		self.vectors = None
-		self.number_of_tus = 0
-
-		self.model_file_name = "models/vectors_"
-		self.dict_file_name = "models/dict_"
+		# The word vectors shared by all WE filters.
+		self.embeddings = None
 
-		self.n = 0.0
-		self.sum = 0.0
-		self.sum_sq = 0.0
+		self.stats = RunningStats()
 
 		self.mean = 0.0
 		self.var = 0.0
@@ -41,56 +35,30 @@ class WE_BestAlignScore(AbstractFilter):
 
 	#
 	def initialize(self, source_language, target_language, extra_args):
-		self.num_of_scans = 3
+		global cosine
+		from scipy.spatial.distance import cosine
+
+		self.num_of_scans = 1
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.stat_filename = "models/WE_BestAlignScore.stats"
-		if self.normalize:
-			self.stat_filename += "_n"
-
-		self.model_file_name += self.src_language + self.trg_language
-		self.dict_file_name += self.src_language + self.trg_language
-
-		if os.path.isfile(self.model_file_name):
-			print "Loading from file ..."
-			self.num_of_scans = 1
-
-			lsi = lsimodel.LsiModel.load(self.model_file_name)
-			self.vectors = lsi.projection.u
-
-			self.all_words = {}
-			f = open(self.dict_file_name, "rb")
 
-			for l in f:
-				l = l.strip().split("\t")
+		# The vectors are trained or loaded once by the embedding service and the same vectors are given to all WE filters.
+		self.embeddings = extra_args['services']('embeddings')
 
-				self.all_words[l[0]] = int(l[1])
-			f.close()
+		# The statistics learned in a previous run for the same languages, vectors and source of the alignments
+		# (see model_registry.py).
+		self.models = extra_args['model registry']
+		self.model_parameters = dict(self.embeddings.parameters())
+		self.model_parameters["alignment"] = extra_args.get('alignment source', {})
+		model = self.models.load("WE_BestAlignScore", self.src_language, self.trg_language, self.normalize, self.model_parameters)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
 
-		if os.path.isfile(self.stat_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.stat_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
-
-				l = f.readline().strip().split("\t")
-				self.mean = float(l[1])
-				self.var = float(l[2])
-
-				break
-
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+			self.mean = model['values']['mean']
+			self.var = model['values']['deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -100,140 +68,62 @@ class WE_BestAlignScore(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.num_of_scans == 1:
-			print "Loaded the model from file."
-		else:
-			print "Performing SVD..."
+		self.mean = self.stats.mean
+		self.var = self.stats.std()
 
-			# svd = SVD(n_components=self.num_of_features, random_state=42)
-			# x = svd.fit_transform(self.vectors)
-			# self.vectors = x
+		self.models.save("WE_BestAlignScore", self.src_language, self.trg_language, self.normalize,
+			self.model_parameters, values={"mean": self.mean, "deviation": self.var})
 
-			x = Sparse2Corpus(self.vectors)
-			lsi = lsimodel.LsiModel(corpus=x, id2word=None, num_topics=self.num_of_features)
-			lsi.save(self.model_file_name)
-			self.vectors = lsi.projection.u
+	def process_tu(self, tu, num_of_finished_scans):
+		if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
+			return [0]
 
-			print "done."
+		src_vectors = [v for v in tu.feature('src_vectors') if v is not None]
 
-		if self.n <= 1:
-			self.n = 2.0
-		self.mean = self.sum / self.n
-		self.var = (self.sum_sq - (self.sum * self.sum) / self.n) / (self.n - 1)
-		self.var = math.sqrt(self.var)
+		if len(src_vectors) == 0:
+			return [0]
 
-		f = open(self.stat_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
-		f.write("stats\t" + str(self.mean) + "\t" + str(self.var) + "\n")
-		f.close()
+		trg_vectors = [v for v in tu.feature('trg_vectors') if v is not None]
 
-	def process_tu(self, tu, num_of_finished_scans):
-		if (num_of_finished_scans == 0 and self.num_of_scans == 1) or num_of_finished_scans == 2:
-			if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
-				return [0]
-
-			index = 0
-			src_vectors = []
-			for w in tu.src_tokens:
-				if w in self.all_words:
-					index = self.all_words[w]
-					src_vectors.append(self.vectors[index])
-
-			if len(src_vectors) == 0:
-				return [0]
-
-			trg_vectors = []
-			for w in tu.trg_tokens:
-				if w in self.all_words:
-					index = self.all_words[w]
-					trg_vectors.append(self.vectors[index])
-
-			if len(trg_vectors) == 0:
-				return [0]
-
-			avg_distance = 0.0
-			min_src_dist = [1.0] * len(src_vectors)
-			min_trg_dist = [1.0] * len(trg_vectors)
-
-			i = 0
-			for s_w in src_vectors:
-				j = 0
-				for t_w in trg_vectors:
-					dist = cosine(s_w, t_w)
-
-					min_src_dist[i] = min(min_src_dist[i], dist)
-					min_trg_dist[j] = min(min_trg_dist[j], dist)
-					j += 1
-				i += 1
-
-			avg_distance += sum(min_src_dist) + sum(min_trg_dist)
-			avg_distance /= float(len(src_vectors) + len(trg_vectors))
-
-			self.n += 1
-			self.sum += avg_distance
-			self.sum_sq += avg_distance * avg_distance
-
-			return [avg_distance]
-
-		elif num_of_finished_scans == 0:
-			self.all_words += tu.src_tokens
-			self.all_words += tu.trg_tokens
-			self.number_of_tus += 1
-		else:
-			for w in tu.src_tokens + tu.trg_tokens:
-				if w in self.all_words:
-					self.vectors[self.all_words[w], self.number_of_tus] = 1
-
-			self.number_of_tus += 1
+		if len(trg_vectors) == 0:
+			return [0]
 
-	def do_after_a_full_scan(self, num_of_finished_scans):
-		if num_of_finished_scans == 1 and self.num_of_scans == 3:
-			self.vocab = Counter(self.all_words)
+		avg_distance = 0.0
+		min_src_dist = [1.0] * len(src_vectors)
+		min_trg_dist = [1.0] * len(trg_vectors)
+
+		i = 0
+		for s_w in src_vectors:
+			j = 0
+			for t_w in trg_vectors:
+				dist = cosine(s_w, t_w)
 
-			self.all_words = {}
-			for word in self.vocab:
-				if self.vocab[word] >= self.min_count:
-					# self.all_words.append(word)
-					self.all_words[word] = len(self.all_words)
+				min_src_dist[i] = min(min_src_dist[i], dist)
+				min_trg_dist[j] = min(min_trg_dist[j], dist)
+				j += 1
+			i += 1
 
-			# if self.num_of_scans == 2:
-			self.vectors = lil_matrix((len(self.all_words), self.number_of_tus), dtype=np.int8)
+		avg_distance += sum(min_src_dist) + sum(min_trg_dist)
+		avg_distance /= float(len(src_vectors) + len(trg_vectors))
 
-			print "-#-#-#-#-#-#-#-#-#-#-#-"
-			print "size of vocab:", len(self.vocab)
-			print "size of common words:", len(self.all_words)
-			print "number of TUs:", self.number_of_tus
-			self.number_of_tus = 0
+		self.stats.add(avg_distance)
 
-			f = open(self.dict_file_name, "wb")
+		return [avg_distance]
 
-			for w in self.all_words:
-				f.write(w + "\t" + str(self.all_words[w]) + "\n")
-			f.close()
-		else:
-			print "-#-#-#-#-#-#-#-#-#-#-#-"
+	def do_after_a_full_scan(self, num_of_finished_scans):
+		pass
 
 	#
 	def decide(self, tu):
 		if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
 			return 'reject'
 
-		index = 0
-		src_vectors = []
-		for w in tu.src_tokens:
-			if w in self.all_words:
-				index = self.all_words[w]
-				src_vectors.append(self.vectors[index])
+		src_vectors = [v for v in tu.feature('src_vectors') if v is not None]
 
 		if len(src_vectors) == 0:
 			return 'neutral'
 
-		trg_vectors = []
-		for w in tu.trg_tokens:
-			if w in self.all_words:
-				index = self.all_words[w]
-				trg_vectors.append(self.vectors[index])
+		trg_vectors = [v for v in tu.feature('trg_vectors') if v is not None]
 
 		if len(trg_vectors) == 0:
 			return 'neutral'
@@ -1,38 +1,33 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
-from collections import Counter
-from scipy.sparse import lil_matrix
-from scipy.spatial.distance import cosine
-from gensim.matutils import Sparse2Corpus
-from gensim.models import lsimodel
+from running_stats import RunningStats
 import numpy as np
 import os.path
 import math
 # from sklearn.decomposition import TruncatedSVD as SVD
 
+# scipy is imported in initialize(), when the filter is really used.
+cosine = None
+
 
 class WE_Median(AbstractFilter):
+	# The shared word vectors are not kept in the checkpoints.
+	transient_attributes = ('embeddings',)
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('stats',)
+
 	def __init__(self):
 		self.var_mult = 2.0
 
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.min_count = 3
-		self.num_of_features = 100
 		self.thresh = 0.80
 
-		self.all_words = []
-		self.vocab = None
-		self.vectors = None
-		self.number_of_tus = 0
+		# The word vectors shared by all WE filters.
+		self.embeddings = None
 
-		self.model_file_name = "models/vectors_"
-		self.dict_file_name = "models/dict_"
-
-		self.n = 0.0
-		self.sum = 0.0
-		self.sum_sq = 0.0
+		self.stats = RunningStats()
 
 		self.mean = 0.0
 		self.var = 0.0
@@ -41,56 +36,27 @@ class WE_Median(AbstractFilter):
 
 	#
 	def initialize(self, source_language, target_language, extra_args):
-		self.num_of_scans = 3
+		global cosine
+		from scipy.spatial.distance import cosine
+
+		self.num_of_scans = 1
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.stat_filename = "models/WE_Median.stats"
-		if self.normalize:
-			self.stat_filename += "_n"
-
-		self.model_file_name += self.src_language + self.trg_language
-		self.dict_file_name += self.src_language + self.trg_language
-
-		if os.path.isfile(self.model_file_name):
-			print "Loading from file ..."
-			self.num_of_scans = 1
-
-			lsi = lsimodel.LsiModel.load(self.model_file_name)
-			self.vectors = lsi.projection.u
 
-			self.all_words = {}
-			f = open(self.dict_file_name, "rb")
+		# The vectors are trained or loaded once by the embedding service and the same vectors are given to all WE filters.
+		self.embeddings = extra_args['services']('embeddings')
 
-			for l in f:
-				l = l.strip().split("\t")
+		# The statistics learned in a previous run for the same languages (see model_registry.py).
+		self.models = extra_args['model registry']
+		model = self.models.load("WE_Median", self.src_language, self.trg_language, self.normalize, self.embeddings.parameters())
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
 
-				self.all_words[l[0]] = int(l[1])
-			f.close()
-
-		if os.path.isfile(self.stat_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.stat_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
-
-				l = f.readline().strip().split("\t")
-				self.mean = float(l[1])
-				self.var = float(l[2])
-
-				break
-
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+			self.mean = model['values']['mean']
+			self.var = model['values']['deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -100,125 +66,49 @@ class WE_Median(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.num_of_scans == 1:
-			print "Loaded the model from file."
-		else:
-			print "Performing SVD..."
-
-			# svd = SVD(n_components=self.num_of_features, random_state=42)
-			# x = svd.fit_transform(self.vectors)
-			# self.vectors = x
+		self.mean = self.stats.mean
+		self.var = self.stats.std()
 
-			x = Sparse2Corpus(self.vectors)
-			lsi = lsimodel.LsiModel(corpus=x, id2word=None, num_topics=self.num_of_features)
-			lsi.save(self.model_file_name)
-			self.vectors = lsi.projection.u
-
-			print "done."
-
-		if self.n <= 1:
-			self.n = 2.0
-		self.mean = self.sum / self.n
-		self.var = (self.sum_sq - (self.sum * self.sum) / self.n) / (self.n - 1)
-		self.var = math.sqrt(self.var)
-
-		f = open(self.stat_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
-		f.write("stats\t" + str(self.mean) + "\t" + str(self.var) + "\n")
-		f.close()
+		self.models.save("WE_Median", self.src_language, self.trg_language, self.normalize,
+			self.embeddings.parameters(), values={"mean": self.mean, "deviation": self.var})
 
 	def process_tu(self, tu, num_of_finished_scans):
-		if (num_of_finished_scans == 0 and self.num_of_scans == 1) or num_of_finished_scans == 2:
-			if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
-				return [0]
-
-			src_vectors = []
-			for w in tu.src_tokens:
-				if w in self.all_words:
-					index = self.all_words[w]
-					src_vectors.append(self.vectors[index])
-
-			if len(src_vectors) == 0:
-				return [0]
-			src_rep = np.sum(src_vectors, axis=0)
+		if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
+			return [0]
 
-			trg_vectors = []
-			for w in tu.trg_tokens:
-				if w in self.all_words:
-					index = self.all_words[w]
-					trg_vectors.append(self.vectors[index])
+		src_vectors = [v for v in tu.feature('src_vectors') if v is not None]
 
-			if len(trg_vectors) == 0:
-				return [0]
-			trg_rep = np.sum(trg_vectors, axis=0)
+		if len(src_vectors) == 0:
+			return [0]
+		src_rep = np.sum(src_vectors, axis=0)
 
-			distance = cosine(src_rep, trg_rep)
+		trg_vectors = [v for v in tu.feature('trg_vectors') if v is not None]
 
-			self.n += 1
-			self.sum += distance
-			self.sum_sq += distance * distance
+		if len(trg_vectors) == 0:
+			return [0]
+		trg_rep = np.sum(trg_vectors, axis=0)
 
-			return [distance]
+		distance = cosine(src_rep, trg_rep)
 
-		elif num_of_finished_scans == 0:
-			self.all_words += tu.src_tokens
-			self.all_words += tu.trg_tokens
-			self.number_of_tus += 1
-		else:
-			for w in tu.src_tokens + tu.trg_tokens:
-				if w in self.all_words:
-					self.vectors[self.all_words[w], self.number_of_tus] = 1
+		self.stats.add(distance)
 
-			self.number_of_tus += 1
+		return [distance]
 
 	def do_after_a_full_scan(self, num_of_finished_scans):
-		if num_of_finished_scans == 1 and self.num_of_scans == 3:
-			self.vocab = Counter(self.all_words)
-
-			self.all_words = {}
-			for word in self.vocab:
-				if self.vocab[word] >= self.min_count:
-					# self.all_words.append(word)
-					self.all_words[word] = len(self.all_words)
-
-			# if self.num_of_scans == 2:
-			self.vectors = lil_matrix((len(self.all_words), self.number_of_tus), dtype=np.float64)
-
-			print "-#-#-#-#-#-#-#-#-#-#-#-"
-			print "size of vocab:", len(self.vocab)
-			print "size of common words:", len(self.all_words)
-			print "number of TUs:", self.number_of_tus
-			self.number_of_tus = 0
-
-			f = open(self.dict_file_name, "wb")
-
-			for w in self.all_words:
-				f.write(w + "\t" + str(self.all_words[w]) + "\n")
-			f.close()
-		else:
-			print "-#-#-#-#-#-#-#-#-#-#-#-"
+		pass
 
 	#
 	def decide(self, tu):
 		if len(tu.src_phrase) == 0 or len(tu.trg_phrase) == 0:
 			return 'reject'
 
-		src_vectors = []
-		for w in tu.src_tokens:
-			if w in self.all_words:
-				index = self.all_words[w]
-				src_vectors.append(self.vectors[index])
+		src_vectors = [v for v in tu.feature('src_vectors') if v is not None]
 
 		if len(src_vectors) == 0:
 			return 'neutral'
 		src_rep = np.median(src_vectors, axis=0)
 
-		trg_vectors = []
-		for w in tu.trg_tokens:
-			if w in self.all_words:
-				index = self.all_words[w]
-				trg_vectors.append(self.vectors[index])
+		trg_vectors = [v for v in tu.feature('trg_vectors') if v is not None]
 
 		if len(trg_vectors) == 0:
 			return 'neutral'
@@ -1,11 +1,14 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from quantile_sketch import QuantileSketch, DEFAULT_SKETCH_SIZE
+from running_stats import RunningStats
 import os.path
-import math
-import numpy as np
 
 
 class WordLength(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('src_stats', 'trg_stats', 'src_scores', 'trg_scores')
+
 	def __init__(self):
 		self.var_mult = 2
 
@@ -15,20 +18,16 @@ class WordLength(AbstractFilter):
 
 		self.tokenizer = None
 
-		self.src_n = 0.0
-		self.src_sum = 0.0
-		self.src_sum_sq = 0.0
-		self.trg_n = 0.0
-		self.trg_sum = 0.0
-		self.trg_sum_sq = 0.0
+		self.src_stats = RunningStats()
+		self.trg_stats = RunningStats()
 
 		self.src_mean = 0.0
 		self.src_var = 0.0
 		self.trg_mean = 0.0
 		self.trg_var = 0.0
 
-		self.src_scores = []
-		self.trg_scores = []
+		self.src_scores = QuantileSketch()
+		self.trg_scores = QuantileSketch()
 		self.s_thresh = 0.0
 		self.t_thresh = 0.0
 
@@ -40,37 +39,24 @@ class WordLength(AbstractFilter):
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.model_filename = "models/WordLength.stats"
-		if self.normalize:
-			self.model_filename += "_n"
-
-		if os.path.isfile(self.model_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.model_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
-
-				l = f.readline().strip().split("\t")
-				self.src_mean = float(l[1])
-				self.src_var = float(l[2])
 
-				l = f.readline().strip().split("\t")
-				self.trg_mean = float(l[1])
-				self.trg_var = float(l[2])
+		# The scores are kept in sketches for their percentiles.
+		sketch_size = extra_args.get('quantile sketch size', DEFAULT_SKETCH_SIZE)
+		self.src_scores = QuantileSketch(sketch_size)
+		self.trg_scores = QuantileSketch(sketch_size)
 
-				break
+		# The statistics learned in a previous run for the same languages (see model_registry.py).
+		self.models = extra_args['model registry']
+		model = self.models.load("WordLength", self.src_language, self.trg_language, self.normalize)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
 
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+			self.src_mean = model['values']['source mean']
+			self.src_var = model['values']['source deviation']
+			self.trg_mean = model['values']['target mean']
+			self.trg_var = model['values']['target deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -80,29 +66,18 @@ class WordLength(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.src_n == 0:
-			self.src_n += 2.0
-		self.src_mean = self.src_sum / self.src_n
-		self.src_var = (self.src_sum_sq - (self.src_sum * self.src_sum) / self.src_n) / (self.src_n - 1)
-		self.src_var = math.sqrt(self.src_var)
+		self.src_mean = self.src_stats.mean
+		self.src_var = self.src_stats.std()
 
-		if self.trg_n == 0:
-			self.trg_n += 2.0
-		self.trg_mean = self.trg_sum / self.trg_n
-		self.trg_var = (self.trg_sum_sq - (self.trg_sum * self.trg_sum) / self.trg_n) / (self.trg_n - 1)
-		self.trg_var = math.sqrt(self.trg_var)
+		self.trg_mean = self.trg_stats.mean
+		self.trg_var = self.trg_stats.std()
 
-		f = open(self.model_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
+		self.models.save("WordLength", self.src_language, self.trg_language, self.normalize, values={
+			"source mean": self.src_mean, "source deviation": self.src_var,
+			"target mean": self.trg_mean, "target deviation": self.trg_var})
 
-		f.write("source\t" + str(self.src_mean) + "\t" + str(self.src_var) + "\n")
-		f.write("target\t" + str(self.trg_mean) + "\t" + str(self.trg_var) + "\n")
-
-		f.close()
-
-		self.s_thresh = np.percentile(self.src_scores, self.var_mult)
-		self.t_thresh = np.percentile(self.trg_scores, self.var_mult)
+		self.s_thresh = self.src_scores.percentile(self.var_mult)
+		self.t_thresh = self.trg_scores.percentile(self.var_mult)
 
 	#
 	def process_tu(self, tu, num_of_finished_scans):
@@ -127,18 +102,12 @@ class WordLength(AbstractFilter):
 			return [1]
 
 		for word in tu.src_tokens:
-			self.src_n += 1
-			self.src_sum += len(word)
-			self.src_sum_sq += len(word) * len(word)
-
-			self.src_scores.append(len(word))
+			self.src_stats.add(len(word))
+			self.src_scores.add(len(word))
 
 		for word in tu.trg_tokens:
-			self.trg_n += 1
-			self.trg_sum += len(word)
-			self.trg_sum_sq += len(word) * len(word)
-
-			self.trg_scores.append(len(word))
+			self.trg_stats.add(len(word))
+			self.trg_scores.add(len(word))
 
 
 	def do_after_a_full_scan(self, num_of_finished_scans):
@@ -1,11 +1,15 @@
 # sys.path.append(os.getcwd() + '/..') # Uncomment for standalone running
 from abstract_filter import *
+from quantile_sketch import QuantileSketch, DEFAULT_SKETCH_SIZE
+from running_stats import RunningStats
 import os.path
-import math
 import numpy as np
 
 
 class WordRatio(AbstractFilter):
+	# What the filter learns in the scan (see AbstractFilter.statistics).
+	statistics = ('stats', 'scores')
+
 	def __init__(self):
 		self.var_mult = 2
 
@@ -13,14 +17,12 @@ class WordRatio(AbstractFilter):
 		self.src_language = ""
 		self.trg_language = ""
 
-		self.n = 0.0
-		self.sum = 0.0
-		self.sum_sq = 0.0
+		self.stats = RunningStats()
 
 		self.mean = 0.0
 		self.var = 0.0
 
-		self.scores = []
+		self.scores = QuantileSketch()
 		self.thresh = 0.0
 
 		self.model_exist = False
@@ -30,33 +32,21 @@ class WordRatio(AbstractFilter):
 		self.src_language = extra_args['source language']
 		self.trg_language = extra_args['target language']
 		self.normalize = extra_args['normalize scores']
-		self.model_filename = "models/WordRatio.stats"
-		if self.normalize:
-			self.model_filename += "_n"
-
-		if os.path.isfile(self.model_filename):
-			lang_pair = self.src_language + self.trg_language
-			f = open(self.model_filename, 'r')
-
-			l = f.readline()
-			while l:
-				if lang_pair not in l:
-					l = f.readline()
-					continue
-
-				# found the statistics
-				self.model_exist = True
-				self.num_of_scans = 0
 
-				l = f.readline().strip().split("\t")
-				self.mean = float(l[1])
-				self.var = float(l[2])
+		# The scores are kept in sketches for their percentiles.
+		sketch_size = extra_args.get('quantile sketch size', DEFAULT_SKETCH_SIZE)
+		self.scores = QuantileSketch(sketch_size)
 
-				break
+		# The statistics learned in a previous run for the same languages (see model_registry.py).
+		self.models = extra_args['model registry']
+		model = self.models.load("WordRatio", self.src_language, self.trg_language, self.normalize)
+		if model is not None:
+			self.model_exist = True
+			self.num_of_scans = 0
 
-			f.close()
-			if self.model_exist:
-				print "Loaded stats from the model file."
+			self.mean = model['values']['mean']
+			self.var = model['values']['deviation']
+			print "Loaded stats from the model file."
 
 		if extra_args['emit scores'] == True:
 			self.num_of_scans = 1
@@ -66,26 +56,20 @@ class WordRatio(AbstractFilter):
 		if self.model_exist:
 			return
 
-		if self.n == 0:
-			self.n += 2.0
-		self.mean = self.sum / self.n
-		self.var = (self.sum_sq - (self.sum * self.sum) / self.n) / (self.n - 1)
-		self.var = math.sqrt(self.var)
+		self.mean = self.stats.mean
+		self.var = self.stats.std()
 
-		f = open(self.model_filename, 'a')
-		lang_pair = self.src_language + self.trg_language
-		f.write("\n" + lang_pair + "\n")
-		f.write("source\t" + str(self.mean) + "\t" + str(self.var) + "\n")
-		f.close()
+		self.models.save("WordRatio", self.src_language, self.trg_language, self.normalize, values={
+			"mean": self.mean, "deviation": self.var})
 
-		self.thresh = np.percentile(self.scores, self.var_mult)
+		self.thresh = self.scores.percentile(self.var_mult)
 
 		f = open("quartiles", "a")
 
 		f.write("WordRatio")
-		f.write("\t" + str(np.percentile(self.scores, 25)))
-		f.write("\t" + str(np.percentile(self.scores, 50)))
-		f.write("\t" + str(np.percentile(self.scores, 75)))
+		f.write("\t" + str(self.scores.percentile(25)))
+		f.write("\t" + str(self.scores.percentile(50)))
+		f.write("\t" + str(self.scores.percentile(75)))
 
 		f.write("\n")
 
@@ -100,11 +84,9 @@ class WordRatio(AbstractFilter):
 			ratio = min(ratio, 3.0)
 			ratio = 1.0 - (abs(1.0 - ratio) / 2.0)
 
-		self.n += 1
-		self.sum += ratio
-		self.sum_sq += ratio * ratio
+		self.stats.add(ratio)
 
-		self.scores.append(ratio)
+		self.scores.add(ratio)
 
 		return [ratio]
 
@@ -129,3 +111,36 @@ class WordRatio(AbstractFilter):
 		# if ratio <= self.thresh:
 			return 'accept'
 		return 'reject'
+
+	def batch_ratios(self, tus):
+		"""
+		Computes the ratios of a batch of TUs at once, with the same arithmetic as process_tu() and decide().
+
+		@rtype: tuple
+		@return: returns the ratios and a mask of the TUs which have tokens on both sides.
+		"""
+		src_sizes = np.array([len(tu.src_tokens) for tu in tus], dtype=np.float64)
+		trg_sizes = np.array([len(tu.trg_tokens) for tu in tus], dtype=np.float64)
+		ratios = src_sizes / np.maximum(trg_sizes, 1.0)
+
+		if self.normalize:
+			ratios = np.minimum(ratios, 3.0)
+			ratios = 1.0 - (np.abs(1.0 - ratios) / 2.0)
+
+		return ratios, (src_sizes != 0) & (trg_sizes != 0)
+
+	def process_batch(self, tus, num_of_finished_scans):
+		ratios = self.batch_ratios(tus)[0]
+
+		self.stats.extend(ratios)
+
+		ratios = ratios.tolist()
+		self.scores.extend(ratios)
+
+		return [[ratio] for ratio in ratios]
+
+	def decide_batch(self, tus):
+		ratios, not_empty = self.batch_ratios(tus)
+
+		accepted = not_empty & (np.abs(ratios - self.mean) <= self.var_mult * self.var)
+		return ['accept' if x else 'reject' for x in accepted.tolist()]
@@ -33,17 +33,106 @@ or implied, of the copyright holder.
 """
 
 class TU(object):
+	"""
+	A Translation Unit with the source and the target phrases, their tokens and the alignment between the tokens.
+	The tokens and the alignment are kept in tuples and the attributes can't be changed after making the object,
+	so the same object is given to all filters.
+	The values derived from the TU which are used by several filters could be asked with the feature() function.
+	"""
 	# src_language = ""
 	# trg_language = ""
 
-	def __init__(self):
-		self.src_phrase = ""
-		self.trg_phrase = ""
+	__slots__ = ('src_phrase', 'trg_phrase', 'src_tokens', 'trg_tokens', 'alignment', '_features')
+
+	def __init__(self, src_phrase=u"", trg_phrase=u"", src_tokens=(), trg_tokens=(), alignment=()):
+		object.__setattr__(self, 'src_phrase', src_phrase)
+		object.__setattr__(self, 'trg_phrase', trg_phrase)
+
+		object.__setattr__(self, 'src_tokens', tuple(src_tokens))
+		object.__setattr__(self, 'trg_tokens', tuple(trg_tokens))
+
+		# The alignment is a tuple of (source index, target index) pairs.
+		object.__setattr__(self, 'alignment', tuple(alignment))
+
+		# The derived features which are computed until now.
+		object.__setattr__(self, '_features', {})
+
+	def feature(self, name):
+		"""
+		Returns a derived feature of the TU (see TU_FEATURES).
+		The feature is computed the first time it is asked and the same value is returned for the other filters.
+
+		@type name: str
+		@param name: The name of the feature, e.g. 'src_unaligned'.
+		"""
+		try:
+			return self._features[name]
+		except KeyError:
+			value = TU_FEATURES[name](self)
+			self._features[name] = value
+			return value
+
+	def __setattr__(self, name, value):
+		raise AttributeError("The attributes of a TU can't be changed.")
+
+	def __delattr__(self, name):
+		raise AttributeError("The attributes of a TU can't be deleted.")
+
+	# There is no need to copy an immutable object.
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
 
-		self.src_tokens = []
-		self.trg_tokens = []
+	def __reduce__(self):
+		return TU, (self.src_phrase, self.trg_phrase, self.src_tokens, self.trg_tokens, self.alignment)
 
-		self.alignment = []
+
+def alignment_runs(positions, size):
+	"""
+	Finds the lengths of the runs of positions between the given positions, including the run before the first one
+	and the run after the last one.
+
+	@type positions: tuple
+	@param positions: The sorted positions which end the runs.
+
+	@type size: int
+	@param size: The number of tokens.
+
+	@rtype: tuple
+	@return: returns the lengths of the runs which are not empty.
+	"""
+	runs = []
+	last = -1
+	for current in positions:
+		if current - last > 1:
+			runs.append(current - last - 1)
+		last = current
+	if size - last > 1:
+		runs.append(size - last - 1)
+	return tuple(runs)
+
+
+# The derived features of the TUs. The values are tuples which shouldn't be changed by the filters.
+#	src_aligned, trg_aligned:			the sorted positions of the tokens which are in the alignment.
+#	src_unaligned, trg_unaligned:		the sorted positions of the tokens which are not in the alignment.
+#	src_aligned_runs, trg_aligned_runs:	the lengths of the sequences of aligned tokens.
+#	src_unaligned_runs, trg_unaligned_runs:	the lengths of the sequences of unaligned tokens.
+# New features could be added to this dictionary. Each one is a function which gets the TU and returns the value.
+TU_FEATURES = {
+	'src_aligned': lambda tu: tuple(sorted(set([x[0] for x in tu.alignment]))),
+	'trg_aligned': lambda tu: tuple(sorted(set([x[1] for x in tu.alignment]))),
+
+	'src_unaligned': lambda tu: tuple(sorted(set(range(len(tu.src_tokens))) - set(tu.feature('src_aligned')))),
+	'trg_unaligned': lambda tu: tuple(sorted(set(range(len(tu.trg_tokens))) - set(tu.feature('trg_aligned')))),
+
+	'src_aligned_runs': lambda tu: alignment_runs(tu.feature('src_unaligned'), len(tu.src_tokens)),
+	'trg_aligned_runs': lambda tu: alignment_runs(tu.feature('trg_unaligned'), len(tu.trg_tokens)),
+
+	'src_unaligned_runs': lambda tu: alignment_runs(tu.feature('src_aligned'), len(tu.src_tokens)),
+	'trg_unaligned_runs': lambda tu: alignment_runs(tu.feature('trg_aligned'), len(tu.trg_tokens)),
+}
 
 
 def pass_by_value_decorator(old_f):
@@ -64,6 +153,15 @@ class AbstractFilter:
 	# It should be defined in the initialize() function and changing the value after the initialization has no effect.
 	num_of_scans = 0
 
+	# The attributes which are not kept in the checkpoints, e.g. the shared services (see get_state()).
+	transient_attributes = ()
+
+	# The attributes which keep what the filter learns in the scans, if they could be merged (e.g. RunningStats and
+	# QuantileSketch objects). If all things learned by the filter are in these attributes, the scans could be
+	# split between several processes and the statistics of the parts are merged (see merge_statistics()).
+	# An empty tuple means the filter learns nothing in the scans and None means the scans could not be split.
+	statistics = None
+
 	def __init__(self):
 		"""
 		"""
@@ -102,7 +200,7 @@ class AbstractFilter:
 		@param num_of_finished_scans: The number of scans through the dataset that are finished until now.
 
 		@type tu: TU
-		@param tu: A Translation Unit with the source and the target phrase
+		@param tu: A Translation Unit with the source and the target phrase. The same object is given to all filters.
 		"""
 		pass
 
@@ -125,10 +223,92 @@ class AbstractFilter:
 		it should return 'accept', 'reject' or 'neutral'.
 
 		@type tu: TU
-		@param tu: A Translation Unit with the source and the target phrase
+		@param tu: A Translation Unit with the source and the target phrase. The same object is given to all filters.
 
 		@rtype: str
 		@return: returns the decision from 'accept', 'reject' and 'neutral'.
 		"""
 
 		return 'accept'
+
+	def process_batch(self, tus, num_of_finished_scans):
+		"""
+		The manager gives the TUs to the filters in batches (see the 'batch size' option) by calling this function.
+		By default process_tu() is called for each TU. The filters which could process the whole batch at once
+		(e.g. with NumPy) could override it.
+
+		@type tus: list
+		@param tus: The translation units of the batch, in the order of the input.
+
+		@type num_of_finished_scans: int
+		@param num_of_finished_scans: The number of scans through the dataset that are finished until now.
+
+		@rtype: list
+		@return: returns the result of process_tu() for each TU. If a TU could not be processed, its result is the
+		exception, so the other TUs of the batch are not lost.
+		"""
+		results = []
+		for tu in tus:
+			try:
+				results.append(self.process_tu(tu, num_of_finished_scans))
+			except Exception, e:
+				results.append(e)
+		return results
+
+	def decide_batch(self, tus):
+		"""
+		In the decision process this function is called for each batch of translation units.
+		By default decide() is called for each TU.
+
+		@type tus: list
+		@param tus: The translation units of the batch, in the order of the input.
+
+		@rtype: list
+		@return: returns the decision for each TU.
+		"""
+		return [self.decide(tu) for tu in tus]
+
+	def get_state(self):
+		"""
+		Returns the state of the filter for the checkpoints of the manager. The state is pickled in the checkpoint
+		and given to set_state() when the run is resumed. By default it has all attributes of the filter except
+		the transient attributes. The filters with attributes which could not be pickled should override it.
+
+		@rtype: dict
+		@return: returns the state of the filter.
+		"""
+		return dict((k, v) for k, v in self.__dict__.iteritems() if k not in self.transient_attributes)
+
+	def set_state(self, state):
+		"""
+		Restores the state given by get_state() in a resumed run. It is called after initialize(), so the
+		transient attributes are already set.
+
+		@type state: dict
+		@param state: The state of the filter at the checkpoint.
+		"""
+		self.__dict__.update(state)
+
+	def clear_statistics(self):
+		"""
+		Replaces the statistics of the filter with empty ones, e.g. in a worker process before a part of a scan.
+		"""
+		for name in self.statistics or ():
+			setattr(self, name, getattr(self, name).empty())
+
+	def get_statistics(self):
+		"""
+		@rtype: dict
+		@return: returns the statistics of the filter. The keys are the names of the attributes.
+		"""
+		return dict((name, getattr(self, name)) for name in self.statistics or ())
+
+	def merge_statistics(self, statistics):
+		"""
+		Adds the statistics learned by another copy of the filter from another part of the scan.
+
+		@type statistics: dict
+		@param statistics: The statistics given by get_statistics() of the other copy.
+		"""
+		for name in self.statistics or ():
+			getattr(self, name).merge(statistics[name])
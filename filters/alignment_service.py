@@ -0,0 +1,371 @@
+from array import array
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The number of TUs aligned at once. The candidate pairs of the tokens of a block are kept in memory together.
+BLOCK_SIZE = 500
+
+# The probability of the pairs of words which are not in the table, e.g. the words which are not seen in the training.
+MIN_PROBABILITY = 1e-7
+
+
+def to_numpy(values):
+	# An array of int32 numbers without copying it, as int64 numbers for the keys of the pairs.
+	if len(values) == 0:
+		return np.zeros(0, dtype=np.int64)
+	return np.frombuffer(values, dtype=np.int32).astype(np.int64)
+
+
+def word_key(word):
+	# The words are kept as UTF-8 strings, so the tokens of the token file and of the tokenizer find the same words.
+	if type(word) == unicode:
+		return word.encode("utf-8")
+	return word
+
+
+class AlignmentService(object):
+	"""
+	Word alignments of the TUs, used instead of the align file when there is none and the 'aligner' option is set.
+	The probabilities of the target words given the source words are trained with EM over the TUs of the input file,
+	like IBM Model 1. With the 'fast_align' model, the source positions near the diagonal are preferred, like in
+	fast_align (with a fixed tension). Each target token is aligned to its most probable source token, or to none of
+	them if the empty word is more probable.
+
+	The words are given integer IDs and the probabilities are kept in a sparse table of the pairs of source and target
+	words which occur in the same TUs. The EM steps are done with NumPy over blocks of TUs. The table is saved in the
+	model registry, so the next runs for the same languages don't train it again.
+
+	The service needs one scan through the input file for reading the TUs as word IDs. The EM iterations are done in
+	memory after the scan.
+	"""
+
+	def __init__(self):
+		self.model = "ibm1"
+		self.iterations = 5
+		self.diagonal_tension = 4.0
+		self.null_probability = 0.08
+
+		self.num_of_scans = 0
+		self.src_language = ""
+		self.trg_language = ""
+		# The registry of the models, where the table and the words are kept for the next runs.
+		self.models = None
+
+		# The IDs of the words. The source ID 0 is the empty word.
+		self.src_ids = {"": 0}
+		self.trg_ids = {}
+
+		# The TUs of the input file as word IDs, kept until the table is trained.
+		self.src_corpus = array('i')
+		self.trg_corpus = array('i')
+		self.src_lengths = array('i')
+		self.trg_lengths = array('i')
+
+		# The sorted keys of the pairs (source ID * number of target words + target ID) and their probabilities.
+		self.num_of_trg_words = 0
+		self.pair_keys = None
+		self.probabilities = None
+
+	def initialize(self, source_language, target_language, extra_args):
+		self.src_language = extra_args['source language']
+		self.trg_language = extra_args['target language']
+		self.model = extra_args.get('aligner', self.model)
+		self.iterations = extra_args.get('aligner iterations', self.iterations)
+
+		self.models = extra_args['model registry']
+		model = self.models.load("alignment", self.src_language, self.trg_language, False, self.parameters())
+		if model is not None:
+			print "Loading the alignment table from file ..."
+
+			table = np.load(model['files']['table'])
+			self.set_table(table['keys'], table['probabilities'])
+
+			self.src_ids = self.read_words(model['files']['source words'])
+			self.trg_ids = self.read_words(model['files']['target words'])
+			self.num_of_trg_words = len(self.trg_ids)
+		else:
+			self.num_of_scans = 1
+
+	def process_tu(self, tu, num_of_finished_scans):
+		if len(tu.src_tokens) == 0 or len(tu.trg_tokens) == 0:
+			return
+
+		src_ids = self.src_ids
+		trg_ids = self.trg_ids
+		for w in tu.src_tokens:
+			w = word_key(w)
+			if w not in src_ids:
+				src_ids[w] = len(src_ids)
+			self.src_corpus.append(src_ids[w])
+		for w in tu.trg_tokens:
+			w = word_key(w)
+			if w not in trg_ids:
+				trg_ids[w] = len(trg_ids)
+			self.trg_corpus.append(trg_ids[w])
+
+		self.src_lengths.append(len(tu.src_tokens))
+		self.trg_lengths.append(len(tu.trg_tokens))
+
+	def do_after_a_full_scan(self, num_of_finished_scans):
+		print "Training the alignment table..."
+		self.num_of_trg_words = len(self.trg_ids)
+
+		src_lengths = to_numpy(self.src_lengths)
+		trg_lengths = to_numpy(self.trg_lengths)
+		blocks = list(self.iter_blocks(to_numpy(self.src_corpus), to_numpy(self.trg_corpus), src_lengths, trg_lengths))
+
+		# The table has all pairs of the words in the same TUs. The first probabilities are the same for all pairs.
+		# The pairs of the blocks are merged with the table when they are as many as the pairs of the table.
+		pair_keys = np.zeros(0, dtype=np.int64)
+		block_keys = []
+		for block in blocks:
+			block_keys.append(np.unique(self.candidates(*block)[0]))
+			if sum(len(x) for x in block_keys) >= len(pair_keys):
+				pair_keys = np.unique(np.concatenate([pair_keys] + block_keys))
+				block_keys = []
+		pair_keys = np.unique(np.concatenate([pair_keys] + block_keys))
+		probabilities = np.ones(len(pair_keys)) / max(self.num_of_trg_words, 1)
+		src_of_pairs = pair_keys // max(self.num_of_trg_words, 1)
+
+		print "number of TUs:", len(src_lengths)
+		print "number of source and target words:", len(self.src_ids) - 1, len(self.trg_ids)
+		print "number of word pairs:", len(pair_keys)
+
+		for iteration in range(self.iterations):
+			# Expectation: the probability of each candidate source token of each target token.
+			counts = np.zeros(len(pair_keys))
+			log_likelihood = 0.0
+			for block in blocks:
+				keys, tokens, positions, priors = self.candidates(*block)
+				pairs = np.searchsorted(pair_keys, keys)
+				scores = probabilities[pairs] * priors
+
+				totals = np.bincount(tokens, weights=scores)
+				counts += np.bincount(pairs, weights=scores / totals[tokens], minlength=len(pair_keys))
+				log_likelihood += np.log(totals).sum()
+
+			# Maximization: the probabilities of the target words given each source word.
+			totals = np.bincount(src_of_pairs, weights=counts)
+			probabilities = counts / totals[src_of_pairs]
+
+			print "iteration", iteration + 1, "- log-likelihood:", log_likelihood
+
+		self.set_table(pair_keys, probabilities.astype(np.float32))
+		self.src_corpus = array('i')
+		self.trg_corpus = array('i')
+		self.src_lengths = array('i')
+		self.trg_lengths = array('i')
+
+		table_file_name = self.models.artifact_file_name("alignment", self.src_language, self.trg_language, False,
+			self.parameters(), "table")
+		# numpy adds the extension if the name has not it.
+		table_file_name += ".npz"
+		np.savez(table_file_name, keys=self.pair_keys, probabilities=self.probabilities)
+
+		words_file_names = {}
+		for name, ids in [("source words", self.src_ids), ("target words", self.trg_ids)]:
+			words_file_names[name] = self.models.artifact_file_name("alignment", self.src_language, self.trg_language,
+				False, self.parameters(), name.replace(" ", "_"))
+			self.write_words(words_file_names[name], ids)
+
+		# The model is saved in the registry after its files, so a model in the registry always has its files.
+		files = {"table": table_file_name}
+		files.update(words_file_names)
+		self.models.save("alignment", self.src_language, self.trg_language, False, self.parameters(),
+			values={"pairs": len(self.pair_keys)}, files=files)
+
+		print "done."
+
+	def get_state(self):
+		"""
+		Returns the state of the service for the checkpoints of the manager (see AbstractFilter.get_state()).
+		The table and the words are saved in the models folder as soon as they are trained and initialize() loads
+		them again, so they are not kept in the state.
+		"""
+		state = dict(self.__dict__)
+		if self.is_ready():
+			for name in ['pair_keys', 'probabilities', 'src_ids', 'trg_ids']:
+				del state[name]
+		return state
+
+	def set_state(self, state):
+		self.__dict__.update(state)
+
+	def parameters(self):
+		"""
+		Returns the parameters which change the table. They are in the key of the model (see model_registry.py).
+		"""
+		return {"model": self.model, "iterations": self.iterations, "tension": self.diagonal_tension,
+			"null probability": self.null_probability}
+
+	def is_ready(self):
+		return self.pair_keys is not None
+
+	def set_table(self, pair_keys, probabilities):
+		self.pair_keys = pair_keys
+		self.probabilities = probabilities
+		# The same arrays are shared by the worker processes.
+		self.pair_keys.setflags(write=False)
+		self.probabilities.setflags(write=False)
+
+	@staticmethod
+	def read_words(file_name):
+		# The words are in the order of their IDs, one in each line.
+		ids = {}
+		f = open(file_name, "rb")
+		for l in f:
+			ids[l[:-1]] = len(ids)
+		f.close()
+		return ids
+
+	@staticmethod
+	def write_words(file_name, ids):
+		f = open(file_name, "wb")
+		for w in sorted(ids, key=ids.get):
+			f.write(w + "\n")
+		f.close()
+
+	@staticmethod
+	def iter_blocks(src_corpus, trg_corpus, src_lengths, trg_lengths):
+		"""
+		Splits the TUs into blocks of BLOCK_SIZE TUs.
+
+		@rtype: generator
+		@return: yields tuples of the form (source IDs, target IDs, source lengths, target lengths) of the blocks.
+		"""
+		src_ends = np.cumsum(src_lengths)
+		trg_ends = np.cumsum(trg_lengths)
+		for start in xrange(0, len(src_lengths), BLOCK_SIZE):
+			end = min(start + BLOCK_SIZE, len(src_lengths))
+			src_start = src_ends[start - 1] if start > 0 else 0
+			trg_start = trg_ends[start - 1] if start > 0 else 0
+			yield (src_corpus[src_start:src_ends[end - 1]], trg_corpus[trg_start:trg_ends[end - 1]],
+				src_lengths[start:end], trg_lengths[start:end])
+
+	def candidates(self, src_ids, trg_ids, src_lengths, trg_lengths):
+		"""
+		Finds the candidate source tokens of each target token of a block of TUs. The empty word is the first candidate
+		of each target token and the source tokens of its TU come after it.
+		The TUs should have source and target tokens.
+
+		@rtype: tuple
+		@return: returns a tuple of arrays of the form (keys, tokens, positions, priors) with an item for each candidate:
+		the key of its pair of words, the index of the target token in the block, the position of the source token
+		starting from 1 (0 for the empty word) and the prior probability of aligning them.
+		"""
+		num_of_tus = len(src_lengths)
+		src_starts = np.cumsum(src_lengths) - src_lengths
+		trg_starts = np.cumsum(trg_lengths) - trg_lengths
+
+		# The TU of each target token, its position and the lengths of its TU.
+		token_tus = np.repeat(np.arange(num_of_tus), trg_lengths)
+		trg_positions = np.arange(len(trg_ids)) - trg_starts[token_tus]
+		m = src_lengths[token_tus]
+		n = trg_lengths[token_tus]
+
+		sizes = m + 1
+		tokens = np.repeat(np.arange(len(trg_ids)), sizes)
+		positions = np.arange(len(tokens)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+		src_words = src_ids[np.maximum(src_starts[token_tus][tokens] + positions - 1, 0)]
+		src_words[positions == 0] = 0
+		trg_words = trg_ids[tokens]
+		keys = src_words * max(self.num_of_trg_words, 1) + trg_words
+		# The unknown words have negative IDs and no pairs in the table.
+		keys[(src_words < 0) | (trg_words < 0)] = -1
+
+		if self.model == "fast_align":
+			# The positions are compared as ratios of the lengths, like in fast_align (i / m and j / n from 1).
+			src_ratios = positions / m[tokens].astype(np.float64)
+			trg_ratios = (trg_positions[tokens] + 1) / n[tokens].astype(np.float64)
+			priors = np.exp(-self.diagonal_tension * np.abs(src_ratios - trg_ratios))
+			priors[positions == 0] = 0.0
+			priors *= (1.0 - self.null_probability) / np.bincount(tokens, weights=priors)[tokens]
+			priors[positions == 0] = self.null_probability
+		else:
+			priors = 1.0 / sizes[tokens]
+
+		return keys, tokens, positions, priors
+
+	def align(self, tus):
+		"""
+		Finds the alignments of the given TUs.
+
+		@type tus: list
+		@param tus: list of tuples of the form (source tokens, target tokens).
+
+		@rtype: list
+		@return: returns the alignment of each TU as a list of (source position, target position) pairs.
+		"""
+		alignments = [[] for x in tus]
+		indexes = [i for i in range(len(tus)) if len(tus[i][0]) > 0 and len(tus[i][1]) > 0]
+		if len(indexes) == 0:
+			return alignments
+
+		src_ids = self.src_ids
+		trg_ids = self.trg_ids
+		src_words = np.array([src_ids.get(word_key(w), -1) for i in indexes for w in tus[i][0]], dtype=np.int64)
+		trg_words = np.array([trg_ids.get(word_key(w), -1) for i in indexes for w in tus[i][1]], dtype=np.int64)
+		src_lengths = np.array([len(tus[i][0]) for i in indexes], dtype=np.int64)
+		trg_lengths = np.array([len(tus[i][1]) for i in indexes], dtype=np.int64)
+
+		keys, tokens, positions, priors = self.candidates(src_words, trg_words, src_lengths, trg_lengths)
+		scores = np.ones(len(keys)) * MIN_PROBABILITY
+		if len(self.pair_keys) > 0:
+			pairs = np.minimum(np.searchsorted(self.pair_keys, keys), len(self.pair_keys) - 1)
+			found = (keys >= 0) & (self.pair_keys[pairs] == keys)
+			scores[found] = self.probabilities[pairs[found]]
+		scores *= priors
+
+		# The first candidate with the best score of each target token. The candidates of a token are consecutive.
+		starts = np.flatnonzero(np.r_[True, tokens[1:] != tokens[:-1]])
+		best = np.maximum.reduceat(scores, starts)
+		candidates = np.flatnonzero(scores >= best[tokens])
+		candidates = candidates[np.r_[True, tokens[candidates][1:] != tokens[candidates][:-1]]]
+
+		# The target tokens aligned to the empty word are not aligned.
+		trg_tokens = tokens[candidates]
+		src_positions = positions[candidates] - 1
+		aligned = src_positions >= 0
+
+		token_tus = np.repeat(np.arange(len(indexes)), trg_lengths)
+		trg_starts = np.cumsum(trg_lengths) - trg_lengths
+		trg_positions = trg_tokens - trg_starts[token_tus[trg_tokens]]
+
+		for tu, i, j in zip(token_tus[trg_tokens][aligned].tolist(), src_positions[aligned].tolist(),
+				trg_positions[aligned].tolist()):
+			alignments[indexes[tu]].append((i, j))
+
+		for alignment in alignments:
+			alignment.sort()
+		return alignments
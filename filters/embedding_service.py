@@ -0,0 +1,201 @@
+from abstract_filter import TU_FEATURES
+from collections import Counter
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# scipy and gensim are imported in initialize(), when the service is really used.
+lil_matrix = None
+Sparse2Corpus = None
+lsimodel = None
+
+
+class EmbeddingService(object):
+	"""
+	Word vectors shared by all WE filters.
+	The vectors are made with LSI over the word-TU co-occurrence matrix of the input file, or loaded from the models
+	folder if they are made before for the same language pair. The service is initialized once by the manager and the
+	same object is given to all filters which ask for it.
+
+	Like the filters, the service needs scans through the input file: one for counting the words and one for filling
+	the co-occurrence matrix. The manager runs these scans before the scans of the filters.
+	"""
+
+	def __init__(self):
+		self.min_count = 3
+		self.num_of_features = 100
+		self.random_seed = 1
+
+		self.num_of_scans = 0
+		self.src_language = ""
+		self.trg_language = ""
+		# The registry of the models, where the vectors and the dictionary are kept for the next runs.
+		self.models = None
+
+		self.vocab = Counter()
+		self.number_of_tus = 0
+		self.matrix = None
+
+		# The index of each word in the vectors and the vectors of the words (read-only).
+		self.word_ids = {}
+		self.vectors = None
+
+	def initialize(self, source_language, target_language, extra_args):
+		global lil_matrix, Sparse2Corpus, lsimodel
+		from scipy.sparse import lil_matrix
+		from gensim.matutils import Sparse2Corpus
+		from gensim.models import lsimodel
+
+		self.src_language = extra_args['source language']
+		self.trg_language = extra_args['target language']
+
+		self.models = extra_args['model registry']
+		model = self.models.load("embeddings", self.src_language, self.trg_language, False, self.parameters())
+		if model is not None:
+			print "Loading the word vectors from file ..."
+
+			lsi = lsimodel.LsiModel.load(model['files']['vectors'])
+			self.set_vectors(lsi.projection.u)
+
+			f = open(model['files']['dict'], "rb")
+			for l in f:
+				l = l.strip().split("\t")
+
+				self.word_ids[l[0]] = int(l[1])
+			f.close()
+		else:
+			self.num_of_scans = 2
+
+		# The vectors of the tokens of each TU are found once for all filters.
+		TU_FEATURES['src_vectors'] = lambda tu: self.lookup(tu.src_tokens)
+		TU_FEATURES['trg_vectors'] = lambda tu: self.lookup(tu.trg_tokens)
+
+	def process_tu(self, tu, num_of_finished_scans):
+		if num_of_finished_scans == 0:
+			self.vocab.update(tu.src_tokens)
+			self.vocab.update(tu.trg_tokens)
+		else:
+			for w in tu.src_tokens + tu.trg_tokens:
+				if w in self.word_ids:
+					self.matrix[self.word_ids[w], self.number_of_tus] = 1
+
+		self.number_of_tus += 1
+
+	def do_after_a_full_scan(self, num_of_finished_scans):
+		if num_of_finished_scans == 1:
+			# The words are sorted, so the IDs don't depend on the order of the dictionary.
+			for word in sorted(self.vocab):
+				if self.vocab[word] >= self.min_count:
+					self.word_ids[word] = len(self.word_ids)
+
+			# The words either occur in a TU or not, so one byte is enough for each cell.
+			self.matrix = lil_matrix((len(self.word_ids), self.number_of_tus), dtype=np.int8)
+
+			print "-#-#-#-#-#-#-#-#-#-#-#-"
+			print "size of vocab:", len(self.vocab)
+			print "size of common words:", len(self.word_ids)
+			print "number of TUs:", self.number_of_tus
+			self.vocab = Counter()
+			self.number_of_tus = 0
+
+		elif num_of_finished_scans == 2:
+			print "Performing SVD..."
+
+			# The random projections of the LSI are seeded, so every run (and a run resumed from a checkpoint)
+			# makes the same vectors.
+			np.random.seed(self.random_seed)
+			x = Sparse2Corpus(self.matrix)
+			lsi = lsimodel.LsiModel(corpus=x, id2word=None, num_topics=self.num_of_features)
+			self.set_vectors(lsi.projection.u)
+			self.matrix = None
+
+			model_file_name = self.models.artifact_file_name("embeddings", self.src_language, self.trg_language, False,
+				self.parameters(), "vectors")
+			lsi.save(model_file_name)
+
+			dict_file_name = self.models.artifact_file_name("embeddings", self.src_language, self.trg_language, False,
+				self.parameters(), "dict")
+			f = open(dict_file_name, "wb")
+			for w in sorted(self.word_ids, key=self.word_ids.get):
+				f.write(w + "\t" + str(self.word_ids[w]) + "\n")
+			f.close()
+
+			# The model is saved in the registry after its files, so a model in the registry always has its files.
+			self.models.save("embeddings", self.src_language, self.trg_language, False, self.parameters(),
+				files={"vectors": model_file_name, "dict": dict_file_name})
+
+			print "done."
+
+	def get_state(self):
+		"""
+		Returns the state of the service for the checkpoints of the manager (see AbstractFilter.get_state()).
+		The vectors and the dictionary are saved in the models folder as soon as they are made and initialize() loads
+		them again, so they are not kept in the state.
+		"""
+		state = dict(self.__dict__)
+		if self.vectors is not None:
+			del state['vectors']
+			del state['word_ids']
+		return state
+
+	def set_state(self, state):
+		self.__dict__.update(state)
+
+	def parameters(self):
+		"""
+		Returns the parameters which change the vectors. They are in the keys of the models of the vectors and of the
+		filters which use them (see model_registry.py).
+		"""
+		return {"min count": self.min_count, "features": self.num_of_features, "random seed": self.random_seed}
+
+	def set_vectors(self, vectors):
+		self.vectors = vectors
+		# The same array is given to all filters.
+		self.vectors.setflags(write=False)
+
+	def lookup(self, tokens):
+		"""
+		Finds the vectors of the given tokens.
+
+		@rtype: tuple
+		@return: returns the vector of each token, or None for the tokens which are not in the vocabulary.
+		"""
+		if self.vectors is None:
+			raise ValueError("The word vectors are not ready.")
+
+		vectors = []
+		for w in tokens:
+			if w in self.word_ids:
+				vectors.append(self.vectors[self.word_ids[w]])
+			else:
+				vectors.append(None)
+		return tuple(vectors)
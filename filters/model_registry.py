@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import glob
+import hashlib
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The models are kept in this folder, in a folder for each filter or service.
+REGISTRY_FOLDER = "models/registry"
+
+
+class ModelRegistry(object):
+	"""
+	The models learned by the filters and the services, kept for the next runs.
+	A model is found by its key: the name of the filter, the languages, the 'normalize scores' option and the
+	parameters of the filter which change what it learns. Each model is a JSON file named by the digest of its key,
+	so a model is found without reading the other models and the runs which share the folder write different files
+	for different keys.
+	The files are written in temporary files and renamed, so a run never reads a partial model. If a model is learned
+	again for the same key, it is replaced and its version is increased.
+	"""
+
+	def __init__(self, path=REGISTRY_FOLDER):
+		self.path = path
+
+	@staticmethod
+	def make_key(name, source_language, target_language, normalize=False, parameters=None):
+		if parameters is None:
+			parameters = {}
+		return {"name": name, "source language": source_language, "target language": target_language,
+			"normalize": bool(normalize), "parameters": parameters}
+
+	@staticmethod
+	def digest(key):
+		return hashlib.md5(json.dumps(key, sort_keys=True)).hexdigest()
+
+	def entry_file_name(self, key):
+		return os.path.join(self.path, key["name"], self.digest(key) + ".json")
+
+	def read_entry(self, key):
+		file_name = self.entry_file_name(key)
+		if not os.path.isfile(file_name):
+			return None
+
+		f = open(file_name)
+		try:
+			entry = json.load(f)
+		except ValueError:
+			print "The model file could not be decoded:", file_name
+			return None
+		finally:
+			f.close()
+
+		if entry.get("key") != key:
+			return None
+		return entry
+
+	def load(self, name, source_language, target_language, normalize=False, parameters=None):
+		"""
+		Finds the model of a filter or a service.
+
+		@type parameters: dict
+		@param parameters: The parameters of the filter which change what it learns. They should be JSON serializable.
+
+		@rtype: dict
+		@return: returns the model as a dictionary with 'values', 'files' and 'version' keys, or None if there is no
+		model for the key or some of its files are missing.
+		"""
+		entry = self.read_entry(self.make_key(name, source_language, target_language, normalize, parameters))
+		if entry is None:
+			return None
+
+		for file_name in entry["files"].values():
+			if not os.path.isfile(file_name):
+				return None
+		return entry
+
+	def artifact_file_name(self, name, source_language, target_language, normalize=False, parameters=None, artifact=""):
+		"""
+		Returns a new file name for a file of a model which is not JSON serializable (e.g. the word vectors).
+		The file should be written before saving the model with the name in its 'files' (see save()).
+		The names are different for every version and every process, so the files of a model in use are not changed.
+		"""
+		key = self.make_key(name, source_language, target_language, normalize, parameters)
+
+		version = 1
+		entry = self.read_entry(key)
+		if entry is not None:
+			version = entry["version"] + 1
+
+		folder = os.path.join(self.path, name)
+		if not os.path.isdir(folder):
+			try:
+				os.makedirs(folder)
+			except OSError:
+				# It is made by another run at the same time.
+				if not os.path.isdir(folder):
+					raise
+
+		return os.path.join(folder, "%s.v%d.%d.%s" % (self.digest(key), version, os.getpid(), artifact))
+
+	def save(self, name, source_language, target_language, normalize=False, parameters=None, values=None, files=None):
+		"""
+		Saves the model of a filter or a service. The previous version of the model is replaced.
+
+		@type values: dict
+		@param values: The learned values. They should be JSON serializable.
+
+		@type files: dict
+		@param files: The names of the files of the model (see artifact_file_name()). The keys are the names of the
+		artifacts, e.g. 'vectors'.
+
+		@rtype: dict
+		@return: returns the saved model.
+		"""
+		key = self.make_key(name, source_language, target_language, normalize, parameters)
+		file_name = self.entry_file_name(key)
+
+		version = 1
+		previous = self.read_entry(key)
+		if previous is not None:
+			version = previous["version"] + 1
+
+		entry = {"key": key, "version": version, "values": values or {}, "files": files or {}}
+
+		folder = os.path.dirname(file_name)
+		if not os.path.isdir(folder):
+			try:
+				os.makedirs(folder)
+			except OSError:
+				if not os.path.isdir(folder):
+					raise
+
+		tmp_file_name = file_name + ".tmp" + str(os.getpid())
+		f = open(tmp_file_name, "w")
+		json.dump(entry, f, indent=1, sort_keys=True)
+		f.close()
+		os.rename(tmp_file_name, file_name)
+
+		# The files of the previous version which are not used by the new version.
+		if previous is not None:
+			for old_file_name in previous["files"].values():
+				if old_file_name not in entry["files"].values():
+					self.remove_artifact(old_file_name)
+
+		return entry
+
+	@staticmethod
+	def remove_artifact(file_name):
+		# Some libraries write more files next to the given file (e.g. the arrays of the gensim models).
+		for path in [file_name] + glob.glob(file_name + ".*"):
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+	def entries(self):
+		"""
+		Yields all models of the registry, sorted by their names.
+		"""
+		if not os.path.isdir(self.path):
+			return
+
+		for name in sorted(os.listdir(self.path)):
+			for file_name in sorted(glob.glob(os.path.join(self.path, name, "*.json"))):
+				f = open(file_name)
+				try:
+					yield json.load(f)
+				except ValueError:
+					pass
+				finally:
+					f.close()
+
+
+if __name__ == "__main__":
+	# Printing the models of the registry:
+	# python filters/model_registry.py [<registry folder>]
+	path = REGISTRY_FOLDER
+	if len(sys.argv) > 1:
+		path = sys.argv[1]
+
+	print "%-30s%-10s%-10s%-8s%s" % ("Model", "Languages", "Normalize", "Version", "Parameters")
+	print "-" * 80
+	for entry in ModelRegistry(path).entries():
+		key = entry["key"]
+		print "%-30s%-10s%-10s%-8d%s" % (key["name"], key["source language"] + "-" + key["target language"],
+			key["normalize"], entry["version"], json.dumps(key["parameters"], sort_keys=True))
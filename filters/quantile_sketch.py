@@ -0,0 +1,158 @@
+import math
+import random
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The default number of the items kept in the first level of the sketch. The rank error of the quantiles is about
+# 1.7 / size, e.g. about 1% of the TUs for the default size.
+DEFAULT_SKETCH_SIZE = 200
+
+# The capacity of each level of the sketch is this factor times the capacity of the level above it.
+CAPACITY_FACTOR = 2.0 / 3.0
+
+
+class QuantileSketch(object):
+	"""
+	A KLL sketch of a stream of numbers for computing its percentiles with a bounded memory.
+	The items are kept in levels, and an item in the level h stands for 2^h items of the stream. When a level is full,
+	its items are sorted and every other item is moved to the next level.
+	Until the first level is full, all items are kept and the percentiles are the same as numpy.percentile().
+	The sketches are mergeable, e.g. the sketches of the parts of a file are merged into the sketch of the file.
+	"""
+
+	def __init__(self, size=DEFAULT_SKETCH_SIZE, seed=1):
+		"""
+		@type size: int
+		@param size: The capacity of the first level. The memory of the sketch is about 3 * size items.
+
+		@type seed: int
+		@param seed: The seed of the random choices of the compactions, so the same stream has the same sketch.
+		"""
+		self.size = max(int(size), 8)
+		self.levels = [[]]
+		self.count = 0
+		self.random = random.Random(seed)
+
+	def __len__(self):
+		return self.count
+
+	def capacity(self, level):
+		depth = len(self.levels) - level - 1
+		return max(int(math.ceil(self.size * CAPACITY_FACTOR ** depth)), 2)
+
+	def add(self, value):
+		self.levels[0].append(value)
+		self.count += 1
+
+		if len(self.levels[0]) >= self.capacity(0):
+			self.compress()
+
+	def extend(self, values):
+		"""
+		Adds a list of values to the sketch.
+		"""
+		self.levels[0].extend(values)
+		self.count += len(values)
+
+		if len(self.levels[0]) >= self.capacity(0):
+			self.compress()
+
+	def merge(self, other):
+		"""
+		Adds the items of another sketch to this sketch.
+		"""
+		for level in range(len(other.levels)):
+			if level == len(self.levels):
+				self.levels.append([])
+			self.levels[level].extend(other.levels[level])
+		self.count += other.count
+
+		self.compress()
+
+	def empty(self):
+		"""
+		Returns a new sketch of the same size with no values (see AbstractFilter.clear_statistics()).
+		"""
+		return QuantileSketch(self.size)
+
+	def compress(self):
+		level = 0
+		while level < len(self.levels):
+			while len(self.levels[level]) >= self.capacity(level):
+				self.compact(level)
+			level += 1
+
+	def compact(self, level):
+		"""
+		Moves half of the items of a level to the next level. If the number of the items is odd, one item stays.
+		"""
+		if level + 1 == len(self.levels):
+			self.levels.append([])
+
+		items = sorted(self.levels[level])
+		self.levels[level] = []
+		if len(items) % 2 == 1:
+			self.levels[level].append(items.pop())
+
+		offset = self.random.randint(0, 1)
+		self.levels[level + 1].extend(items[offset::2])
+
+	def percentile(self, q):
+		"""
+		Returns the q-th percentile of the stream, with the linear interpolation of numpy.percentile().
+
+		@type q: float
+		@param q: The percentile, between 0 and 100.
+
+		@rtype: numpy.float64
+		"""
+		if self.count == 0:
+			raise ValueError("The sketch is empty.")
+
+		if len(self.levels) == 1:
+			return np.percentile(self.levels[0], q)
+
+		values = []
+		weights = []
+		for level in range(len(self.levels)):
+			values.extend(self.levels[level])
+			weights.extend([2 ** level] * len(self.levels[level]))
+
+		order = np.argsort(values, kind='mergesort')
+		values = np.array(values, dtype=np.float64)[order]
+		weights = np.array(weights, dtype=np.float64)[order]
+
+		# The rank of the middle of the items which each value stands for.
+		ranks = np.cumsum(weights) - (weights + 1.0) / 2.0
+		rank = q / 100.0 * (np.sum(weights) - 1.0)
+		return np.interp(rank, ranks, values)
@@ -0,0 +1,102 @@
+import math
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+
+class RunningStats(object):
+	"""
+	The count, the mean and the sum of the squared differences from the mean (M2) of a stream of numbers.
+	The values are added one by one with Welford's method, and the statistics of two parts of a stream are merged
+	with the method of Chan et al., so the parts could be processed by different processes.
+	"""
+
+	def __init__(self):
+		self.count = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+
+	def __len__(self):
+		return self.count
+
+	def add(self, value):
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.m2 += delta * (value - self.mean)
+
+	def extend(self, values):
+		"""
+		Adds a list or an array of values at once.
+		"""
+		if len(values) == 0:
+			return
+
+		values = np.asarray(values, dtype=np.float64)
+		mean = float(np.mean(values))
+		self.combine(len(values), mean, float(np.sum((values - mean) ** 2)))
+
+	def merge(self, other):
+		"""
+		Adds the statistics of another part of the stream.
+		"""
+		self.combine(other.count, other.mean, other.m2)
+
+	def combine(self, count, mean, m2):
+		if count == 0:
+			return
+		if self.count == 0:
+			self.count, self.mean, self.m2 = count, mean, m2
+			return
+
+		total = self.count + count
+		delta = mean - self.mean
+		self.mean += delta * count / total
+		self.m2 += m2 + delta * delta * self.count * count / total
+		self.count = total
+
+	def empty(self):
+		"""
+		Returns new statistics with no values (see AbstractFilter.clear_statistics()).
+		"""
+		return RunningStats()
+
+	def variance(self):
+		"""
+		Returns the sample variance. It is 0 for less than two values.
+		"""
+		if self.count < 2:
+			return 0.0
+		return max(self.m2, 0.0) / (self.count - 1)
+
+	def std(self):
+		return math.sqrt(self.variance())
@@ -0,0 +1,176 @@
+import os
+import sys
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The sidecar file starts with these three numbers: the version of the format, the size and the modification
+# time (in microseconds) of the indexed file. The start offsets of the lines come after them.
+INDEX_VERSION = 1
+HEADER_SIZE = 3
+
+# The size of the blocks read while looking for the new lines.
+BLOCK_SIZE = 1 << 24
+
+
+class LineIndex(object):
+	"""
+	Start offsets of the lines of a text file.
+	The index is kept in a sidecar file next to the indexed file ('<file>.idx') and it is built again only if
+	the file is changed.
+	"""
+
+	def __init__(self, file_name, offsets):
+		self.file_name = file_name
+
+		# There is an offset for each line and one more for the end of the file.
+		self.offsets = offsets
+
+	@staticmethod
+	def index_file_name(file_name):
+		return file_name + ".idx"
+
+	@staticmethod
+	def file_stamp(file_name):
+		stat = os.stat(file_name)
+		return [INDEX_VERSION, stat.st_size, int(stat.st_mtime * 1000000)]
+
+	@classmethod
+	def load(cls, file_name):
+		"""
+		Loads the index of the given file from its sidecar file.
+		If there is no sidecar file or the file is changed after making the index, the index is built and saved.
+
+		@rtype: LineIndex
+		@return: returns the index of the file.
+		"""
+		index_file_name = cls.index_file_name(file_name)
+		stamp = cls.file_stamp(file_name)
+
+		if os.path.isfile(index_file_name):
+			index = np.memmap(index_file_name, dtype=np.int64, mode='r')
+			if len(index) > HEADER_SIZE and index[:HEADER_SIZE].tolist() == stamp:
+				return cls(file_name, index[HEADER_SIZE:])
+
+		offsets = cls.build(file_name)
+
+		# Writing in a temporary file and renaming it, so the other processes never see a partial index.
+		tmp_file_name = index_file_name + ".tmp" + str(os.getpid())
+		f = open(tmp_file_name, 'wb')
+		np.array(stamp, dtype=np.int64).tofile(f)
+		offsets.tofile(f)
+		f.close()
+		os.rename(tmp_file_name, index_file_name)
+
+		return cls(file_name, offsets)
+
+	@staticmethod
+	def build(file_name):
+		"""
+		Finds the start offsets of all lines of the file.
+
+		@rtype: numpy.ndarray
+		@return: returns the offsets with one more offset at the end which is the size of the file.
+		"""
+		offsets = [np.zeros(1, dtype=np.int64)]
+		position = 0
+
+		f = open(file_name, 'rb')
+		block = f.read(BLOCK_SIZE)
+		while block:
+			new_lines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+			offsets.append(new_lines.astype(np.int64) + (position + 1))
+
+			position += len(block)
+			block = f.read(BLOCK_SIZE)
+		f.close()
+
+		offsets = np.concatenate(offsets)
+
+		# The last line does not end with a new line.
+		if offsets[-1] != position:
+			offsets = np.append(offsets, np.int64(position))
+
+		return offsets
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def offset(self, line):
+		"""
+		Returns the start offset of the given line. The lines are counted from 0.
+		For the lines after the end of the file, the size of the file is returned.
+		"""
+		return int(self.offsets[min(line, len(self.offsets) - 1)])
+
+	def byte_range(self, start, end):
+		"""
+		Returns the byte range of the lines from 'start' to 'end' (exclusive) as a tuple of the form (start, end).
+		"""
+		return self.offset(start), self.offset(end)
+
+	def read_lines(self, start, end):
+		"""
+		Reads the lines from 'start' to 'end' (exclusive).
+
+		@rtype: list
+		@return: returns the lines with their new line characters.
+		"""
+		byte_start, byte_end = self.byte_range(start, end)
+
+		f = open(self.file_name, 'rb')
+		f.seek(byte_start)
+		lines = f.read(byte_end - byte_start).splitlines(True)
+		f.close()
+
+		return lines
+
+
+if __name__ == "__main__":
+	# Building the index of a file and printing a range of its lines:
+	# python line_index.py <file> [<first line> [<last line>]]
+	# The lines are counted from 1 and the last line is included.
+	if len(sys.argv) < 2:
+		print "Usage: python line_index.py <file> [<first line> [<last line>]]"
+		sys.exit(1)
+
+	line_index = LineIndex.load(sys.argv[1])
+	print >> sys.stderr, "Number of lines:", len(line_index)
+
+	if len(sys.argv) > 2:
+		first_line = int(sys.argv[2])
+		last_line = first_line
+		if len(sys.argv) > 3:
+			last_line = int(sys.argv[3])
+
+		for l in line_index.read_lines(first_line - 1, last_line):
+			sys.stdout.write(l)
@@ -34,8 +34,44 @@ or implied, of the copyright holder.
 
 if __name__ == "__main__":
 	config_file = ""
-	if len(sys.argv) > 1:
-		config_file = sys.argv[1]
+	arguments = [x for x in sys.argv[1:] if not x.startswith("--")]
+	if len(arguments) > 0:
+		config_file = arguments[0]
+
+	# Listing the filters without importing them.
+	if "--list-filters" in sys.argv:
+		from filter_registry import list_filters
+		list_filters(config_file)
+		sys.exit(0)
+
 	manager = TMManager(config_file)
 
-	manager.run()
+	# Reading the TUs from stdin and writing the decisions in stdout, using the models on disk:
+	# python main.py [config file] --pipe < tus.tsv > decisions
+	# The messages of the cleaner are written in stderr.
+	if "--pipe" in sys.argv:
+		out_stream = sys.stdout
+		sys.stdout = sys.stderr
+		if not manager.run_stream(sys.stdin, out_stream):
+			sys.exit(1)
+		sys.exit(0)
+
+	# Loading the filters once and serving the decisions over HTTP (see tm_server.py):
+	# python main.py [config file] --serve
+	if "--serve" in sys.argv:
+		from tm_server import serve
+		if not serve(manager):
+			sys.exit(1)
+		sys.exit(0)
+
+	# Estimating the decisions, the time and the memory of a run from a uniform sample of the input (see estimator.py):
+	# python main.py [config file] --estimate
+	if "--estimate" in sys.argv:
+		from estimator import estimate
+		if not estimate(manager):
+			sys.exit(1)
+		sys.exit(0)
+
+	# Continuing a stopped run from its last checkpoint:
+	# python main.py [config file] --resume
+	manager.run(resume="--resume" in sys.argv)
@@ -0,0 +1,203 @@
+import threading
+from Queue import Queue
+from multiprocessing.pool import ThreadPool
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The blocks given to the thread for flushing a file and for setting an event after the previous blocks
+# (see OutputWriter.sync()).
+FLUSH = object()
+SYNC = object()
+
+
+class BufferedOutput(object):
+	"""
+	An output file whose writes are kept in memory and given to the writer thread in large blocks.
+	It has the write() and close() methods of the file objects.
+	"""
+
+	def __init__(self, writer, out_file, written=False):
+		"""
+		@type written: bool
+		@param written: True if the file already has some blocks, e.g. the file of a resumed run.
+		"""
+		self.writer = writer
+		self.out_file = out_file
+
+		self.parts = []
+		self.size = 0
+		self.written = written
+
+	def write(self, text):
+		self.parts.append(text)
+		self.size += len(text)
+
+		if self.size >= self.writer.block_size:
+			self.flush()
+
+	def flush(self):
+		if self.size > 0:
+			self.writer.submit(self.out_file, "".join(self.parts))
+			self.written = True
+		self.parts = []
+		self.size = 0
+
+	def close(self):
+		self.flush()
+		# An empty compressed file is not valid, so the compressed outputs without any blocks get an empty stream.
+		if not self.written and self.writer.compression is not None:
+			self.writer.submit(self.out_file, "")
+		self.writer.submit(self.out_file, None)
+
+
+class OutputWriter(object):
+	"""
+	Writes the blocks of all output files on a background thread, so the filters don't wait for the disk.
+	The blocks of each file are written in the order they are given.
+	If the outputs are compressed, each block is compressed as an independent stream by a pool of threads while the
+	previous blocks are written, and the files are the streams of their blocks one after the other.
+	"""
+
+	def __init__(self, block_size=1 << 20, max_pending_blocks=64, compression=None, compression_threads=2):
+		"""
+		@type block_size: int
+		@param block_size: The number of bytes kept in memory for each output before giving it to the thread.
+
+		@type max_pending_blocks: int
+		@param max_pending_blocks: The maximum number of blocks waiting to be written.
+
+		@type compression: str
+		@param compression: The format of the compressed outputs ('gz', 'bz2' or 'xz'), or None.
+
+		@type compression_threads: int
+		@param compression_threads: The number of threads which compress the blocks.
+		"""
+		self.block_size = block_size
+		self.queue = Queue(max_pending_blocks)
+		self.error = None
+
+		self.compression = compression
+		self.compression_pool = None
+		if compression is not None:
+			self.compression_pool = ThreadPool(compression_threads)
+
+		self.thread = threading.Thread(target=self.write_blocks)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def open(self, file_name, mode='w'):
+		"""
+		Opens an output file.
+
+		@rtype: BufferedOutput
+		@return: returns an object with write() and close() methods.
+		"""
+		return BufferedOutput(self, open(file_name, mode))
+
+	def reopen(self, file_name, size):
+		"""
+		Opens an output file of a resumed run. What is written after the checkpoint is removed
+		(see checkpoint.reopen_file()).
+
+		@rtype: BufferedOutput
+		@return: returns an object with write() and close() methods.
+		"""
+		from checkpoint import reopen_file
+		return BufferedOutput(self, reopen_file(file_name, size), size > 0)
+
+	def submit(self, out_file, block):
+		"""
+		Gives a block to the thread to be written in the file. If the block is None, the file is closed.
+		"""
+		if self.error is not None:
+			raise self.error
+
+		# The blocks are given to the thread in order, and it waits until each block is compressed.
+		# The unicode blocks are encoded as the files would encode them.
+		if self.compression_pool is not None and isinstance(block, basestring):
+			from compression import compress_block
+			block = self.compression_pool.apply_async(compress_block, (self.compression, str(block)))
+		self.queue.put((out_file, block))
+
+	def sync(self, outputs):
+		"""
+		Waits until everything written in the given outputs is in their files, e.g. before measuring their sizes.
+
+		@type outputs: list
+		@param outputs: The BufferedOutput objects of the files.
+		"""
+		for output in outputs:
+			output.flush()
+			self.submit(output.out_file, FLUSH)
+
+		done = threading.Event()
+		self.submit(done, SYNC)
+		done.wait()
+
+		if self.error is not None:
+			raise self.error
+
+	def write_blocks(self):
+		while True:
+			out_file, block = self.queue.get()
+			if out_file is None:
+				break
+
+			try:
+				if hasattr(block, "get"):
+					block = block.get()
+
+				if block is None:
+					out_file.close()
+				elif block is SYNC:
+					out_file.set()
+				elif block is FLUSH:
+					out_file.flush()
+				else:
+					out_file.write(block)
+			except Exception, e:
+				self.error = e
+
+	def close(self):
+		"""
+		Waits until all blocks are written and stops the thread.
+		The outputs should be closed before calling this function.
+		"""
+		self.queue.put((None, None))
+		self.thread.join()
+
+		if self.compression_pool is not None:
+			self.compression_pool.close()
+			self.compression_pool.join()
+
+		if self.error is not None:
+			raise self.error
@@ -12,3 +12,14 @@ class MajorityVoting(AbstractPolicy):
 		if (float(num_of_no_answers)/float(len(result_list))) > 0.5:
 			return 'reject'
 		return 'accept'
+
+	def is_decided(self, result_list):
+		num_of_no_answers = len([1 for x in result_list if x[1] == "reject"])
+		num_of_unknown_answers = len([1 for x in result_list if x[1] is None])
+
+		# The decision is fixed if the other filters could not change it, even if they all reject the TU.
+		if (float(num_of_no_answers)/float(len(result_list))) > 0.5:
+			return 'reject'
+		if (float(num_of_no_answers + num_of_unknown_answers)/float(len(result_list))) > 0.5:
+			return None
+		return 'accept'
@@ -12,3 +12,11 @@ class OneNo(AbstractPolicy):
 		if num_of_no_answers > 0:
 			return 'reject'
 		return 'accept'
+
+	def is_decided(self, result_list):
+		# One rejection is enough.
+		if len([1 for x in result_list if x[1] == "reject"]) > 0:
+			return 'reject'
+		if len([1 for x in result_list if x[1] is None]) > 0:
+			return None
+		return 'accept'
@@ -9,3 +9,6 @@ class SingleFilterPolicy(AbstractPolicy):
 
 	def decide(self, result_list):
 		return result_list[0][1]
+
+	def is_decided(self, result_list):
+		return result_list[0][1]
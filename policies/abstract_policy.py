@@ -60,3 +60,21 @@ class AbstractPolicy:
 		"""
 
 		return 'accept'
+
+	def is_decided(self, result_list):
+		"""
+		In the decision process the filters could be evaluated one by one, and this function is called for the
+		partial results of a TU. If the decision is already fixed, whatever the answers of the other filters are,
+		the decision is returned and the other filters are not evaluated.
+		By default, the decision is known only when all filters are evaluated.
+
+		@type result_list: list
+		@param result_list: list of answers from all filters, in the same order as decide(). The answers of the filters
+		which are not evaluated yet are None.
+
+		@rtype: str
+		@return: returns the decision, or None if it is not fixed yet.
+		"""
+		if len([1 for x in result_list if x[1] is None]) > 0:
+			return None
+		return self.decide(result_list)
@@ -0,0 +1,178 @@
+import json
+import math
+from collections import OrderedDict
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The histograms count the items (e.g. the TUs) by their latency in buckets of powers of two microseconds.
+# The bucket k has the latencies from 2^(k-1) to 2^k microseconds and the bucket 0 has the latencies under 1 microsecond.
+NUM_OF_BUCKETS = 32
+
+
+def bucket_label(k):
+	if k == 0:
+		return "<1us"
+	return "<%dus" % (2 ** k)
+
+
+class Profiler(object):
+	"""
+	Keeps the timings of the filters, the services and the policies in each phase of the run.
+	For each (kind, name, phase) there are the number of the calls, the number of the items (the TUs given in the
+	calls), the total and the maximum time of the calls and a histogram of the latencies of the items.
+	The latency of an item is the time of its call divided by the number of the items of the call.
+	"""
+
+	def __init__(self):
+		# The keys are tuples of the form (kind, name, phase) and the values are lists of the form
+		# [calls, items, total time, max time, histogram].
+		self.entries = OrderedDict()
+		# The largest size of the state of each filter and service at the end of the learning scans (see add_size()).
+		# The keys are tuples of the form (kind, name).
+		self.sizes = OrderedDict()
+
+	def add(self, kind, name, phase, seconds, items=1):
+		"""
+		Adds the time of a call.
+
+		@type kind: str
+		@param kind: 'filter', 'service', 'policy' or 'section'.
+
+		@type phase: str
+		@param phase: The name of the function or the phase, e.g. 'initialize', 'process_tu (scan 1)' or 'decide'.
+
+		@type items: int
+		@param items: The number of the TUs given in the call.
+		"""
+		key = (kind, name, phase)
+		entry = self.entries.get(key)
+		if entry is None:
+			entry = [0, 0, 0.0, 0.0, [0] * NUM_OF_BUCKETS]
+			self.entries[key] = entry
+
+		entry[0] += 1
+		entry[1] += items
+		entry[2] += seconds
+		if seconds > entry[3]:
+			entry[3] = seconds
+
+		if items > 0:
+			microseconds = seconds * 1000000.0 / items
+			k = 0
+			if microseconds >= 1.0:
+				k = min(int(math.floor(math.log(microseconds, 2))) + 1, NUM_OF_BUCKETS - 1)
+			entry[4][k] += items
+
+	def add_size(self, kind, name, size):
+		"""
+		Adds the size of the state of a filter or a service, as the number of bytes of its pickled state. It shows
+		the memory kept by the filter (e.g. its vocabulary or its tables), and the largest size is kept.
+		"""
+		self.sizes[(kind, name)] = max(self.sizes.get((kind, name), 0), size)
+
+	def get_state(self):
+		"""
+		Returns the timings and clears them, e.g. to give the timings of a worker process to the main process.
+		"""
+		state = self.entries
+		self.entries = OrderedDict()
+		return state
+
+	def merge(self, state):
+		"""
+		Adds the timings of another profiler (see get_state()).
+		"""
+		for key, other in state.iteritems():
+			entry = self.entries.get(key)
+			if entry is None:
+				self.entries[key] = other
+				continue
+
+			entry[0] += other[0]
+			entry[1] += other[1]
+			entry[2] += other[2]
+			entry[3] = max(entry[3], other[3])
+			entry[4] = [x + y for x, y in zip(entry[4], other[4])]
+
+	def report(self):
+		"""
+		@rtype: list
+		@return: returns the timings as a list of dictionaries, sorted by the total time.
+		"""
+		records = []
+		for key, entry in sorted(self.entries.items(), key=lambda x: -x[1][2]):
+			record = OrderedDict()
+			record["kind"], record["name"], record["phase"] = key
+			record["calls"] = entry[0]
+			record["items"] = entry[1]
+			record["total seconds"] = entry[2]
+			record["mean ms per item"] = 1000.0 * entry[2] / max(entry[1], 1)
+			record["max seconds per call"] = entry[3]
+			record["histogram"] = OrderedDict((bucket_label(k), entry[4][k]) for k in range(NUM_OF_BUCKETS) if entry[4][k] > 0)
+			records.append(record)
+		return records
+
+	def size_report(self):
+		"""
+		@rtype: list
+		@return: returns the sizes of the states as a list of dictionaries, sorted by the size.
+		"""
+		records = []
+		for key, size in sorted(self.sizes.items(), key=lambda x: -x[1]):
+			record = OrderedDict()
+			record["kind"], record["name"] = key
+			record["state bytes"] = size
+			records.append(record)
+		return records
+
+	def write_report(self, file_name):
+		f = open(file_name, "w")
+		json.dump({"timings": self.report(), "state sizes": self.size_report()}, f, indent=1)
+		f.close()
+
+	def table(self):
+		"""
+		@rtype: list
+		@return: returns the lines of a table of the timings, sorted by the total time.
+		"""
+		lines = ["%-10s%-30s%-28s%10s%10s%12s%12s%10s" %
+			("Kind", "Name", "Phase", "Calls", "Items", "Total (s)", "ms/item", "Share")]
+
+		# The share of each filter, service or policy in the time of all of them.
+		total = sum([entry[2] for key, entry in self.entries.iteritems() if key[0] != "section"])
+		for record in self.report():
+			share = "-"
+			if record["kind"] != "section" and total > 0:
+				share = "%.1f%%" % (100.0 * record["total seconds"] / total)
+			lines.append("%-10s%-30s%-28s%10d%10d%12.3f%12.4f%10s" % (record["kind"], record["name"], record["phase"],
+				record["calls"], record["items"], record["total seconds"], record["mean ms per item"], share))
+		return lines
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+PROGRESS_FORMATS = ['json', 'prometheus']
+
+
+def resident_memory():
+	"""
+	Returns the resident memory of this process in bytes, or None if it is not known.
+	On the systems without '/proc', the peak resident memory is returned.
+	"""
+	try:
+		f = open("/proc/self/statm")
+		pages = int(f.read().split()[1])
+		f.close()
+		return pages * os.sysconf("SC_PAGE_SIZE")
+	except (IOError, OSError, ValueError, IndexError):
+		pass
+
+	try:
+		import resource
+		import sys
+		rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		if sys.platform == "darwin":
+			return rss
+		return rss * 1024
+	except (ImportError, ValueError):
+		return None
+
+
+class ProgressMonitor(object):
+	"""
+	Counts the TUs processed in each phase of the run (the scans of the learning section and the decision section)
+	and the decisions of the policies, and writes them in a status file every 'interval' seconds.
+	The status file is written in a temporary file which replaces it, so the readers never see a partial file.
+
+	The counters are changed only by the main thread; the thread of the monitor reads copies of them.
+	In the worker processes of the decision section, the counters of each chunk are taken by get_counts() and added
+	to the monitor of the main process by merge().
+	"""
+
+	def __init__(self, file_name, interval=10, status_format="json"):
+		"""
+		@type interval: float
+		@param interval: The number of seconds between two writes of the status file.
+
+		@type status_format: str
+		@param status_format: 'json' or 'prometheus' (the text format of Prometheus).
+		"""
+		if status_format not in PROGRESS_FORMATS:
+			raise ValueError("The format of the status file should be one of: " + ", ".join(PROGRESS_FORMATS))
+
+		self.file_name = file_name
+		self.interval = max(interval, 0.1)
+		self.status_format = status_format
+
+		self.start_time = time.time()
+		self.finished = False
+
+		# The phases in their order. For each phase there are its start time, its end time, the number of its TUs
+		# (if it is known) and its counters.
+		self.phases = OrderedDict()
+		self.phase = None
+
+		# The number of the decisions of each policy. The keys are tuples of the form (policy name, answer).
+		self.decisions = {}
+
+		self.stop_event = threading.Event()
+		self.thread = None
+
+	def start(self):
+		self.thread = threading.Thread(target=self.write_periodically)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def start_phase(self, phase, total=None):
+		"""
+		Starts counting the TUs of a new phase, e.g. 'learning scan 1' or 'decision'.
+
+		@type total: int
+		@param total: The number of the lines of the phase, if it is known. It is used for the ETA.
+		"""
+		if self.phase is not None:
+			self.phases[self.phase]['end'] = time.time()
+
+		self.phases[phase] = {'start': time.time(), 'end': None, 'total': total,
+			'counts': {'processed': 0, 'invalid': 0, 'corrupted': 0}}
+		self.phase = phase
+
+	def add(self, processed, invalid=0, corrupted=0):
+		"""
+		Adds the lines processed in the current phase. The invalid and the corrupted lines are counted in the
+		processed lines too.
+		"""
+		counts = self.phases[self.phase]['counts']
+		counts['processed'] += processed
+		counts['invalid'] += invalid
+		counts['corrupted'] += corrupted
+
+	def add_decision(self, policy_name, answer):
+		key = (policy_name, answer)
+		self.decisions[key] = self.decisions.get(key, 0) + 1
+
+	def get_counts(self):
+		"""
+		Returns the counters of the current phase and the decisions and clears them (see merge()).
+		"""
+		counts = (dict(self.phases[self.phase]['counts']), self.decisions)
+		self.phases[self.phase]['counts'] = {'processed': 0, 'invalid': 0, 'corrupted': 0}
+		self.decisions = {}
+		return counts
+
+	def merge(self, counts):
+		"""
+		Adds the counters of a worker process to the current phase (see get_counts()).
+		"""
+		phase_counts, decisions = counts
+		self.add(phase_counts['processed'], phase_counts['invalid'], phase_counts['corrupted'])
+		for key, count in decisions.iteritems():
+			self.decisions[key] = self.decisions.get(key, 0) + count
+
+	def status(self):
+		"""
+		@rtype: OrderedDict
+		@return: returns the status of the run.
+		"""
+		now = time.time()
+
+		status = OrderedDict()
+		status['time'] = now
+		status['elapsed seconds'] = now - self.start_time
+		status['finished'] = self.finished
+		status['phase'] = self.phase
+
+		phases = OrderedDict()
+		for phase, info in self.phases.items():
+			counts = dict(info['counts'])
+			end = info['end'] or now
+			seconds = max(end - info['start'], 1e-9)
+
+			record = OrderedDict()
+			record['processed'] = counts['processed']
+			record['invalid'] = counts['invalid']
+			record['corrupted'] = counts['corrupted']
+			record['total'] = info['total']
+			record['seconds'] = seconds
+			record['tus per second'] = counts['processed'] / seconds
+
+			record['eta seconds'] = None
+			if info['end'] is None and info['total'] is not None and counts['processed'] > 0:
+				record['eta seconds'] = max(info['total'] - counts['processed'], 0) / record['tus per second']
+			phases[phase] = record
+		status['phases'] = phases
+
+		decisions = OrderedDict()
+		for (policy_name, answer), count in sorted(dict(self.decisions).items()):
+			decisions.setdefault(policy_name, OrderedDict())[answer] = count
+		status['decisions'] = decisions
+
+		status['rss bytes'] = resident_memory()
+		return status
+
+	def format_prometheus(self, status):
+		lines = []
+
+		def metric(name, metric_type, help_text, values):
+			lines.append("# HELP tmop_%s %s" % (name, help_text))
+			lines.append("# TYPE tmop_%s %s" % (name, metric_type))
+			for labels, value in values:
+				label_text = ",".join(['%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels])
+				if label_text:
+					label_text = "{" + label_text + "}"
+				lines.append("tmop_%s%s %s" % (name, label_text, repr(float(value))))
+
+		phases = status['phases'].items()
+		metric("tus_processed_total", "counter", "The lines processed in each phase.",
+			[([("phase", p)], r['processed']) for p, r in phases])
+		metric("tus_skipped_total", "counter", "The invalid and the corrupted lines of each phase.",
+			[([("phase", p), ("reason", reason)], r[reason]) for p, r in phases for reason in ['invalid', 'corrupted']])
+		metric("tus_per_second", "gauge", "The throughput of each phase.",
+			[([("phase", p)], r['tus per second']) for p, r in phases])
+		metric("eta_seconds", "gauge", "The estimated time to the end of the current phase.",
+			[([("phase", p)], r['eta seconds']) for p, r in phases if r['eta seconds'] is not None])
+		metric("decisions_total", "counter", "The decisions of each policy.",
+			[([("policy", p), ("decision", a)], c) for p, answers in status['decisions'].items() for a, c in answers.items()])
+		if status['rss bytes'] is not None:
+			metric("resident_memory_bytes", "gauge", "The resident memory of the main process.", [([], status['rss bytes'])])
+		metric("elapsed_seconds", "gauge", "The time since the start of the run.", [([], status['elapsed seconds'])])
+		metric("finished", "gauge", "1 if the run is finished.", [([], int(status['finished']))])
+
+		return "\n".join(lines) + "\n"
+
+	def write_status(self):
+		status = self.status()
+		if self.status_format == "prometheus":
+			text = self.format_prometheus(status)
+		else:
+			text = json.dumps(status, indent=1) + "\n"
+
+		tmp_file_name = self.file_name + ".tmp"
+		f = open(tmp_file_name, "w")
+		f.write(text)
+		f.close()
+		os.rename(tmp_file_name, self.file_name)
+
+	def write_periodically(self):
+		while not self.stop_event.wait(self.interval):
+			try:
+				self.write_status()
+			except Exception, e:
+				# The run is not stopped by the problems of the status file.
+				print "The status file could not be written:", repr(e)
+
+	def stop(self):
+		"""
+		Stops the thread and writes the final status.
+		"""
+		if self.phase is not None:
+			self.phases[self.phase]['end'] = time.time()
+		self.finished = True
+
+		self.stop_event.set()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+		try:
+			self.write_status()
+		except Exception, e:
+			# The run is not stopped by the problems of the status file.
+			print "The status file could not be written:", repr(e)
@@ -0,0 +1,245 @@
+import sys
+import json
+import array
+import struct
+from checkpoint import reopen_file
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The size of the header of the .npy files. The header is written again with the final shape when the file is closed.
+NPY_HEADER_SIZE = 128
+
+# Number of rows kept in memory before writing them in the .npy file.
+BLOCK_SIZE = 10000
+
+# Number of rows kept in memory before fixing the columns, if some filters have not given any scores yet.
+MAX_PENDING_ROWS = 1000
+
+
+class TextScoreWriter(object):
+	"""
+	Writes the scores of each TU in a line of a text file, separated by commas.
+	"""
+
+	def __init__(self, file_name, filter_names, state=None):
+		self.file_name = file_name
+
+		if state is None:
+			self.score_file = open(file_name, "w")
+		else:
+			self.score_file = reopen_file(file_name, state["size"])
+
+	def write(self, scores):
+		"""
+		@type scores: list
+		@param scores: list of tuples of the form (filter name, list of scores) for the filters which gave scores.
+		"""
+		scores = [x[1] for x in scores]
+		scores = str(scores).replace("[", "").replace("]", "").replace(" ", "")
+		self.score_file.write(scores + "\n")
+
+	def get_state(self):
+		"""
+		Returns the state of the writer for the checkpoints of the manager. The writer is made again with this state
+		when the run is resumed.
+		"""
+		self.score_file.flush()
+		return {"size": self.score_file.tell()}
+
+	def close(self):
+		self.score_file.close()
+
+
+class NpyScoreWriter(object):
+	"""
+	Writes the scores in a matrix of float64 numbers in the .npy format, one row for each TU.
+	The matrix could be loaded with numpy.load(file_name, mmap_mode='r').
+	The names of the columns are written in a JSON file next to it ('<file>.columns').
+	A column is named by its filter and, for the filters with two scores, by the side ('LengthRatio', 'WordLength:src').
+	The filters which give no scores in the first rows have no columns and the missing scores of a TU are NaN.
+	"""
+
+	def __init__(self, file_name, filter_names, state=None):
+		self.file_name = file_name
+		self.filter_names = filter_names
+
+		# The number of scores of each filter. It is known after the first score of the filter.
+		self.widths = {}
+		# The position of the first column of each filter.
+		self.positions = None
+		self.num_of_columns = 0
+
+		self.pending_rows = []
+		self.rows = []
+		self.num_of_rows = 0
+
+		if state is None:
+			self.score_file = open(file_name, "wb")
+			self.write_header()
+		else:
+			# The header is written when the file is closed.
+			self.score_file = reopen_file(file_name, state["size"])
+			self.widths = state["widths"]
+			self.positions = state["positions"]
+			self.num_of_columns = state["num_of_columns"]
+			self.num_of_rows = state["num_of_rows"]
+			self.pending_rows = state["pending_rows"]
+
+	def write_header(self):
+		header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (self.num_of_rows, self.num_of_columns)
+		header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+
+		self.score_file.seek(0)
+		self.score_file.write("\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header)
+
+	def write(self, scores):
+		"""
+		@type scores: list
+		@param scores: list of tuples of the form (filter name, list of scores) for the filters which gave scores.
+		"""
+		if self.positions is None:
+			for name, values in scores:
+				if name not in self.widths:
+					self.widths[name] = len(values)
+
+			self.pending_rows.append(scores)
+			if len(self.widths) < len(self.filter_names) and len(self.pending_rows) < MAX_PENDING_ROWS:
+				return
+
+			self.fix_columns()
+			return
+
+		self.add_row(scores)
+
+	def fix_columns(self):
+		self.positions = {}
+		for name in self.filter_names:
+			if name in self.widths:
+				self.positions[name] = self.num_of_columns
+				self.num_of_columns += self.widths[name]
+
+		for scores in self.pending_rows:
+			self.add_row(scores)
+		self.pending_rows = []
+
+	def add_row(self, scores):
+		row = [float('nan')] * self.num_of_columns
+		for name, values in scores:
+			if name not in self.positions:
+				continue
+
+			position = self.positions[name]
+			for i in range(min(len(values), self.widths[name])):
+				row[position + i] = values[i]
+
+		self.rows.append(row)
+		if len(self.rows) >= BLOCK_SIZE:
+			self.flush()
+
+	def flush(self):
+		values = array.array('d', [x for r in self.rows for x in r])
+		if sys.byteorder == 'big':
+			values.byteswap()
+		values.tofile(self.score_file)
+		self.num_of_rows += len(self.rows)
+		self.rows = []
+
+	def get_state(self):
+		"""
+		Returns the state of the writer for the checkpoints of the manager (see TextScoreWriter.get_state()).
+		"""
+		if self.positions is not None:
+			self.flush()
+		self.score_file.flush()
+
+		return {"size": self.score_file.tell(), "widths": self.widths, "positions": self.positions,
+			"num_of_columns": self.num_of_columns, "num_of_rows": self.num_of_rows, "pending_rows": self.pending_rows}
+
+	def column_names(self):
+		names = []
+		for name in self.filter_names:
+			if name not in self.positions:
+				continue
+
+			width = self.widths[name]
+			if width == 1:
+				names.append(name)
+			elif width == 2:
+				names += [name + ":src", name + ":trg"]
+			else:
+				names += [name + ":" + str(i) for i in range(width)]
+		return names
+
+	def close(self):
+		if self.positions is None:
+			self.fix_columns()
+		self.flush()
+
+		self.write_header()
+		self.score_file.close()
+
+		f = open(self.file_name + ".columns", "w")
+		json.dump({"columns": self.column_names(), "rows": self.num_of_rows}, f, indent=1)
+		f.close()
+
+
+class ScoreBuffer(object):
+	"""
+	Keeps the scores in memory, e.g. in the worker processes of a learning scan. The rows are written in the scores
+	file by the main process in the order of the input.
+	"""
+
+	def __init__(self):
+		self.rows = []
+
+	def write(self, scores):
+		"""
+		@type scores: list
+		@param scores: list of tuples of the form (filter name, list of scores) for the filters which gave scores.
+		"""
+		self.rows.append(scores)
+
+
+def make_score_writer(file_name, filter_names, score_format="text", state=None):
+	"""
+	Makes a writer for the scores of the filters.
+	If the state of a writer is given (see get_state()), the file is not made again and the writer continues it.
+
+	@type filter_names: list
+	@param filter_names: The names of the filters which give scores, in the order of their columns.
+
+	@type score_format: str
+	@param score_format: 'text' for the comma separated text file or 'npy' for the binary matrix.
+	"""
+	if score_format == "npy":
+		return NpyScoreWriter(file_name + ".npy", filter_names, state)
+	return TextScoreWriter(file_name, filter_names, state)
@@ -1,10 +1,15 @@
 import os
-import re
 import sys
+import glob
+import time
 import json
+import hashlib
 import codecs
 import inspect
 import threading
+import multiprocessing
+from collections import deque, OrderedDict
+from cStringIO import StringIO
 from copy import copy
 # from filters.abstract_filter import TU
 
@@ -40,6 +45,30 @@ authors and should not be interpreted as representing official policies, either
 or implied, of the copyright holder.
 """
 
+# The manager used by the worker processes of the decision section and the parallel learning scans.
+# It is set before making the processes, so they inherit it when they are forked.
+_worker_manager = None
+
+
+def _decide_chunk(chunk):
+	return _worker_manager.decide_chunk(chunk)
+
+
+def _learn_chunk(chunk):
+	return _worker_manager.learn_chunk(chunk)
+
+
+def state_size(obj):
+	"""
+	Returns the number of bytes of the pickled state of a filter or a service (see Profiler.add_size()).
+	"""
+	import cPickle
+	try:
+		return len(cPickle.dumps(obj.get_state(), cPickle.HIGHEST_PROTOCOL))
+	except Exception:
+		return 0
+
+
 class TMManager:
 	"""
 	This class manages all filters based on config file. After calling run() method,
@@ -60,6 +89,12 @@ class TMManager:
 		# each entry is a tuple of the form (policy_name, policy_object).
 		self.policies = []
 
+		# The shared services used by the filters (e.g. the word embeddings of the WE filters).
+		# The keys are the names of the services and the values are the initialized services.
+		self.services = OrderedDict()
+		# The arguments given to the filters and the services in their initialization.
+		self.filters_arguments = {}
+
 		# The handlers of all the output files are kept in this dictionary.
 		# The Keys are the names of files and the values are handlers.
 		self.output_files = {}
@@ -72,14 +107,132 @@ class TMManager:
 		self.have_token = False
 		self.create_out_files = True
 
+		# Without an align file, the alignments of the TUs could be made by the aligner service (see
+		# alignment_service.py) with the 'aligner' model ('ibm1' or 'fast_align') trained in 'aligner iterations'
+		# EM iterations. 'none' means the TUs have no alignments.
+		self.aligner_model = 'none'
+		self.aligner_iterations = 5
+		self.aligner = None
+
+		# The size of the quantile sketches of the scores in the statistical filters (see quantile_sketch.py).
+		# The bigger sketches give more accurate percentiles.
+		self.quantile_sketch_size = 200
+
+		# The folder of the model registry, where the filters and the services keep their models (see model_registry.py).
+		self.models_folder = "models/registry"
+
+		# The number of lines sampled from the input by the estimate mode ('--estimate', see estimator.py).
+		self.estimate_sample_size = 10000
+
+		# The input file is read as a tab separated file ('csv') or as a TMX file ('tmx', see tmx_reader.py).
+		# If 'input format' is 'auto', the files with the '.tmx' extension are read as TMX files.
+		self.input_format = 'csv'
+
+		# Paths of the input files and the tokenizers of the two languages used when there is no token file.
+		# They are set at the start of the learning section.
+		self.input_file_path = ""
+		self.align_file_path = ""
+		self.token_file_path = ""
+		self.src_tokenizer = None
+		self.trg_tokenizer = None
+		# Each tokenizer keeps the tokens of at most 'tokenizer cache size' phrases (0 means no cache).
+		self.tokenizer_cache_size = 100000
+		# The name of the input file without the extension of its compression, used in the names of the output files.
+		self.output_name = ""
+
+		# Number of processes used in the decision section and the number of lines given to each of them at once.
+		self.decision_processes = 1
+		self.decision_chunk_size = 10000
+
+		# Number of processes used in the learning scans and the number of lines given to each of them at once.
+		# A scan is split between the processes only if the statistics of all its filters could be merged (see
+		# AbstractFilter.statistics) and no service is scanned in it. Otherwise the scan is done in this process.
+		self.learning_processes = 1
+		self.learning_chunk_size = 10000
+		# The scan given to the worker processes of a learning scan, as a tuple of the form
+		# (scan number, active filters, True if the scores are written).
+		self.parallel_scan = None
+
+		# Number of TUs given to the filters at once (see AbstractFilter.process_batch() and decide_batch()).
+		self.batch_size = 1000
+
+		# In the worker processes of the decision section, the outputs are kept in memory and sent back to the main process.
+		self.in_worker = False
+
+		# The output files of the decision section are written on the thread of this writer.
+		# If 'output compression' is 'gz', 'bz2' or 'xz', the blocks of the outputs are compressed by
+		# 'output compression threads' threads and the extension of the format is added to the names of the outputs.
+		self.output_writer = None
+		self.output_block_size = 1 << 20
+		self.output_compression = None
+		self.output_compression_threads = 2
+		self.log_format = 'tsv'
+
+		# The parsed TUs are kept in a store after the first scan, if 'tu store' option is on.
+		self.use_tu_store = False
+		self.tu_store_path = ""
+		self.tu_store = None
+		self.tu_store_writer = None
+
+		# The line indexes of the input files, if 'line index' option is on.
+		# The keys are 'input', 'align' and 'token' and the values are LineIndex objects.
+		self.use_line_index = False
+		self.line_indexes = {}
+
+		# The decisions of the TUs are kept in this cache, so the duplicate TUs are not given to the filters again.
+		# It has at most 'decision cache size' entries (0 means no cache). In the decision section with several
+		# processes, each process has its own cache and their counters are added in 'cache_counters'.
+		self.decision_cache = None
+		self.decision_cache_size = 100000
+		self.decision_cache_eviction = 'lru'
+		self.cache_counters = [0, 0, 0]
+
+		# In the decision section, the filters are given the TUs in the order of the scheduler and a TU is not given
+		# to the other filters when the answers of all policies are fixed (see evaluate_tus()). The filters which
+		# are not evaluated have the 'not_evaluated' answer in the decision log.
+		# If 'full evaluation' is true, all filters are evaluated for every TU.
+		self.full_evaluation = False
+		self.scheduler = None
+
+		# If 'profile' is true, the calls of the filters, the services and the policies are timed and a report is
+		# written in the output folder at the end of the run (see profiler.Profiler).
+		self.profiler = None
+
+		# If 'progress file' is given, the progress of the run is written in that file every 'progress interval'
+		# seconds, in the 'json' or 'prometheus' format (see progress.ProgressMonitor). The file is in the output
+		# folder, if its path is not absolute.
+		self.monitor = None
+		self.progress_file = ""
+		self.progress_format = 'json'
+		self.progress_interval = 10
+		# The number of lines of the input, when it is known after a full scan.
+		self.input_size = None
+
+		# The state of the run is saved in the checkpoint file every 'checkpoint interval' TUs, if it is more than 0.
+		# The byte offsets of the next line of the input, the alignment and the token files are kept by read_tm() for
+		# the checkpoints.
+		self.checkpoint_interval = 0
+		self.checkpoint_file_name = ""
+		self.read_offsets = None
+
+		# The options of the server mode (see tm_server.py). If the socket is given, the server listens on that Unix
+		# socket instead of the localhost port. The requests which come in 'server max wait' milliseconds are decided
+		# in one batch.
+		self.server_port = 8765
+		self.server_socket = ""
+		self.server_max_wait = 5
+
 		self.config_file_name = conf_file_name
 
 	#
-	def load_options_from_config_file(self):
+	def load_options_from_config_file(self, require_input_file=True):
 		"""
 		This function reads the config file and extracts the information about how the tm_manager should work.
 		After calling this function, the input file, the output file and the policy is determined.
 
+		@type require_input_file: bool
+		@param require_input_file: If it is False, the 'input file' option is not needed.
+
 		@rtype: int
 		@return: returns 0 if there is no error. otherwise, returns error number.
 		"""
@@ -106,7 +259,7 @@ class TMManager:
 			print "There is no object called 'options' in the config file."
 			return 2
 		self.options = config['options']
-		if 'input file' not in self.options or len(self.options['input file']) < 1:
+		if require_input_file and ('input file' not in self.options or len(self.options['input file']) < 1):
 			print "The 'input file' is not indicated in config file."
 			return 21
 
@@ -125,6 +278,29 @@ class TMManager:
 		if 'token file' in self.options:
 			self.have_token = True
 
+		self.aligner_model = 'none'
+		if 'aligner' in self.options:
+			self.aligner_model = self.options['aligner'].lower()
+			if self.aligner_model not in ['none', 'ibm1', 'fast_align']:
+				print "The 'aligner' should be 'none', 'ibm1' or 'fast_align'."
+				return 29
+
+		self.aligner_iterations = 5
+		if 'aligner iterations' in self.options:
+			self.aligner_iterations = max(int(self.options['aligner iterations']), 1)
+
+		self.input_format = 'auto'
+		if 'input format' in self.options:
+			self.input_format = self.options['input format'].lower()
+			if self.input_format not in ['auto', 'csv', 'tmx']:
+				print "The 'input format' should be 'auto', 'csv' or 'tmx'."
+				return 27
+		if self.input_format == 'auto':
+			self.input_format = 'csv'
+			from compression import strip_extension
+			if strip_extension(self.options.get('input file', "")).lower().endswith(".tmx"):
+				self.input_format = 'tmx'
+
 		self.create_out_files = True
 		if 'no out files' in self.options:
 			if self.options['no out files'].lower() in ['true', 'yes', 'ok']:
@@ -135,11 +311,151 @@ class TMManager:
 			if self.options['normalize scores'].lower() in ['true', 'yes', 'ok']:
 				self.normalize_scores = True
 
+		self.quantile_sketch_size = 200
+		if 'quantile sketch size' in self.options:
+			self.quantile_sketch_size = int(self.options['quantile sketch size'])
+
+		self.models_folder = "models/registry"
+		if 'models folder' in self.options:
+			self.models_folder = self.options['models folder']
+
+		self.estimate_sample_size = 10000
+		if 'estimate sample size' in self.options:
+			self.estimate_sample_size = int(self.options['estimate sample size'])
+
 		self.have_scores = False
 		if 'emit scores' in self.options:
 			if self.options['emit scores'].lower() in ['true', 'yes', 'ok']:
 				self.have_scores = True
 
+		self.scores_format = "text"
+		if 'scores format' in self.options:
+			self.scores_format = self.options['scores format'].lower()
+			if self.scores_format not in ['text', 'npy']:
+				print "The 'scores format' should be 'text' or 'npy'."
+				return 23
+
+		self.decision_processes = 1
+		if 'decision processes' in self.options:
+			self.decision_processes = int(self.options['decision processes'])
+			if self.decision_processes == 0:
+				self.decision_processes = multiprocessing.cpu_count()
+
+		self.decision_chunk_size = 10000
+		if 'decision chunk size' in self.options:
+			self.decision_chunk_size = max(int(self.options['decision chunk size']), 1)
+
+		self.learning_processes = 1
+		if 'learning processes' in self.options:
+			self.learning_processes = int(self.options['learning processes'])
+			if self.learning_processes == 0:
+				self.learning_processes = multiprocessing.cpu_count()
+
+		self.learning_chunk_size = 10000
+		if 'learning chunk size' in self.options:
+			self.learning_chunk_size = max(int(self.options['learning chunk size']), 1)
+
+		self.batch_size = 1000
+		if 'batch size' in self.options:
+			self.batch_size = max(int(self.options['batch size']), 1)
+
+		self.use_tu_store = False
+		if 'tu store' in self.options:
+			if self.options['tu store'].lower() in ['true', 'yes', 'ok']:
+				self.use_tu_store = True
+
+		self.output_block_size = 1 << 20
+		if 'output block size' in self.options:
+			self.output_block_size = max(int(self.options['output block size']), 1)
+
+		self.output_compression = None
+		if 'output compression' in self.options:
+			self.output_compression = self.options['output compression'].lower()
+			if self.output_compression not in ['none', 'gz', 'bz2', 'xz']:
+				print "The 'output compression' should be 'none', 'gz', 'bz2' or 'xz'."
+				return 28
+			if self.output_compression == 'none':
+				self.output_compression = None
+			elif self.output_compression == 'xz':
+				from compression import import_lzma
+				try:
+					import_lzma()
+				except ImportError, e:
+					print e
+					return 28
+
+		self.output_compression_threads = 2
+		if 'output compression threads' in self.options:
+			self.output_compression_threads = max(int(self.options['output compression threads']), 1)
+
+		self.log_format = 'tsv'
+		if 'decision log format' in self.options:
+			self.log_format = self.options['decision log format'].lower()
+			if self.log_format not in ['tsv', 'jsonl']:
+				print "The 'decision log format' should be 'tsv' or 'jsonl'."
+				return 24
+
+		self.use_line_index = False
+		if 'line index' in self.options:
+			if self.options['line index'].lower() in ['true', 'yes', 'ok']:
+				self.use_line_index = True
+		if self.use_line_index and self.input_format == 'tmx':
+			print "The line index is not used for the TMX input."
+			self.use_line_index = False
+
+		self.profiler = None
+		if 'profile' in self.options and self.options['profile'].lower() in ['true', 'yes', 'ok']:
+			from profiler import Profiler
+			self.profiler = Profiler()
+
+		self.progress_file = self.options.get('progress file', "")
+
+		self.progress_format = 'json'
+		if 'progress format' in self.options:
+			self.progress_format = self.options['progress format'].lower()
+			if self.progress_format not in ['json', 'prometheus']:
+				print "The 'progress format' should be 'json' or 'prometheus'."
+				return 26
+
+		self.progress_interval = 10
+		if 'progress interval' in self.options:
+			self.progress_interval = max(float(self.options['progress interval']), 0.1)
+
+		self.full_evaluation = False
+		if 'full evaluation' in self.options:
+			self.full_evaluation = self.options['full evaluation'].lower() in ['true', 'yes', 'ok']
+
+		self.decision_cache_size = 100000
+		if 'decision cache size' in self.options:
+			self.decision_cache_size = max(int(self.options['decision cache size']), 0)
+
+		self.decision_cache_eviction = 'lru'
+		if 'decision cache eviction' in self.options:
+			self.decision_cache_eviction = self.options['decision cache eviction'].lower()
+			if self.decision_cache_eviction not in ['lru', 'fifo']:
+				print "The 'decision cache eviction' should be 'lru' or 'fifo'."
+				return 25
+
+		self.tokenizer_cache_size = 100000
+		if 'tokenizer cache size' in self.options:
+			self.tokenizer_cache_size = max(int(self.options['tokenizer cache size']), 0)
+
+		self.checkpoint_interval = 0
+		if 'checkpoint interval' in self.options:
+			self.checkpoint_interval = max(int(self.options['checkpoint interval']), 0)
+
+		self.server_port = 8765
+		if 'server port' in self.options:
+			self.server_port = int(self.options['server port'])
+
+		self.server_socket = ""
+		if 'server socket' in self.options:
+			self.server_socket = self.options['server socket']
+
+		self.server_max_wait = 5
+		if 'server max wait' in self.options:
+			self.server_max_wait = max(int(self.options['server max wait']), 0)
+
 		# making the output folder
 		path = os.getcwd() + "/" + self.options['output folder']
 		if not os.path.isdir(path):
@@ -161,6 +477,35 @@ class TMManager:
 		print "\nDone."
 		return 0
 
+	#
+	def get_service(self, name):
+		"""
+		Returns the shared service with the given name. The service is made and initialized the first time it is asked,
+		so the work of a service (e.g. training the word embeddings) is done once for all filters which use it.
+		The filters call this function in their initialize() function through extra_args['services'].
+
+		@type name: str
+		@param name: The name of the service in filter_registry.SERVICES.
+		"""
+		if name in self.services:
+			return self.services[name]
+
+		from filter_registry import SERVICES, missing_dependencies
+
+		if name not in SERVICES:
+			raise ValueError("There is no service named '" + name + "'.")
+		entry = SERVICES[name]
+
+		missing = missing_dependencies(entry)
+		if len(missing) > 0:
+			raise ImportError("The service " + name + " needs these libraries which are not installed: " + ", ".join(missing))
+
+		service = getattr(__import__(entry['module']), entry['class'])()
+		service.initialize(self.options['source language'], self.options['target language'], copy(self.filters_arguments))
+
+		self.services[name] = service
+		return service
+
 	#
 	def load_filters(self):
 		"""
@@ -172,6 +517,10 @@ class TMManager:
 
 		self.filters = []
 		from abstract_filter import AbstractFilter
+		from filter_registry import load_registry, missing_dependencies
+
+		# The manifest tells which module and class belong to each filter, so only the enabled filters are imported.
+		registry = load_registry()
 
 		# path is absolute path of filters folder
 		path = os.getcwd() + '/filters/'
@@ -190,17 +539,40 @@ class TMManager:
 				continue
 
 			sys.path.append(path + filter_name)
-			# filter_module = __import__(filter_name)
-			__import__(filter_name)
 
-			# Extracting Classes from the module
-			module_classes = inspect.getmembers(sys.modules[filter_name], inspect.isclass)
+			if filter_name in registry:
+				entry = registry[filter_name]
 
-			# Finding the base class of the filter
-			module_classes = [x for x in module_classes if x[0] == filter_name]
-			if len(module_classes) == 0:
-				print "There is no class named '" + filter_name + "' in the '" + filter_name + ".py' file."
-				continue
+				missing = missing_dependencies(entry)
+				if len(missing) > 0:
+					print "The filter", filter_name, "needs these libraries which are not installed:", ", ".join(missing)
+					continue
+
+				try:
+					__import__(entry['module'])
+				except Exception, e:
+					print "Couldn't import the module of " + filter_name
+					print "The Exception:"
+					print repr(e)
+					continue
+
+				if not hasattr(sys.modules[entry['module']], entry['class']):
+					print "There is no class named '" + entry['class'] + "' in the '" + entry['module'] + ".py' file."
+					continue
+
+				module_classes = [(entry['class'], getattr(sys.modules[entry['module']], entry['class']))]
+			else:
+				# filter_module = __import__(filter_name)
+				__import__(filter_name)
+
+				# Extracting Classes from the module
+				module_classes = inspect.getmembers(sys.modules[filter_name], inspect.isclass)
+
+				# Finding the base class of the filter
+				module_classes = [x for x in module_classes if x[0] == filter_name]
+				if len(module_classes) == 0:
+					print "There is no class named '" + filter_name + "' in the '" + filter_name + ".py' file."
+					continue
 
 			# Instantiating from the filter class
 			try:
@@ -286,9 +658,21 @@ class TMManager:
 		print "\nDone.\n----------\n"
 
 	#
-	def policy_check_for_tu(self, tu_string, results):
-		self.output_files['log'].write(tu_string.split('\t')[0] + '\t')
+	def check_policies(self, results):
+		"""
+		Gives the answers of the filters for a TU to all policies.
+
+		@type results: list
+		@param results: list of tuples of the form (filter name, filter answer).
+
+		@rtype: list
+		@return: returns a list of tuples of the form (policy name, policy answer).
+		"""
+		profiler = self.profiler
+		answers = []
 		for policy_tuple in self.policies:
+			if profiler is not None:
+				start = time.time()
 			try:
 				answer = policy_tuple[1].decide(results)
 			except Exception, e:
@@ -296,29 +680,143 @@ class TMManager:
 				print "The Exception:"
 				print repr(e)
 				answer = 'no_answer'
+			if profiler is not None:
+				profiler.add('policy', policy_tuple[0], 'decide', time.time() - start)
+
+			answers.append((policy_tuple[0], answer))
+		return answers
+
+	#
+	def check_decided_policies(self, results):
+		"""
+		Gives the partial answers of the filters for a TU to all policies (see AbstractPolicy.is_decided()).
+
+		@type results: list
+		@param results: list of tuples of the form (filter name, filter answer). The answer is None for the filters
+		which are not evaluated yet.
+
+		@rtype: list
+		@return: returns a list of tuples of the form (policy name, policy answer), or None if the answer of a policy
+		is not fixed yet.
+		"""
+		profiler = self.profiler
+		answers = []
+		for policy_tuple in self.policies:
+			if profiler is not None:
+				start = time.time()
+			try:
+				answer = policy_tuple[1].is_decided(results)
+			except Exception, e:
+				print "There is a problem with decision making in policy " + policy_tuple[0]
+				print "The Exception:"
+				print repr(e)
+				answer = 'no_answer'
+			if profiler is not None:
+				profiler.add('policy', policy_tuple[0], 'is_decided', time.time() - start)
+
+			if answer is None:
+				return None
+			answers.append((policy_tuple[0], answer))
+		return answers
+
+	#
+	def policy_check_for_tu(self, tu_string, results, answers=None):
+		"""
+		Writes the decisions for a TU in the output files. If the answers of the policies are not given, the results
+		of the filters are given to the policies.
+		"""
+		if answers is None:
+			answers = self.check_policies(results)
+
+		if self.monitor is not None:
+			for policy_name, answer in answers:
+				self.monitor.add_decision(policy_name, answer)
 
-			# ----- Writing the results in separate files -----
-			if self.create_out_files:
-				if (answer + "_" + policy_tuple[0]) not in self.output_files:
-					path = os.getcwd() + "/" + self.options['output folder'] + "/"
-					out_file_name = path + answer + "_" + policy_tuple[0] + "__" + self.options['input file']
+		# ----- Writing the results in separate files -----
+		if self.create_out_files:
+			for policy_name, answer in answers:
+				self.get_output_file(answer + "_" + policy_name).write(tu_string + "\n")
 
-					out_file = open(out_file_name, 'w')
-					self.output_files[(answer + "_" + policy_tuple[0])] = out_file
+		self.output_files['log'].write(self.format_log_record(tu_string.split('\t')[0], answers, results))
 
-				self.output_files[(answer + "_" + policy_tuple[0])].write(tu_string + "\n")
+	#
+	def format_log_record(self, tu_id, answers, results):
+		"""
+		Makes the line of the decision log for a TU.
+		In the 'tsv' format, the line has the ID, the code and the answer of each policy and the answer of each filter.
+		In the 'jsonl' format, the line is a JSON object with 'id', 'policies' and 'filters' keys.
 
+		@type answers: list
+		@param answers: list of tuples of the form (policy name, policy answer).
+
+		@type results: list
+		@param results: list of tuples of the form (filter name, filter answer).
+		"""
+		if self.log_format == 'jsonl':
+			record = OrderedDict()
+			record['id'] = tu_id.decode("utf-8", "replace")
+			record['policies'] = OrderedDict(answers)
+			record['filters'] = OrderedDict(results)
+			return json.dumps(record, separators=(',', ':')) + '\n'
+
+		record = [tu_id, '\t']
+		for policy_name, answer in answers:
 			if answer == 'reject':
-				self.output_files['log'].write('0\treject\t')
+				record.append('0\treject\t')
 			elif answer == 'accept':
-				self.output_files['log'].write('2\taccept\t')
+				record.append('2\taccept\t')
 			else:
-				self.output_files['log'].write('1\t' + answer + '\t')
+				record.append('1\t' + answer + '\t')
 
 		for r in results:
-			self.output_files['log'].write('\t#|#\t' + r[0] + '\t' + r[1])
+			record.append('\t#|#\t' + r[0] + '\t' + r[1])
+
+		record.append('\n')
+		return ''.join(record)
+
+	#
+	def format_skipped_log_record(self, line):
+		"""
+		Makes the line of the decision log for a skipped TU.
+		"""
+		if self.log_format == 'jsonl':
+			record = OrderedDict()
+			record['id'] = None
+			record['skipped'] = 'invalid'
+			if len(line) == 3:
+				record['id'] = line[0].decode("utf-8", "replace")
+				record['skipped'] = 'corrupted'
+			return json.dumps(record, separators=(',', ':')) + '\n'
+
+		return '-1\tskipped\n'
+
+	#
+	def open_output_file(self, file_name):
+		"""
+		Opens an output file. If the output writer is running, the file is written by its thread.
+		"""
+		if self.output_writer is not None:
+			if self.output_compression is not None:
+				from compression import OUTPUT_EXTENSIONS
+				file_name += OUTPUT_EXTENSIONS[self.output_compression]
+			return self.output_writer.open(file_name)
+		return open(file_name, 'w')
+
+	#
+	def get_output_file(self, name):
+		"""
+		Returns the handler of the output file for the given name (e.g. 'accept_OneNo').
+		The file is created the first time it is asked for.
+		In the worker processes of the decision section, an in-memory buffer is returned instead of a file.
+		"""
+		if name not in self.output_files:
+			if self.in_worker:
+				self.output_files[name] = StringIO()
+			else:
+				path = os.getcwd() + "/" + self.options['output folder'] + "/"
+				self.output_files[name] = self.open_output_file(path + name + "__" + self.output_name)
 
-		self.output_files['log'].write('\n')
+		return self.output_files[name]
 
 	#
 	def close_output_files(self):
@@ -326,333 +824,1742 @@ class TMManager:
 			handler.close()
 
 	#
-	def run(self):
-		"""
-		This function has 3 sections. In the first section it calls initializer functions to prepare the tm_manager.
-		In the second section, 'Learning Section', TM input is scanned for several times for the
-		filters functions which are called and the input data is given to them.
-		In the last section, 'Decision Section', each Translation Unit is given to all filters and the results are
-		stored in the 'results' array. The policy_check_for_tu() is then called with the results array as the input
-		and the output of that function indicates whether the TU should be deleted or not.
+	def read_tm(self, max_lines=-1, start=0, end=None, offsets=None):
 		"""
-		print "Running the TM cleaner ..."
-		from abstract_filter import TU
+		Reads the input file together with the alignment and the token files (if they are given) line by line.
+		The files are read in lockstep, so the n-th line of every file belongs to the n-th translation unit.
+		With the line indexes, reading could start from any line.
 
-		if self.load_options_from_config_file() > 0:
-			print "Exiting before finishing."
-			print "-------------------------"
-			return
-		self.load_filters()
-		self.load_policies()
+		@type max_lines: int
+		@param max_lines: The maximum number of lines to read. Negative values mean the whole file.
 
-		# Clearing the arrays
-		self.close_output_files()
-		self.output_files = {}
+		@type start: int
+		@param start: The number of lines to skip from the start of the files. It needs the line indexes.
 
-		print "Initializing the filters..."
+		@type end: int
+		@param end: The number of the line to stop after. None means the end of the files.
 
-		filters_arguments = {}
-		filters_arguments["source language"] = self.options['source language']
-		filters_arguments["target language"] = self.options['target language']
-		filters_arguments["input filename"] = self.options['input file']
-		filters_arguments["normalize scores"] = self.normalize_scores
-		filters_arguments["emit scores"] = self.have_scores
+		@type offsets: list
+		@param offsets: The byte offsets of the input, the alignment and the token files to start from, as they are
+		kept in self.read_offsets. If they are given, 'start' is the number of lines before them.
 
-		for i in range(len(self.filters)):
-			try:
-				# intializing the filters
-				self.filters[i][1].initialize(self.options['source language'], self.options['target language'], copy(filters_arguments))
-				# updating the number of scans
-				self.filters[i] = (self.filters[i][0], self.filters[i][1], self.filters[i][1].num_of_scans)
-			except Exception, e:
-				print "Couldn't initialize the filter", self.filters[i][0]
-				print "This filter is excluded from the active filters."
-				print "The Exception:"
-				print repr(e)
-				self.filters[i] = (self.filters[i][0], self.filters[i][1], -1)
+		@rtype: generator
+		@return: yields tuples of the form (line_no, line, align_line, token_line).
+		"""
+		# The input file is in CSV Tab separated format, or the TUs of a TMX file are given in the same format.
+		# The compressed files are decompressed while they are read.
+		from compression import open_input
+		if self.input_format == 'tmx':
+			from tmx_reader import TMXReader
+			# The TMX file could not be read from an offset, so the TUs before the start are parsed and skipped.
+			tm_file = TMXReader(self.input_file_path, self.options['source language'], self.options['target language'], start)
+		else:
+			tm_file = open_input(self.input_file_path)
+		tm_align_file = None
+		tm_token_file = None
+		if self.have_alignment is True:
+			tm_align_file = open_input(self.align_file_path)
+		if self.have_token is True:
+			tm_token_file = open_input(self.token_file_path)
+
+		if offsets is not None:
+			if self.input_format != 'tmx':
+				tm_file.seek(offsets[0])
+			if tm_align_file is not None:
+				tm_align_file.seek(offsets[1])
+			if tm_token_file is not None:
+				tm_token_file.seek(offsets[2])
+		elif start > 0:
+			if self.input_format != 'tmx':
+				tm_file.seek(self.line_indexes['input'].offset(start))
+			if tm_align_file is not None:
+				tm_align_file.seek(self.line_indexes['align'].offset(start))
+			if tm_token_file is not None:
+				tm_token_file.seek(self.line_indexes['token'].offset(start))
+
+		read_offsets = [0, 0, 0]
+		if self.input_format != 'tmx':
+			read_offsets[0] = tm_file.tell()
+		if tm_align_file is not None:
+			read_offsets[1] = tm_align_file.tell()
+		if tm_token_file is not None:
+			read_offsets[2] = tm_token_file.tell()
+		self.read_offsets = read_offsets
+
+		if 0 <= max_lines and (end is None or max_lines < end):
+			end = max_lines
 
-		# Removing the excluded filters.
-		self.filters = [f_tuple for f_tuple in self.filters if f_tuple[2] >= 0]
+		try:
+			line_no = start
+			for line in tm_file:
+				line_no += 1
+				if end is not None and end < line_no:
+					break
 
-		if len(self.filters) == 0:
-			print "There are no active filters."
-			print "Exiting before finishing."
-			print "-------------------------"
-			return
+				align_line = ""
+				if tm_align_file is not None:
+					align_line = tm_align_file.readline()
 
-		# ---------- Learning Section ----------
-		print "Learning Section :"
-		print "======================================================================"
+				token_line = ""
+				if tm_token_file is not None:
+					token_line = tm_token_file.readline()
 
-		# Finding maximum number of scans required for filters.
-		max_scan = 0
-		for filter_tuple in self.filters:
-			max_scan = max(max_scan, filter_tuple[2])
+				read_offsets[0] += len(line)
+				read_offsets[1] += len(align_line)
+				read_offsets[2] += len(token_line)
 
-		print "\nNumber of active filters:", len(self.filters)
-		print "Number of scans needed:", max_scan
-		print "-----------------------"
+				yield line_no, line, align_line, token_line
+		finally:
+			# closing data files
+			tm_file.close()
+			if tm_align_file is not None:
+				tm_align_file.close()
+			if tm_token_file is not None:
+				tm_token_file.close()
 
-		# Extending the input URL
-		input_file_path = os.getcwd() + '/data/' + self.options['input file']
+	#
+	def make_tokenizers(self):
+		"""
+		Makes the tokenizers of the source and the target languages, which are used when there is no token file.
+		"""
+		from tokenizer import Tokenizer
+		self.src_tokenizer = Tokenizer(self.options['source language'], self.tokenizer_cache_size)
+		self.trg_tokenizer = Tokenizer(self.options['target language'], self.tokenizer_cache_size)
 
-		if not os.path.isfile(input_file_path):
-			print "Input file not found!\nGiven file in config file:", input_file_path
-			print "Exiting the code."
-			return
+	#
+	def make_tu(self, line, align_line, token_line):
+		"""
+		Makes a TU object from a line of the input file which is already split by tabs.
+		The source and the target phrases in the given line are stripped in place.
+		An exception is raised if the translation unit is corrupted.
 
-		if self.have_alignment:
-			align_file_path = os.getcwd() + '/data/' + self.options['align file']
+		@type line: list
+		@param line: The three fields of a line of the input file.
 
-			if not os.path.isfile(align_file_path):
-				print "Alignment file not found!\nGiven file in config file:", align_file_path
-				print "Exiting the code."
-				return
+		@rtype: TU
+		@return: returns the translation unit.
+		"""
+		from abstract_filter import TU
 
-		# For tokenizing the TUs and put the output in TU objects
-		if self.have_token:
-			token_file_path = os.getcwd() + '/data/' + self.options['token file']
+		# The 1st and 2nd elements of each line are phrases from source and target language.
+		line[1] = line[1].strip()
+		line[2] = line[2].strip()
 
-			if not os.path.isfile(token_file_path):
-				print "Token file not found!\nGiven file in config file:", token_file_path
-				print "Exiting the code."
-				return
+		if type(line[1]) != unicode:
+			src_phrase = line[1].decode("utf-8")
 		else:
-			tokenizer = re.compile(r"\(|\)|\w+|\$[\d\.]+|\S+")
+			src_phrase = line[1]
 
-		if self.have_scores:
-			out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
-			score_file_name = out_path + "scores__" + self.options['input file']
-			score_file = open(score_file_name, "w")
-			score_file.close()
+		if type(line[2]) != unicode:
+			trg_phrase = line[2].decode("utf-8")
+		else:
+			trg_phrase = line[2]
 
-		for scan_number in range(max_scan):
-			print "Scan iteration ", scan_number + 1, ":"
-			active_filters = [(x[0], x[1], x[2]-(max_scan-scan_number)) for x in self.filters if x[2] >= max_scan-scan_number]
+		if self.have_token is True:
+			token_line = token_line[:-1].lower().split("\t")
 
-			# The input file is in CSV Tab separated format.
-			tm_file = open(input_file_path, 'rb')
-			if self.have_alignment is True:
-				tm_align_file = open(align_file_path, 'r')
-			if self.have_token is True:
-				tm_token_file = open(token_file_path, 'rb')
+			src_tokens = token_line[0].split()
+			trg_tokens = token_line[1].split()
+		else:
+			src_tokens = self.src_tokenizer.tokenize(src_phrase)
+			trg_tokens = self.trg_tokenizer.tokenize(trg_phrase)
 
-			line_no = 0
-			for line in tm_file:
-				line_no += 1
-				line = line.split("\t")
+		alignment = ()
+		if self.have_alignment is True:
+			alignment = align_line.strip().split(" ")
+			alignment = [x.split('-') for x in alignment if x != '']
+			alignment = [(int(x[0]), int(x[1])) for x in alignment]
 
-				if self.have_alignment is True:
-					alignment = tm_align_file.readline()
-					alignment = alignment.strip().split(" ")
-					alignment = [x.split('-') for x in alignment if x != '']
+		return TU(src_phrase, trg_phrase, src_tokens, trg_tokens, alignment)
 
-				if len(line) != 3:
-					print "Invalid translation unit at line ", line_no
-					continue
+	#
+	def parse_line(self, line_no, line, align_line, token_line):
+		"""
+		Parses a line of the input file with the corresponding lines of the alignment and the token files.
+		If the line is not valid, it has not three fields and the TU is None.
+		If the TU is corrupted, the TU is None and the error message is returned.
 
-				# The 1st and 2nd elements of each line are phrases from source and target language.
-				line[1] = line[1].strip()
-				line[2] = line[2].strip()
-				tu = TU()
-				try:
-					if type(line[1]) != unicode:
-						tu.src_phrase = line[1].decode("utf-8")
-					else:
-						tu.src_phrase = line[1]
-
-					if type(line[2]) != unicode:
-						tu.trg_phrase = line[2].decode("utf-8")
-					else:
-						tu.trg_phrase = line[2]
-
-					if self.have_token is True:
-						token_line = tm_token_file.readline()
-						token_line = token_line[:-1].lower().split("\t")
-
-						tu.src_tokens = token_line[0].split()
-						tu.trg_tokens = token_line[1].split()
-					else:
-						tu.src_tokens = tokenizer.findall(tu.src_phrase.lower())
-						tu.trg_tokens = tokenizer.findall(tu.trg_phrase.lower())
-
-					if self.have_alignment is True:
-						tu.alignment = [(int(x[0]), int(x[1])) for x in alignment]
-
-				except UnicodeEncodeError as err:
-					print ("[" + str(err.start) + ", " + str(err.end) + "]"), err.object[err.start:err.end]
-					print err.object
-					print "--", err.reason
-					# print "-- The translation unit in line", line_no, "is corrupted. Skipped"
-					continue
-				except Exception, e:
-					print repr(e)
-					# print "The translation unit in line", line_no, "is corrupted. Skipped"
-					continue
+		@rtype: tuple
+		@return: returns a tuple of the form (line_no, line, tu, error), where line is the list of fields of the line.
+		"""
+		line = line.split("\t")
 
-				scores = []
-				for filter_tuple in active_filters:
-					try:
-						score = filter_tuple[1].process_tu(copy(tu), filter_tuple[2])
-						if score is not None:
-							scores.append(score)
-					except Exception, e:
-						print "The filter", filter_tuple[0], "has problems processing the TU in line:", line_no
-						print "The Exception:"
-						print repr(e)
-
-				# writing filters' scores in the scores file
-				if self.have_scores and (max_scan - scan_number <= 1):
-					out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
-					score_file_name = out_path + "scores__" + self.options['input file']
-					score_file = open(score_file_name, "a")
-
-					scores = str(scores).replace("[", "").replace("]", "").replace(" ", "")
-					score_file.write(scores + "\n")
-
-					score_file.close()
+		if len(line) != 3:
+			return line_no, line, None, None
 
-			# closing data files
-			tm_file.close()
-			if self.have_alignment is True:
-				tm_align_file.close()
-			if self.have_token is True:
-				tm_token_file.close()
+		try:
+			tu = self.make_tu(line, align_line, token_line)
+		except UnicodeEncodeError as err:
+			error = ("[" + str(err.start) + ", " + str(err.end) + "] ") + err.object[err.start:err.end].encode("utf-8")
+			error += "\n" + err.object.encode("utf-8")
+			error += "\n-- " + err.reason
+			return line_no, line, None, error
+		except Exception, e:
+			return line_no, line, None, repr(e)
 
-			# Finishing the scan for all active filters.
-			for filter_tuple in active_filters:
-				filter_tuple[1].do_after_a_full_scan(filter_tuple[2] + 1)
+		return line_no, line, tu, None
 
-		# Finalizing all filters.
-		for i in range(len(self.filters)):
-			try:
-				self.filters[i][1].finalize()
-			except Exception, e:
-				print "The filter " + self.filters[i][0] + " had problems in finalizing. Excluded from decision section."
-				print "The Exception:"
-				print repr(e)
-				self.filters[i] = (self.filters[i][0], self.filters[i][1], -1)
+	#
+	def iter_tus(self, max_lines=-1, position=None):
+		"""
+		Yields the parsed translation units of the input.
+		If the TU store is ready, the TUs are read from the store. Otherwise the input files are parsed, and if the
+		store is being written, the parsed TUs are added to it. The TUs are given the alignments of the aligner, if
+		it is used (the store keeps the TUs without them).
 
-		# Removing excluded filters.
-		self.filters = [f_tuple for f_tuple in self.filters if f_tuple[2] >= 0]
+		@type max_lines: int
+		@param max_lines: The maximum number of lines to read. Negative values mean the whole input.
 
-		if len(self.filters) == 0:
-			print "There are no active filters."
-			print "Exiting before finishing."
-			print "-------------------------"
+		@type position: dict
+		@param position: The position to start from, as it is made by current_position(). None means the start.
+
+		@rtype: generator
+		@return: yields tuples of the form (line_no, line, tu, error).
+		"""
+		records = self.read_records(max_lines, position)
+		if self.aligner is not None:
+			records = self.align_records(records)
+		return records
+
+	#
+	def read_records(self, max_lines=-1, position=None):
+		"""
+		Yields the records of the input for iter_tus(), from the TU store or from the input files.
+		"""
+		if self.tu_store is not None:
+			start = 0
+			if position is not None:
+				start = position['records']
+			for record in self.tu_store.iter_records(start, self.tu_store.count_lines(max_lines)):
+				yield record
 			return
-		print "-----------------------\n"
 
-		# ---------- Decision Section ----------
-		print "Decision Section :"
-		print "======================================================================"
+		start = 0
+		offsets = None
+		if position is not None:
+			start = position['line_no']
+			offsets = position['offsets']
 
-		# Extending the input URL
-		input_file_path = os.getcwd() + '/data/' + self.options['input file']
+		for line_no, line, align_line, token_line in self.read_tm(max_lines, start, offsets=offsets):
+			record = self.parse_line(line_no, line, align_line, token_line)
+			if self.tu_store_writer is not None:
+				self.tu_store_writer.add(*record)
 
-		# Making an output file for skipped TUs
-		out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
-		out_file_name = out_path + "skipped__" + self.options['input file']
+			yield record
 
-		out_file = open(out_file_name, 'w')
-		self.output_files['skipped'] = out_file
+	#
+	def align_records(self, records):
+		"""
+		Gives the alignments of the aligner to the TUs of the records, if the aligner is trained. The TUs are aligned
+		in batches of 'batch size' records.
 
-		# Making an output file for all the decisions made
-		out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
-		out_file_name = out_path + "decision_log__" + self.options['input file']
+		@rtype: generator
+		@return: yields the records with the aligned TUs.
+		"""
+		for batch in self.iter_batches(records):
+			if not self.aligner.is_ready():
+				for record in batch:
+					yield record
+				continue
 
-		out_file = open(out_file_name, 'w')
-		self.output_files['log'] = out_file
+			from abstract_filter import TU
+			tus = [record[2] for record in batch if record[2] is not None]
+			alignments = iter(self.aligner.align([(tu.src_tokens, tu.trg_tokens) for tu in tus]))
+			for line_no, line, tu, error in batch:
+				if tu is not None:
+					tu = TU(tu.src_phrase, tu.trg_phrase, tu.src_tokens, tu.trg_tokens, next(alignments))
+				yield line_no, line, tu, error
 
-		tm_file = open(input_file_path, 'rb')
-		if self.have_alignment is True:
-			tm_align_file = open(align_file_path, 'r')
-		if self.have_token is True:
-			tm_token_file = open(token_file_path, 'rb')
+	#
+	def iter_batches(self, records):
+		"""
+		Groups the records of the input in batches of 'batch size' records.
 
-		line_no = 0
-		for line in tm_file:
-			line_no += 1
-			line = line.split("\t")
+		@rtype: generator
+		@return: yields lists of records.
+		"""
+		batch = []
+		for record in records:
+			batch.append(record)
+			if len(batch) >= self.batch_size:
+				yield batch
+				batch = []
 
-			# Exiting the decision section for the rest of the TM
-			if 'max decision' in self.options:
-				if self.options['max decision'] >= 0 and self.options['max decision'] < line_no:
-					break
+		if len(batch) > 0:
+			yield batch
 
-			if self.have_alignment is True:
-				alignment = tm_align_file.readline()
-				alignment = alignment.strip().split(" ")
-				alignment = [x.split('-') for x in alignment if x != '']
+	#
+	def learn_records(self, records, active_services, active_filters, score_writer=None, scan_number=0):
+		"""
+		Gives a batch of records of the input to the active services and filters in a scan of the learning section.
+		The invalid and the corrupted lines are skipped.
 
+		@type records: list
+		@param records: list of tuples of the form (line_no, line, tu, error).
+		"""
+		# The valid TUs of the batch and their line numbers.
+		tus = []
+		line_numbers = []
+		invalid = 0
+		for line_no, line, tu, error in records:
 			if len(line) != 3:
 				print "Invalid translation unit at line ", line_no
-				self.output_files['skipped'].write("invalid\t" + "\t".join(line) + "\n")
-				self.output_files['log'].write('-1\tskipped\n')
+				invalid += 1
 				continue
 
-			# The 1st and 2nd elements of each line are phrases from source and target language.
-			line[1] = line[1].strip()
-			line[2] = line[2].strip()
-			tu = TU()
-			try:
-				# tu.src_phrase = line[1].decode("utf-8")
-				# tu.trg_phrase = line[2].decode("utf-8")
-				if type(line[1]) != unicode:
-					tu.src_phrase = unicode(line[1], "utf-8")
-					# tu.src_phrase = line[1].decode("utf-8")
-				else:
-					tu.src_phrase = line[1]
+			if tu is None:
+				print error
+				# print "The translation unit in line", line_no, "is corrupted. Skipped"
+				continue
 
-				if type(line[2]) != unicode:
-					tu.trg_phrase = unicode(line[2], "utf-8")
-					# tu.trg_phrase = line[2].decode("utf-8")
-				else:
-					tu.trg_phrase = line[2]
+			tus.append(tu)
+			line_numbers.append(line_no)
 
-				if self.have_token is True:
-					token_line = tm_token_file.readline()
-					token_line = token_line[:-1].lower().split("\t")
+		if self.monitor is not None:
+			self.monitor.add(len(records), invalid, len(records) - invalid - len(tus))
 
-					tu.src_tokens = token_line[0].split()
-					tu.trg_tokens = token_line[1].split()
-				else:
-					tu.src_tokens = tokenizer.findall(tu.src_phrase.lower())
-					tu.trg_tokens = tokenizer.findall(tu.trg_phrase.lower())
+		if len(tus) > 0:
+			self.learn_batch(tus, line_numbers, active_services, active_filters, score_writer, scan_number)
 
-				if self.have_alignment is True:
-					tu.alignment = [(int(x[0]), int(x[1])) for x in alignment]
+	#
+	def learn_batch(self, tus, line_numbers, active_services, active_filters, score_writer=None, scan_number=0):
+		"""
+		Gives a batch of TUs to the active services and filters in a scan of the learning section.
 
-			except Exception, e:
-				print repr(e)
-				self.output_files['skipped'].write("\t".join(line) + "\n")
-				self.output_files['log'].write('-1\tskipped\n')
-				# print "The translation unit in line", line_no, "is corrupted. Skipped"
-				continue
-			# except:
-			# 	print "The translation unit in line", line_no, "is corrupted. Skipped"
-			# 	self.output_files['skipped'].write("\t".join(line) + "\n")
-			# 	continue
+		@type tus: list
+		@param tus: The valid TUs of the batch.
 
-			# results is an array of tuples of the form (filter name, filter answer).
-			results = []
-			# Giving the tu to all active filters in this scan.
-			for filter_tuple in self.filters:
-				answer = filter_tuple[1].decide(copy(tu))
-				results.append((filter_tuple[0], answer))
-
-			self.policy_check_for_tu("\t".join(line), results)
-			# final_answer = self.policy_check_for_tu(results)
-			# if final_answer:
-			# 	output_file.write("\t".join(line))
-
-		# closing data files
-		tm_file.close()
-		if self.have_alignment is True:
-			tm_align_file.close()
-		if self.have_token is True:
-			tm_token_file.close()
+		@type line_numbers: list
+		@param line_numbers: The line number of each TU, for the error messages.
+
+		@type score_writer: object
+		@param score_writer: The writer of the scores file, if the scores of this scan should be written.
+
+		@type scan_number: int
+		@param scan_number: The number of the scan, for the profiler.
+		"""
+		profiler = self.profiler
+		phase = 'process_tu (scan %d)' % (scan_number + 1)
+
+		for service_tuple in active_services:
+			if profiler is not None:
+				start = time.time()
+			for i in range(len(tus)):
+				try:
+					service_tuple[1].process_tu(tus[i], service_tuple[2])
+				except Exception, e:
+					print "The service", service_tuple[0], "has problems processing the TU in line:", line_numbers[i]
+					print "The Exception:"
+					print repr(e)
+			if profiler is not None:
+				profiler.add('service', service_tuple[0], phase, time.time() - start, len(tus))
+
+		# The results of each filter for the TUs of the batch.
+		batch_results = []
+		for filter_tuple in active_filters:
+			if profiler is not None:
+				start = time.time()
+			try:
+				results = filter_tuple[1].process_batch(tus, filter_tuple[2])
+			except Exception, e:
+				print "The filter", filter_tuple[0], "has problems processing the TUs in lines:", line_numbers[0], "to", line_numbers[-1]
+				print "The Exception:"
+				print repr(e)
+				results = [None] * len(tus)
+			if profiler is not None:
+				profiler.add('filter', filter_tuple[0], phase, time.time() - start, len(tus))
+
+			for i in range(len(tus)):
+				if isinstance(results[i], Exception):
+					print "The filter", filter_tuple[0], "has problems processing the TU in line:", line_numbers[i]
+					print "The Exception:"
+					print repr(results[i])
+					results[i] = None
+			batch_results.append(results)
+
+		# writing filters' scores in the scores file
+		if score_writer is not None:
+			for i in range(len(tus)):
+				scores = []
+				for j in range(len(active_filters)):
+					if batch_results[j][i] is not None:
+						scores.append((active_filters[j][0], batch_results[j][i]))
+				score_writer.write(scores)
+
+	#
+	def learn_chunk(self, chunk):
+		"""
+		Gives a chunk of the input to the active filters in a worker process of a parallel learning scan
+		(see run_parallel_scan()). The filters learn the chunk from empty statistics.
+
+		@type chunk: list or tuple
+		@param chunk: A chunk made by iter_chunks().
+
+		@rtype: tuple
+		@return: returns a tuple of the form (statistics, scores, timings, progress), where statistics is the list of
+		the statistics of the active filters (see AbstractFilter.get_statistics()), scores is the list of the scores of
+		the valid TUs of the chunk (None if the scores are not written in this scan), and timings and progress are the
+		same as in decide_chunk().
+		"""
+		self.start_worker()
+		scan_number, active_filters, write_scores = self.parallel_scan
+
+		for filter_tuple in active_filters:
+			filter_tuple[1].clear_statistics()
+
+		score_buffer = None
+		if write_scores:
+			from score_writer import ScoreBuffer
+			score_buffer = ScoreBuffer()
+
+		for batch in self.iter_batches(self.chunk_records(chunk)):
+			self.learn_records(batch, [], active_filters, score_buffer, scan_number)
+
+		statistics = [filter_tuple[1].get_statistics() for filter_tuple in active_filters]
+
+		scores = None
+		if score_buffer is not None:
+			scores = score_buffer.rows
+
+		timings = None
+		if self.profiler is not None:
+			timings = self.profiler.get_state()
+
+		progress = None
+		if self.monitor is not None:
+			progress = self.monitor.get_counts()
+		return statistics, scores, timings, progress
+
+	#
+	def run_parallel_scan(self, scan_number, active_filters, score_writer=None, position=None):
+		"""
+		Runs a scan of the learning section over several processes.
+		The input is split into chunks of 'learning chunk size' lines and each chunk is learned by a process from empty
+		statistics. The statistics of the chunks are merged in the filters of this process in the order of the input,
+		so the scores are written in the same order and the checkpoints could be saved between the chunks.
+
+		@type score_writer: object
+		@param score_writer: The writer of the scores file, if the scores of this scan should be written.
+
+		@type position: dict
+		@param position: The position to start from (see current_position()). None means the start.
+
+		@rtype: int
+		@return: returns the number of records read in the scan.
+		"""
+		global _worker_manager
+		_worker_manager = self
+		self.parallel_scan = (scan_number, active_filters, score_writer is not None)
+
+		# The worker processes are forked from this process, so they have a copy of the filters after the last scan.
+		sys.stdout.flush()
+		pool = multiprocessing.Pool(self.learning_processes)
+		pending = deque()
+
+		records = 0
+		if position is not None:
+			records = position['records']
+		last_checkpoint = records
+
+		try:
+			for chunk, chunk_position in self.iter_chunks(-1, position, self.learning_chunk_size):
+				pending.append((pool.apply_async(_learn_chunk, (chunk,)), chunk_position))
+				records = chunk_position['records']
+
+				# Keeping a limited number of chunks in memory.
+				while len(pending) > 2 * self.learning_processes:
+					last_checkpoint = self.merge_learned_chunk(pending.popleft(), active_filters, score_writer,
+						scan_number, last_checkpoint)
+
+			while len(pending) > 0:
+				last_checkpoint = self.merge_learned_chunk(pending.popleft(), active_filters, score_writer,
+					scan_number, last_checkpoint)
+
+			pool.close()
+		except:
+			pool.terminate()
+			raise
+		finally:
+			pool.join()
+			_worker_manager = None
+			self.parallel_scan = None
+
+		return records
+
+	#
+	def merge_learned_chunk(self, pending_chunk, active_filters, score_writer, scan_number, last_checkpoint):
+		"""
+		Merges the statistics of a finished chunk of a learning scan in the filters, writes its scores and saves a
+		checkpoint if it is the time.
+
+		@type pending_chunk: tuple
+		@param pending_chunk: A tuple of the form (result of the chunk, position after the chunk).
+
+		@rtype: int
+		@return: returns the number of records when the last checkpoint was saved.
+		"""
+		result, position = pending_chunk
+		statistics, scores, timings, progress = result.get()
+		for filter_tuple, filter_statistics in zip(active_filters, statistics):
+			filter_tuple[1].merge_statistics(filter_statistics)
+
+		if scores is not None:
+			for row in scores:
+				score_writer.write(row)
+
+		if timings is not None:
+			self.profiler.merge(timings)
+		if progress is not None:
+			self.monitor.merge(progress)
+
+		if self.checkpoint_interval > 0 and position['records'] - last_checkpoint >= self.checkpoint_interval:
+			self.save_checkpoint("learning", scan_number, position, score_writer)
+			return position['records']
+		return last_checkpoint
+
+	#
+	def decision_key(self, tu):
+		"""
+		Returns the key of a TU in the decision cache: the MD5 digest of its phrases, tokens and alignment.
+		"""
+		src_tokens = " ".join(tu.src_tokens)
+		trg_tokens = " ".join(tu.trg_tokens)
+		parts = [tu.src_phrase, tu.trg_phrase, src_tokens, trg_tokens]
+		parts = [x.encode("utf-8") if type(x) == unicode else x for x in parts]
+		parts.append(repr(tuple(tu.alignment)))
+
+		return hashlib.md5("\x00".join(parts)).digest()
+
+	#
+	def decide_batch(self, filter_tuple, tus):
+		"""
+		Gives a batch of TUs to a filter in the decision section.
+
+		@rtype: list
+		@return: returns the answers of the filter.
+		"""
+		if self.profiler is None:
+			return filter_tuple[1].decide_batch(tus)
+
+		start = time.time()
+		answers = filter_tuple[1].decide_batch(tus)
+		self.profiler.add('filter', filter_tuple[0], 'decide', time.time() - start, len(tus))
+		return answers
+
+	#
+	def evaluate_tus(self, tus):
+		"""
+		Gives a batch of TUs to the filters and their answers to the policies.
+		If 'full evaluation' is false, the filters are evaluated in the order of the scheduler and each filter is
+		given only the TUs whose decisions are not fixed yet.
+
+		@type tus: list
+		@param tus: The valid TUs of the batch.
+
+		@rtype: list
+		@return: returns a tuple of the form (results, answers) for each TU (see decide_tus()).
+		"""
+		filter_names = [filter_tuple[0] for filter_tuple in self.filters]
+
+		if self.full_evaluation or self.scheduler is None:
+			# The TUs are immutable, so they are shared between the filters.
+			filter_answers = []
+			if len(tus) > 0:
+				filter_answers = [self.decide_batch(filter_tuple, tus) for filter_tuple in self.filters]
+
+			decisions = []
+			for i in range(len(tus)):
+				results = [(filter_names[j], filter_answers[j][i]) for j in range(len(self.filters))]
+				decisions.append((results, self.check_policies(results)))
+			return decisions
+
+		filter_answers = [[None] * len(self.filters) for tu in tus]
+		policy_answers = [None] * len(tus)
+
+		undecided = range(len(tus))
+		for j in self.scheduler.order():
+			if len(undecided) == 0:
+				break
+
+			if self.profiler is not None:
+				start = time.time()
+			answers = self.scheduler.decide_batch(j, self.filters[j][1], [tus[i] for i in undecided])
+			if self.profiler is not None:
+				self.profiler.add('filter', self.filters[j][0], 'decide', time.time() - start, len(undecided))
+
+			remaining = []
+			for i, answer in zip(undecided, answers):
+				filter_answers[i][j] = answer
+				policy_answers[i] = self.check_decided_policies(zip(filter_names, filter_answers[i]))
+				if policy_answers[i] is None:
+					remaining.append(i)
+			undecided = remaining
+
+		decisions = []
+		for i in range(len(tus)):
+			results = [(filter_names[j], filter_answers[i][j] if filter_answers[i][j] is not None else 'not_evaluated')
+				for j in range(len(self.filters))]
+			if policy_answers[i] is None:
+				# A policy which is not decided after all filters.
+				policy_answers[i] = self.check_policies(results)
+			decisions.append((results, policy_answers[i]))
+		return decisions
+
+	#
+	def decide_tus(self, tus):
+		"""
+		Makes the decisions of the filters and the policies for the valid TUs of a batch.
+		The filters are called once for the TUs which are not in the decision cache, and once for each of them if
+		they occur several times in the batch. The decisions of the other TUs are taken from the cache.
+
+		@type tus: list
+		@param tus: The valid TUs of the batch.
+
+		@rtype: list
+		@return: returns a tuple of the form (results, answers) for each TU, where results is a list of tuples
+		(filter name, filter answer) and answers is a list of tuples (policy name, policy answer).
+		"""
+		if self.decision_cache is None:
+			return self.evaluate_tus(tus)
+
+		keys = [self.decision_key(tu) for tu in tus]
+
+		# The TUs which are given to the filters and the position of each of their keys.
+		new_tus = []
+		new_positions = {}
+		for key, tu in zip(keys, tus):
+			if key not in new_positions and key not in self.decision_cache:
+				new_positions[key] = len(new_tus)
+				new_tus.append(tu)
+
+		new_decisions = self.evaluate_tus(new_tus)
+
+		filter_names = [filter_tuple[0] for filter_tuple in self.filters]
+		policy_names = [policy_tuple[0] for policy_tuple in self.policies]
+		decisions = []
+		for key, tu in zip(keys, tus):
+			# The cache keeps only the answers. The names are added again for each TU.
+			entry = self.decision_cache.get(key)
+			if entry is not None:
+				decisions.append((zip(filter_names, entry[0]), zip(policy_names, entry[1])))
+				continue
+
+			if key in new_positions:
+				results, answers = new_decisions[new_positions[key]]
+			else:
+				# The entry is removed by the new entries of this batch.
+				results, answers = self.evaluate_tus([tu])[0]
+
+			self.decision_cache.put(key, (tuple([x[1] for x in results]), tuple([x[1] for x in answers])))
+			decisions.append((results, answers))
+
+		return decisions
+
+	#
+	def decide_records(self, records):
+		"""
+		Makes the decisions for a batch of lines of the input file and writes the results in the output files.
+
+		@type records: list
+		@param records: list of tuples of the form (line_no, line, tu, error).
+		"""
+		decisions = self.decide_tus([record[2] for record in records if len(record[1]) == 3 and record[2] is not None])
+
+		if self.monitor is not None:
+			invalid = len([1 for record in records if len(record[1]) != 3])
+			self.monitor.add(len(records), invalid, len(records) - invalid - len(decisions))
+
+		i = 0
+		for line_no, line, tu, error in records:
+			if len(line) != 3:
+				print "Invalid translation unit at line ", line_no
+				self.output_files['skipped'].write("invalid\t" + "\t".join(line) + "\n")
+				self.output_files['log'].write(self.format_skipped_log_record(line))
+				continue
+
+			if tu is None:
+				print error
+				self.output_files['skipped'].write("\t".join(line) + "\n")
+				self.output_files['log'].write(self.format_skipped_log_record(line))
+				# print "The translation unit in line", line_no, "is corrupted. Skipped"
+				continue
+
+			# results is an array of tuples of the form (filter name, filter answer).
+			results, answers = decisions[i]
+			i += 1
+
+			self.policy_check_for_tu("\t".join(line), results, answers)
+
+	#
+	def decide_chunk(self, chunk):
+		"""
+		Makes the decisions for a chunk of the input in a worker process of the decision section.
+		The outputs are collected in memory and returned to the main process to be merged in the input order.
+
+		@type chunk: list or tuple
+		@param chunk: list of tuples of the form (line_no, line, align_line, token_line),
+		or the range of the lines as a tuple of the form (start, end), if there is a TU store or line indexes.
+
+		@rtype: tuple
+		@return: returns a tuple of the form (outputs, cache counters, timings, progress), where outputs is a list of
+		tuples of the form (output name, content), the cache counters are the hits, the misses and the evictions of
+		the chunk, the timings are the state of the profiler for the chunk (see Profiler.get_state()) and progress is
+		the counters of the progress monitor for the chunk (see ProgressMonitor.get_counts()).
+		"""
+		self.start_worker()
+		counters = (0, 0, 0)
+		if self.decision_cache is not None:
+			counters = self.decision_cache.counters()
+		self.output_files = {'skipped': StringIO(), 'log': StringIO()}
+
+		for batch in self.iter_batches(self.chunk_records(chunk)):
+			self.decide_records(batch)
+
+		outputs = [(name, handler.getvalue()) for name, handler in self.output_files.iteritems()]
+		self.output_files = {}
+
+		if self.decision_cache is not None:
+			counters = [x - y for x, y in zip(self.decision_cache.counters(), counters)]
+
+		timings = None
+		if self.profiler is not None:
+			timings = self.profiler.get_state()
+
+		progress = None
+		if self.monitor is not None:
+			progress = self.monitor.get_counts()
+		return outputs, counters, timings, progress
+
+	#
+	def start_worker(self):
+		"""
+		Marks this process as a worker process, when it is given its first chunk.
+		The timings and the counters copied from the main process in the fork are not returned again.
+		"""
+		if self.in_worker:
+			return
+
+		if self.profiler is not None:
+			self.profiler.get_state()
+		if self.monitor is not None:
+			self.monitor.get_counts()
+		self.in_worker = True
+
+	#
+	def chunk_records(self, chunk):
+		"""
+		Reads the records of a chunk made by iter_chunks() in a worker process.
+
+		@rtype: generator
+		@return: yields tuples of the form (line_no, line, tu, error).
+		"""
+		if type(chunk) == tuple and self.tu_store is not None:
+			records = self.tu_store.iter_records(chunk[0], chunk[1])
+		elif type(chunk) == tuple:
+			records = (self.parse_line(*line_tuple) for line_tuple in self.read_tm(start=chunk[0], end=chunk[1]))
+		else:
+			records = (self.parse_line(*line_tuple) for line_tuple in chunk)
+
+		if self.aligner is not None:
+			records = self.align_records(records)
+		return records
+
+	#
+	def iter_chunks(self, max_lines, position=None, chunk_size=None):
+		"""
+		Splits the input into chunks for the worker processes of the decision section or a learning scan.
+
+		@type position: dict
+		@param position: The position to start from (see current_position()). None means the start.
+
+		@type chunk_size: int
+		@param chunk_size: The number of lines of each chunk. None means 'decision chunk size'.
+
+		@rtype: generator
+		@return: yields tuples of the form (chunk, position), where position is the position after the chunk.
+		"""
+		if chunk_size is None:
+			chunk_size = self.decision_chunk_size
+
+		# The processes read the lines of their chunk by themselves.
+		end = None
+		if self.tu_store is not None:
+			end = self.tu_store.count_lines(max_lines)
+		elif 'input' in self.line_indexes:
+			end = len(self.line_indexes['input'])
+			if max_lines >= 0:
+				end = min(end, max_lines)
+
+		if end is not None:
+			# There is a record for each line, so the records and the lines are counted in the same way.
+			first = 0
+			if position is not None:
+				first = position['records']
+
+			for start in xrange(first, end, chunk_size):
+				chunk_end = min(start + chunk_size, end)
+				offsets = None
+				if self.tu_store is None:
+					offsets = [self.line_indexes[name].offset(chunk_end) if name in self.line_indexes else 0
+						for name in ['input', 'align', 'token']]
+				yield (start, chunk_end), {'records': chunk_end, 'line_no': chunk_end, 'offsets': offsets}
+			return
+
+		start = 0
+		offsets = None
+		records = 0
+		if position is not None:
+			start = position['line_no']
+			offsets = position['offsets']
+			records = position['records']
+
+		chunk = []
+		for line_tuple in self.read_tm(max_lines, start, offsets=offsets):
+			chunk.append(line_tuple)
+			if len(chunk) >= chunk_size:
+				records += len(chunk)
+				yield chunk, self.current_position(records, chunk[-1][0])
+				chunk = []
+
+		if len(chunk) > 0:
+			records += len(chunk)
+			yield chunk, self.current_position(records, chunk[-1][0])
+
+	#
+	def run_parallel_decisions(self, max_lines, position=None):
+		"""
+		Runs the decision section over several processes.
+		The input is split into chunks of 'decision chunk size' lines. The chunks are given to a pool of processes and
+		the outputs of the chunks are written in the output files in the same order as the input.
+
+		@type position: dict
+		@param position: The position to start from (see current_position()). None means the start.
+		"""
+		global _worker_manager
+		_worker_manager = self
+
+		# The worker processes are forked from this process, so they have a copy of the finalized filters.
+		sys.stdout.flush()
+		pool = multiprocessing.Pool(self.decision_processes)
+		pending = deque()
+
+		# The number of records when the last checkpoint was saved.
+		last_checkpoint = 0
+		if position is not None:
+			last_checkpoint = position['records']
+
+		try:
+			for chunk, chunk_position in self.iter_chunks(max_lines, position):
+				pending.append((pool.apply_async(_decide_chunk, (chunk,)), chunk_position))
+
+				# Keeping a limited number of chunks in memory.
+				while len(pending) > 2 * self.decision_processes:
+					last_checkpoint = self.write_chunk_outputs(pending.popleft(), last_checkpoint)
+
+			while len(pending) > 0:
+				last_checkpoint = self.write_chunk_outputs(pending.popleft(), last_checkpoint)
+
+			pool.close()
+		except:
+			pool.terminate()
+			raise
+		finally:
+			pool.join()
+			_worker_manager = None
+
+	#
+	def write_chunk_outputs(self, pending_chunk, last_checkpoint):
+		"""
+		Writes the outputs of a finished chunk and saves a checkpoint if it is the time.
+
+		@type pending_chunk: tuple
+		@param pending_chunk: A tuple of the form (result of the chunk, position after the chunk).
+
+		@rtype: int
+		@return: returns the number of records when the last checkpoint was saved.
+		"""
+		result, position = pending_chunk
+		outputs, counters, timings, progress = result.get()
+		for name, content in outputs:
+			self.get_output_file(name).write(content)
+
+		# The caches of the processes are counted together.
+		self.cache_counters = [x + y for x, y in zip(self.cache_counters, counters)]
+		if timings is not None:
+			self.profiler.merge(timings)
+		if progress is not None:
+			self.monitor.merge(progress)
+
+		if self.checkpoint_interval > 0 and position['records'] - last_checkpoint >= self.checkpoint_interval:
+			self.save_checkpoint("decision", 0, position)
+			return position['records']
+		return last_checkpoint
+
+	#
+	def current_position(self, records, line_no):
+		"""
+		Returns the position in the input after the given number of records, for the checkpoints.
+		If the TUs are read from the files, the position has the byte offsets of the next line of each file.
+
+		@type records: int
+		@param records: The number of records (valid or not) read in the current scan.
+
+		@type line_no: int
+		@param line_no: The line number of the last record.
+
+		@rtype: dict
+		@return: returns a dictionary with 'records', 'line_no' and 'offsets' keys.
+		"""
+		offsets = None
+		if self.tu_store is None:
+			offsets = list(self.read_offsets)
+		return {'records': records, 'line_no': line_no, 'offsets': offsets}
+
+	#
+	def remaining_lines(self, max_lines, position):
+		"""
+		Returns the number of the lines to be processed from the given position, for the progress monitor.
+		It is None if the size of the input is not known yet.
+		"""
+		size = self.input_size
+		if self.tu_store is not None:
+			size = self.tu_store.count_lines(max_lines)
+		elif 'input' in self.line_indexes:
+			size = len(self.line_indexes['input'])
+
+		if size is None:
+			return None
+		if max_lines >= 0:
+			size = min(size, max_lines)
+		if position is not None:
+			size -= position['records']
+		return max(size, 0)
+
+	#
+	def input_stamp(self):
+		"""
+		Returns the sizes and the modification times of the input files, so a checkpoint is not resumed for changed files.
+		"""
+		stamp = []
+		for path in [self.input_file_path, self.align_file_path, self.token_file_path]:
+			if path and os.path.isfile(path):
+				stat = os.stat(path)
+				stamp.append((path, stat.st_size, int(stat.st_mtime * 1000000)))
+		return stamp
+
+	#
+	def save_checkpoint(self, section, scan_number, position, score_writer=None):
+		"""
+		Saves the state of the run in the checkpoint file: the scan and the position in the input, the states of the
+		filters, the services and the scheduler, and the sizes of the output files. The outputs are flushed before measuring them.
+
+		@type section: str
+		@param section: 'learning' or 'decision'.
+
+		@type scan_number: int
+		@param scan_number: The scan of the learning section (counted from 0).
+
+		@type position: dict
+		@param position: The position after the last finished batch (see current_position()). None means the start
+		of the scan.
+
+		@type score_writer: object
+		@param score_writer: The writer of the scores file, if the scores are being written.
+		"""
+		from checkpoint import save_checkpoint
+
+		state = {}
+		state['section'] = section
+		state['scan'] = scan_number
+		state['position'] = position
+		state['input'] = self.input_stamp()
+		state['filters'] = [(x[0], x[2], x[1].get_state()) for x in self.filters]
+		state['services'] = [(name, service.get_state()) for name, service in self.services.items()]
+
+		state['scheduler'] = None
+		if section == "decision" and self.scheduler is not None:
+			state['scheduler'] = self.scheduler.get_state()
+
+		state['scores'] = None
+		if score_writer is not None:
+			state['scores'] = score_writer.get_state()
+
+		state['outputs'] = {}
+		if section == "decision" and self.output_writer is not None:
+			self.output_writer.sync(self.output_files.values())
+			for name, handler in self.output_files.iteritems():
+				state['outputs'][name] = (handler.out_file.name, os.path.getsize(handler.out_file.name))
+
+		save_checkpoint(self.checkpoint_file_name, state)
+
+	#
+	def restore_checkpoint(self):
+		"""
+		Loads the checkpoint of the run and gives the saved states to the initialized filters and services.
+		The checkpoint is not used if the active filters or the input files are changed.
+
+		@rtype: dict
+		@return: returns the checkpoint, or None if there is no checkpoint to resume.
+		"""
+		from checkpoint import load_checkpoint
+
+		checkpoint = load_checkpoint(self.checkpoint_file_name)
+		if checkpoint is None:
+			print "There is no checkpoint to resume:", self.checkpoint_file_name
+			return None
+
+		if [x[0] for x in checkpoint['filters']] != [x[0] for x in self.filters]:
+			print "The active filters are changed after the checkpoint. The checkpoint is not resumed."
+			return None
+		if [x[0] for x in checkpoint['services']] != self.services.keys():
+			print "The services are changed after the checkpoint. The checkpoint is not resumed."
+			return None
+		if checkpoint['input'] != self.input_stamp():
+			print "The input files are changed after the checkpoint. The checkpoint is not resumed."
+			return None
+
+		for i in range(len(self.filters)):
+			name, num_of_scans, state = checkpoint['filters'][i]
+			self.filters[i][1].set_state(state)
+			self.filters[i] = (name, self.filters[i][1], num_of_scans)
+
+		for name, state in checkpoint['services']:
+			self.services[name].set_state(state)
+
+		if checkpoint['section'] == "learning":
+			print "Resuming from the checkpoint: learning section, scan", checkpoint['scan'] + 1,
+		else:
+			print "Resuming from the checkpoint: decision section",
+		if checkpoint['position'] is not None:
+			print "after", checkpoint['position']['records'], "lines."
+		else:
+			print "from the start."
+		return checkpoint
+
+	#
+	def reopen_output_files(self, outputs):
+		"""
+		Opens the output files of the decision section of a resumed run, as they were at the checkpoint.
+		The files of the policies which were made after the checkpoint are removed.
+
+		@type outputs: dict
+		@param outputs: The names of the outputs with their file names and sizes at the checkpoint.
+		"""
+		out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
+		extension = ""
+		if self.output_compression is not None:
+			from compression import OUTPUT_EXTENSIONS
+			extension = OUTPUT_EXTENSIONS[self.output_compression]
+		for policy_tuple in self.policies:
+			for file_name in glob.glob(out_path + "*_" + policy_tuple[0] + "__" + self.output_name + extension):
+				if file_name not in [x[0] for x in outputs.values()]:
+					os.remove(file_name)
+
+		for name, (file_name, size) in outputs.iteritems():
+			self.output_files[name] = self.output_writer.reopen(file_name, size)
+
+	#
+	def start_stream(self):
+		"""
+		Prepares the tm_manager for making decisions on TUs which are not read from the input files
+		(see iter_decisions()). There is no learning section, so all active filters and services should have their
+		models on disk, i.e. they need no scans. The scores are not emitted in this mode.
+
+		@rtype: bool
+		@return: returns False if the manager could not be prepared.
+		"""
+		print "Starting the TM cleaner in stream mode ..."
+
+		if not self.prepare(require_input_file=False):
+			return False
+
+		needs_scans = [x[0] for x in self.filters if x[2] > 0]
+		needs_scans += [name for name, service in self.services.items() if service.num_of_scans > 0]
+		if len(needs_scans) > 0:
+			print "These filters or services have no models and need the learning section:", ", ".join(needs_scans)
+			print "Run the cleaner once on a file to make their models, or disable them in the config file."
+			print "Exiting before finishing."
+			print "-------------------------"
+			return False
+
+		self.make_tokenizers()
+
+		if not self.finalize_filters():
+			return False
+
+		self.prepare_decisions()
+		return True
+
+	#
+	def make_stream_tu(self, src_phrase, trg_phrase, src_tokens=None, trg_tokens=None, alignment=None):
+		"""
+		Makes a TU object from the given phrases, in the same way as make_tu() does for the lines of the input file.
+
+		@type src_tokens: list
+		@param src_tokens: The source tokens. If it is None, the phrase is tokenized by the tokenizer.
+
+		@type alignment: list or str
+		@param alignment: The alignment pairs, as a list of pairs or as a line of the alignment file ('0-0 1-2').
+
+		@rtype: TU
+		@return: returns the translation unit.
+		"""
+		from abstract_filter import TU
+
+		if type(src_phrase) != unicode:
+			src_phrase = src_phrase.decode("utf-8")
+		if type(trg_phrase) != unicode:
+			trg_phrase = trg_phrase.decode("utf-8")
+		src_phrase = src_phrase.strip()
+		trg_phrase = trg_phrase.strip()
+
+		if src_tokens is None:
+			src_tokens = self.src_tokenizer.tokenize(src_phrase)
+		else:
+			src_tokens = [x.lower() for x in src_tokens]
+
+		if trg_tokens is None:
+			trg_tokens = self.trg_tokenizer.tokenize(trg_phrase)
+		else:
+			trg_tokens = [x.lower() for x in trg_tokens]
+
+		if alignment is None and self.aligner is not None:
+			alignment = self.aligner.align([(src_tokens, trg_tokens)])[0]
+		elif alignment is None:
+			alignment = ()
+		elif isinstance(alignment, basestring):
+			alignment = [x.split('-') for x in alignment.strip().split(" ") if x != '']
+		alignment = [(int(x[0]), int(x[1])) for x in alignment]
+
+		return TU(src_phrase, trg_phrase, src_tokens, trg_tokens, alignment)
+
+	#
+	def iter_decisions(self, tus):
+		"""
+		Makes the decisions for the given TUs. The TUs are given to the filters in batches of 'batch size' TUs
+		and the decisions of each batch are yielded as soon as the batch is finished.
+		start_stream() should be called before this function.
+
+		@type tus: iterable
+		@param tus: The TU objects (see make_stream_tu()).
+
+		@rtype: generator
+		@return: yields tuples of the form (tu, answers, results) in the order of the TUs, where answers is a list
+		of tuples (policy name, policy answer) and results is a list of tuples (filter name, filter answer).
+		"""
+		for batch in self.iter_batches(tus):
+			decisions = self.decide_tus(batch)
+
+			for i in range(len(batch)):
+				yield batch[i], decisions[i][1], decisions[i][0]
+
+	#
+	def parse_stream_line(self, line_no, line):
+		"""
+		Parses a line of the stream. The line is either the three fields of the input file (ID, source and target,
+		separated by tabs) or a JSON object with 'id', 'src' and 'trg' keys and the optional 'alignment',
+		'src_tokens' and 'trg_tokens' keys. If the JSON object has no ID, the line number is used.
+
+		@rtype: tuple
+		@return: returns a tuple of the form (tu_id, tu, fields). If the line is not valid, the TU is None.
+		"""
+		if line.lstrip().startswith("{"):
+			try:
+				record = json.loads(line)
+				tu_id = unicode(record.get("id", line_no)).encode("utf-8")
+				tu = self.make_stream_tu(record["src"], record["trg"], record.get("src_tokens"),
+					record.get("trg_tokens"), record.get("alignment"))
+			except Exception:
+				return None, None, []
+			return tu_id, tu, [tu_id, record["src"], record["trg"]]
+
+		fields = line.rstrip("\r\n").split("\t")
+		if len(fields) != 3:
+			return None, None, fields
+
+		try:
+			tu = self.make_stream_tu(fields[1], fields[2])
+		except Exception:
+			return fields[0], None, fields
+		return fields[0], tu, fields
+
+	#
+	def prepare_decisions(self):
+		"""
+		Makes the scheduler of the filters (see evaluate_tus()) and the cache of the decisions (see decide_tus()),
+		if it is not disabled, for the decision section.
+		"""
+		from filter_scheduler import FilterScheduler, DEFAULT_COST
+		from filter_registry import load_registry
+		registry = load_registry()
+		filter_names = [filter_tuple[0] for filter_tuple in self.filters]
+		costs = [registry.get(name, {}).get("cost", DEFAULT_COST) for name in filter_names]
+		self.scheduler = FilterScheduler(filter_names, costs)
+
+		self.decision_cache = None
+		self.cache_counters = [0, 0, 0]
+		if self.decision_cache_size > 0:
+			from bounded_cache import BoundedCache
+			self.decision_cache = BoundedCache(self.decision_cache_size, self.decision_cache_eviction)
+
+	#
+	def print_decision_report(self, counters=None):
+		"""
+		Prints the counters of the decision cache and the order of the filters.
+		If the counters are not given, they are taken from the cache of this process. The order of the filters and
+		the counters of the tokenizer caches are printed only if the filters are evaluated in this process.
+		"""
+		in_this_process = counters is None
+
+		if self.decision_cache is not None:
+			from bounded_cache import format_cache_report
+			if in_this_process:
+				counters = self.decision_cache.counters()
+			print "Decision cache:", format_cache_report(*counters)
+
+		if in_this_process and self.src_tokenizer is not None and self.tokenizer_cache_size > 0:
+			from bounded_cache import format_cache_report
+			counters = [x + y for x, y in zip(self.src_tokenizer.counters(), self.trg_tokenizer.counters())]
+			print "Tokenizer cache:", format_cache_report(*counters)
+
+		if in_this_process and self.scheduler is not None and not self.full_evaluation:
+			print "Order of the filters:"
+			for line in self.scheduler.report():
+				print line
+
+	#
+	def write_profile(self):
+		"""
+		Writes the timings of the profiler in the output folder ('profile__<input file>.json') and prints them.
+		"""
+		out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
+		file_name = out_path + "profile__" + self.output_name + ".json"
+		self.profiler.write_report(file_name)
+
+		print "Timings (written in " + file_name + "):"
+		for line in self.profiler.table():
+			print line
+
+		if len(self.profiler.sizes) > 0:
+			print "Largest sizes of the states at the end of the learning scans:"
+			for record in self.profiler.size_report():
+				print "%-10s%-30s%12d bytes" % (record["kind"], record["name"], record["state bytes"])
+
+	#
+	def run_stream(self, in_file, out_file):
+		"""
+		Reads the TUs from a stream (e.g. stdin) and writes a line of the decision log for each of them in the
+		output stream, in the order of the input. The output is flushed after each batch of 'batch size' TUs.
+		The lines are parsed by parse_stream_line() and the invalid lines get the record of the skipped TUs.
+
+		@rtype: bool
+		@return: returns False if the manager could not be prepared.
+		"""
+		if not self.start_stream():
+			return False
+
+		# The records of the lines which are read and not written yet. Each entry is either the ID of a valid TU
+		# waiting for its decision or the finished record of a skipped line.
+		pending = deque()
+
+		def valid_tus():
+			line_no = 0
+			for line in iter(in_file.readline, ""):
+				line_no += 1
+				if not line.strip():
+					continue
+
+				tu_id, tu, fields = self.parse_stream_line(line_no, line)
+				if tu is None:
+					pending.append((False, self.format_skipped_log_record(fields)))
+					continue
+				pending.append((True, tu_id))
+				yield tu
+
+		def write_skipped():
+			while len(pending) > 0 and not pending[0][0]:
+				out_file.write(pending.popleft()[1])
+
+		count = 0
+		for tu, answers, results in self.iter_decisions(valid_tus()):
+			write_skipped()
+			out_file.write(self.format_log_record(pending.popleft()[1], answers, results))
+			write_skipped()
+
+			count += 1
+			if len(pending) == 0:
+				# The end of a batch.
+				out_file.flush()
+		write_skipped()
+		out_file.flush()
+
+		print "Number of TUs decided:", count
+		self.print_decision_report()
+		if self.profiler is not None:
+			for line in self.profiler.table():
+				print line
+		return True
+
+	#
+	def prepare(self, require_input_file=True):
+		"""
+		Prepares the tm_manager: loads the options, the filters and the policies and initializes the filters.
+
+		@type require_input_file: bool
+		@param require_input_file: If it is False, the 'input file' option is not needed (see run_stream()).
+
+		@rtype: bool
+		@return: returns False if the manager could not be prepared or there are no active filters.
+		"""
+		if self.load_options_from_config_file(require_input_file) > 0:
+			print "Exiting before finishing."
+			print "-------------------------"
+			return False
+		self.load_filters()
+		self.load_policies()
+
+		# Clearing the arrays
 		self.close_output_files()
+		self.output_files = {}
+
+		print "Initializing the filters..."
+
+		filters_arguments = {}
+		filters_arguments["source language"] = self.options['source language']
+		filters_arguments["target language"] = self.options['target language']
+		filters_arguments["input filename"] = self.options.get('input file', "")
+		filters_arguments["normalize scores"] = self.normalize_scores
+		filters_arguments["emit scores"] = self.have_scores
+		filters_arguments["quantile sketch size"] = self.quantile_sketch_size
+		filters_arguments["aligner"] = self.aligner_model
+		filters_arguments["aligner iterations"] = self.aligner_iterations
+		# The filters and the services find the models of the previous runs in the registry and save their models in it.
+		from model_registry import ModelRegistry
+		filters_arguments["model registry"] = ModelRegistry(self.models_folder)
+		# The filters call this function with the name of a service to get the shared object of that service.
+		filters_arguments["services"] = self.get_service
+		self.filters_arguments = filters_arguments
+		self.services = OrderedDict()
+
+		# The aligner is a service, so it is trained in the scans before the scans of the filters.
+		self.aligner = None
+		if self.aligner_model != 'none' and self.have_alignment:
+			print "The alignments of the align file are used, and the aligner is not used."
+		elif self.aligner_model != 'none':
+			try:
+				self.aligner = self.get_service("alignment")
+			except Exception, e:
+				print "Couldn't initialize the aligner. The TUs have no alignments."
+				print "The Exception:"
+				print repr(e)
+
+		# The statistics of the filters which use the alignments depend on where the alignments come from, so they
+		# keep their models separately for the align file and for each model of the aligner.
+		if self.have_alignment:
+			filters_arguments["alignment source"] = {"align file": self.options['align file']}
+		elif self.aligner is not None:
+			filters_arguments["alignment source"] = {"aligner": self.aligner_model,
+				"aligner iterations": self.aligner_iterations}
+		else:
+			filters_arguments["alignment source"] = {"aligner": "none"}
+
+		for i in range(len(self.filters)):
+			if self.profiler is not None:
+				start = time.time()
+			try:
+				# intializing the filters
+				self.filters[i][1].initialize(self.options['source language'], self.options['target language'], copy(filters_arguments))
+				# updating the number of scans
+				self.filters[i] = (self.filters[i][0], self.filters[i][1], self.filters[i][1].num_of_scans)
+			except Exception, e:
+				print "Couldn't initialize the filter", self.filters[i][0]
+				print "This filter is excluded from the active filters."
+				print "The Exception:"
+				print repr(e)
+				self.filters[i] = (self.filters[i][0], self.filters[i][1], -1)
+			if self.profiler is not None:
+				# The services made by the filter are initialized in this call.
+				self.profiler.add('filter', self.filters[i][0], 'initialize', time.time() - start)
+
+		# Removing the excluded filters.
+		self.filters = [f_tuple for f_tuple in self.filters if f_tuple[2] >= 0]
+
+		if len(self.filters) == 0:
+			print "There are no active filters."
+			print "Exiting before finishing."
+			print "-------------------------"
+			return False
+		return True
+
+	#
+	def finalize_filters(self):
+		"""
+		Finalizes the filters after the learning section. The filters with problems are excluded.
+
+		@rtype: bool
+		@return: returns False if there are no active filters.
+		"""
+		for i in range(len(self.filters)):
+			if self.profiler is not None:
+				start = time.time()
+			try:
+				self.filters[i][1].finalize()
+			except Exception, e:
+				print "The filter " + self.filters[i][0] + " had problems in finalizing. Excluded from decision section."
+				print "The Exception:"
+				print repr(e)
+				self.filters[i] = (self.filters[i][0], self.filters[i][1], -1)
+			if self.profiler is not None:
+				self.profiler.add('filter', self.filters[i][0], 'finalize', time.time() - start)
+
+		# Removing excluded filters.
+		self.filters = [f_tuple for f_tuple in self.filters if f_tuple[2] >= 0]
+
+		if len(self.filters) == 0:
+			print "There are no active filters."
+			print "Exiting before finishing."
+			print "-------------------------"
+			return False
+		return True
+
+	#
+	def set_input_files(self):
+		"""
+		Finds the input, the alignment and the token files of the config file and checks them.
+		The tokenizers are made if there is no token file.
+
+		@rtype: bool
+		@return: returns False if a file is not found or could not be read.
+		"""
+		# Extending the input URL
+		self.input_file_path = os.getcwd() + '/data/' + self.options['input file']
+
+		# The output files are named by the input file without its folder and the extension of its compression.
+		# The outputs of the TMX files are tab separated, so they are named like a tab separated input ('.csv').
+		from compression import strip_extension
+		self.output_name = os.path.basename(strip_extension(self.options['input file']))
+		if self.input_format == 'tmx':
+			name, extension = os.path.splitext(self.output_name)
+			if extension.lower() == ".tmx":
+				self.output_name = name
+			self.output_name += ".csv"
+
+		if not os.path.isfile(self.input_file_path):
+			print "Input file not found!\nGiven file in config file:", self.input_file_path
+			print "Exiting the code."
+			return False
+
+		if self.have_alignment:
+			self.align_file_path = os.getcwd() + '/data/' + self.options['align file']
+
+			if not os.path.isfile(self.align_file_path):
+				print "Alignment file not found!\nGiven file in config file:", self.align_file_path
+				print "Exiting the code."
+				return False
+
+		# For tokenizing the TUs and put the output in TU objects
+		if self.have_token:
+			self.token_file_path = os.getcwd() + '/data/' + self.options['token file']
+
+			if not os.path.isfile(self.token_file_path):
+				print "Token file not found!\nGiven file in config file:", self.token_file_path
+				print "Exiting the code."
+				return False
+		else:
+			self.make_tokenizers()
+
+		# The compressed input files are decompressed while they are read. The xz files need a package which may not
+		# be installed.
+		from compression import detect_codec, import_lzma
+		paths = [self.input_file_path, self.align_file_path, self.token_file_path]
+		input_codecs = [detect_codec(path) for path in paths if path]
+		if 'xz' in input_codecs:
+			try:
+				import_lzma()
+			except ImportError, e:
+				print e
+				print "Exiting the code."
+				return False
+		return True
+
+	#
+	def run(self, resume=False):
+		"""
+		This function has 3 sections. In the first section it calls initializer functions to prepare the tm_manager.
+		In the second section, 'Learning Section', TM input is scanned for several times for the
+		filters functions which are called and the input data is given to them.
+		In the last section, 'Decision Section', each Translation Unit is given to all filters and the results are
+		stored in the 'results' array. The policy_check_for_tu() is then called with the results array as the input
+		and the output of that function indicates whether the TU should be deleted or not.
+
+		@type resume: bool
+		@param resume: If it is True, the run continues from the last checkpoint of a stopped run (see the
+		'checkpoint interval' option).
+		"""
+		print "Running the TM cleaner ..."
+
+		if not self.prepare():
+			return
+
+		# ---------- Learning Section ----------
+		print "Learning Section :"
+		print "======================================================================"
+
+		if not self.set_input_files():
+			return
+
+		# Making or loading the line indexes of the input files.
+		# The offsets in the compressed files are not the offsets of their lines, so they have no line indexes.
+		self.line_indexes = {}
+		from compression import detect_codec
+		paths = [self.input_file_path, self.align_file_path, self.token_file_path]
+		if self.use_line_index and any(detect_codec(path) for path in paths if path):
+			print "The line index is not used for the compressed input files."
+			self.use_line_index = False
+
+		if self.use_line_index:
+			from line_index import LineIndex
+
+			self.line_indexes['input'] = LineIndex.load(self.input_file_path)
+			if self.have_alignment:
+				self.line_indexes['align'] = LineIndex.load(self.align_file_path)
+			if self.have_token:
+				self.line_indexes['token'] = LineIndex.load(self.token_file_path)
+			print "Number of lines in the input file:", len(self.line_indexes['input'])
+
+		# Continuing from the checkpoint of a stopped run, or removing the checkpoint of the previous run.
+		out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
+		self.checkpoint_file_name = out_path + "checkpoint__" + self.output_name
+		checkpoint = None
+		if resume:
+			checkpoint = self.restore_checkpoint()
+			if checkpoint is None:
+				print "Starting from the beginning."
+		if checkpoint is None:
+			from checkpoint import remove_checkpoint
+			remove_checkpoint(self.checkpoint_file_name)
+
+		if self.progress_file:
+			from progress import ProgressMonitor
+			self.monitor = ProgressMonitor(os.path.join(out_path, self.progress_file), self.progress_interval,
+				self.progress_format)
+			self.monitor.start()
+
+		# Finding maximum number of scans required for filters.
+		max_scan = 0
+		for filter_tuple in self.filters:
+			max_scan = max(max_scan, filter_tuple[2])
+
+		# The services are scanned before the filters, so their results are ready in the first scan of the filters.
+		filter_scans = max_scan
+		for name, service in self.services.items():
+			max_scan = max(max_scan, filter_scans + service.num_of_scans)
+
+		print "\nNumber of active filters:", len(self.filters)
+		print "Number of scans needed:", max_scan
+		print "-----------------------"
+
+		# The scan and the position in the input where the run is resumed.
+		first_scan = 0
+		position = None
+		if checkpoint is not None and checkpoint['section'] == "learning":
+			first_scan = checkpoint['scan']
+			position = checkpoint['position']
+		elif checkpoint is not None:
+			first_scan = max_scan
+
+		# The store is made in the first scan, so a resumed run reads the store of the stopped run.
+		self.tu_store_path = out_path + "tu_store__" + self.output_name
+		if self.use_tu_store and first_scan > 0:
+			from tu_store import TUStore
+			self.tu_store = TUStore(self.tu_store_path)
+
+		score_writer = None
+		if self.have_scores and first_scan < max_scan:
+			from score_writer import make_score_writer
+
+			score_file_name = out_path + "scores__" + self.output_name
+			score_state = None
+			if checkpoint is not None:
+				score_state = checkpoint['scores']
+			score_writer = make_score_writer(score_file_name, [x[0] for x in self.filters], self.scores_format, score_state)
+
+		for scan_number in range(first_scan, max_scan):
+			print "Scan iteration ", scan_number + 1, ":"
+			scan_start = time.time()
+			if self.monitor is not None:
+				self.monitor.start_phase("learning scan %d" % (scan_number + 1), self.remaining_lines(-1, position))
+			active_filters = [(x[0], x[1], x[2]-(max_scan-scan_number)) for x in self.filters if x[2] >= max_scan-scan_number]
+			active_services = [(x[0], x[1], x[1].num_of_scans-(max_scan-filter_scans-scan_number))
+				for x in self.services.items() if x[1].num_of_scans >= max_scan-filter_scans-scan_number > 0]
+
+			# The scan is split between several processes, if what its filters learn could be merged.
+			parallel = False
+			if self.learning_processes > 1:
+				unmergeable = [x[0] for x in active_filters if x[1].statistics is None]
+				if len(active_services) > 0:
+					print "The scan is done in one process, because the services are scanned in it."
+				elif len(unmergeable) > 0:
+					print "The scan is done in one process, because these filters could not be split:", ", ".join(unmergeable)
+				elif self.use_tu_store and scan_number == 0:
+					print "The scan is done in one process, because the TU store is made in it."
+				else:
+					parallel = True
+
+			# The TUs are kept in the store in the first scan and the next scans read them from the store.
+			if self.use_tu_store and scan_number == 0:
+				from tu_store import TUStoreWriter
+				self.tu_store_writer = TUStoreWriter(self.tu_store_path)
+
+			# The scores are written in the last scan.
+			scan_score_writer = None
+			if self.have_scores and (max_scan - scan_number <= 1):
+				scan_score_writer = score_writer
+
+			# The number of records read in this scan and when the last checkpoint was saved.
+			records = 0
+			scan_position = None
+			if scan_number == first_scan and position is not None:
+				scan_position = position
+				records = position['records']
+			last_checkpoint = records
+
+			if parallel:
+				print "Number of processes:", self.learning_processes
+				records = self.run_parallel_scan(scan_number, active_filters, scan_score_writer, scan_position)
+			else:
+				for batch in self.iter_batches(self.iter_tus(position=scan_position)):
+					self.learn_records(batch, active_services, active_filters, scan_score_writer, scan_number)
+
+					# The store could not be continued, so there are no checkpoints while it is being made.
+					records += len(batch)
+					if self.checkpoint_interval > 0 and records - last_checkpoint >= self.checkpoint_interval and self.tu_store_writer is None:
+						self.save_checkpoint("learning", scan_number, self.current_position(records, batch[-1][0]), scan_score_writer)
+						last_checkpoint = records
+
+			# The size of the input is known after the first full scan.
+			self.input_size = records
+
+			if self.tu_store_writer is not None:
+				from tu_store import TUStore
+				self.tu_store_writer.close()
+				self.tu_store_writer = None
+				self.tu_store = TUStore(self.tu_store_path)
+
+			# Finishing the scan for all active services and filters. Their states are largest before finishing it.
+			for kind, active_tuples in [('service', active_services), ('filter', active_filters)]:
+				for active_tuple in active_tuples:
+					if self.profiler is not None:
+						self.profiler.add_size(kind, active_tuple[0], state_size(active_tuple[1]))
+					start = time.time()
+					active_tuple[1].do_after_a_full_scan(active_tuple[2] + 1)
+					if self.profiler is not None:
+						self.profiler.add(kind, active_tuple[0], 'do_after_a_full_scan', time.time() - start)
+
+			if self.profiler is not None:
+				self.profiler.add('section', 'learning', 'scan %d' % (scan_number + 1), time.time() - scan_start, records)
+
+			if self.checkpoint_interval > 0 and scan_number + 1 < max_scan:
+				self.save_checkpoint("learning", scan_number + 1, None)
+
+		if score_writer is not None:
+			score_writer.close()
+
+		# Finalizing all filters. The filters of a run resumed in the decision section are already finalized.
+		if checkpoint is None or checkpoint['section'] == "learning":
+			if not self.finalize_filters():
+				return
+			if self.checkpoint_interval > 0:
+				self.save_checkpoint("decision", 0, None)
+		print "-----------------------\n"
+
+		# ---------- Decision Section ----------
+		print "Decision Section :"
+		print "======================================================================"
+		decision_start = time.time()
+
+		from output_writer import OutputWriter
+		self.output_writer = OutputWriter(self.output_block_size, compression=self.output_compression,
+			compression_threads=self.output_compression_threads)
+
+		# The duplicate TUs of the decision section are decided once.
+		self.prepare_decisions()
+
+		# The position in the input where the decision section is resumed.
+		position = None
+		if checkpoint is not None and checkpoint['section'] == "decision":
+			position = checkpoint['position']
+
+		if position is not None:
+			self.reopen_output_files(checkpoint['outputs'])
+			if checkpoint.get('scheduler') is not None:
+				self.scheduler.set_state(checkpoint['scheduler'])
+		else:
+			# Making an output file for skipped TUs
+			out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
+			out_file_name = out_path + "skipped__" + self.output_name
+
+			out_file = self.open_output_file(out_file_name)
+			self.output_files['skipped'] = out_file
+
+			# Making an output file for all the decisions made
+			out_path = os.getcwd() + "/" + self.options['output folder'] + "/"
+			out_file_name = out_path + "decision_log__" + self.output_name
+
+			out_file = self.open_output_file(out_file_name)
+			self.output_files['log'] = out_file
+
+		# Exiting the decision section for the rest of the TM
+		max_lines = -1
+		if 'max decision' in self.options:
+			max_lines = self.options['max decision']
+
+		if self.monitor is not None:
+			self.monitor.start_phase("decision", self.remaining_lines(max_lines, position))
+
+		try:
+			if self.decision_processes > 1:
+				print "Number of processes:", self.decision_processes
+				self.run_parallel_decisions(max_lines, position)
+			else:
+				records = 0
+				if position is not None:
+					records = position['records']
+				last_checkpoint = records
+
+				for batch in self.iter_batches(self.iter_tus(max_lines, position)):
+					self.decide_records(batch)
+
+					records += len(batch)
+					if self.checkpoint_interval > 0 and records - last_checkpoint >= self.checkpoint_interval:
+						self.save_checkpoint("decision", 0, self.current_position(records, batch[-1][0]))
+						last_checkpoint = records
+		finally:
+			# Writing what is decided, even if the decision section is stopped by an error.
+			self.close_output_files()
+			self.output_writer.close()
+			self.output_writer = None
+
+		if self.decision_processes > 1:
+			self.print_decision_report(self.cache_counters)
+		else:
+			self.print_decision_report()
+
+		if self.profiler is not None:
+			self.profiler.add('section', 'decision', 'total', time.time() - decision_start)
+			self.write_profile()
+
+		if self.monitor is not None:
+			self.monitor.stop()
+			self.monitor = None
+
+		from checkpoint import remove_checkpoint
+		remove_checkpoint(self.checkpoint_file_name)
+
+		if self.tu_store is not None:
+			from tu_store import TUStore
+			self.tu_store = None
+			TUStore.remove(self.tu_store_path)
 
 		print "Cleaning is finished."
 		print "======================================================================"
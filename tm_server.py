@@ -0,0 +1,279 @@
+import os
+import sys
+import time
+import threading
+import SocketServer
+import BaseHTTPServer
+from Queue import Queue, Empty
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+
+class PendingRequest(object):
+	"""
+	The lines of a request waiting for their decisions.
+	"""
+
+	def __init__(self, lines):
+		"""
+		@type lines: list
+		@param lines: list of tuples of the form (line number, line) for the lines of the body which are not empty.
+		"""
+		self.lines = lines
+		self.records = None
+		self.error = None
+		self.done = threading.Event()
+
+
+class DecisionBatcher(object):
+	"""
+	Makes the TUs of the requests and their decisions on a single thread. The requests which come while the thread is
+	waiting are put together in one batch, up to 'batch size' lines, so the filters are called once for many small
+	requests. The TUs are made on the same thread, so the objects of the manager which make them (the tokenizers,
+	the aligner) are never used by two threads at once.
+	"""
+
+	def __init__(self, manager, max_wait):
+		"""
+		@type manager: TMManager
+		@param manager: The manager which is already started by start_stream().
+
+		@type max_wait: float
+		@param max_wait: The time (in seconds) to wait for more requests after the first request of a batch.
+		"""
+		self.manager = manager
+		self.max_wait = max_wait
+		self.queue = Queue()
+
+		self.thread = threading.Thread(target=self.decide_requests)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def decide(self, lines):
+		"""
+		Waits until the decisions of the given lines are made. It is called by the threads of the requests.
+
+		@type lines: list
+		@param lines: list of tuples of the form (line number, line).
+
+		@rtype: list
+		@return: returns a line of the decision log for each line, in the same order.
+		"""
+		request = PendingRequest(lines)
+		self.queue.put(request)
+		request.done.wait()
+
+		if request.error is not None:
+			raise request.error
+		return request.records
+
+	def next_requests(self):
+		requests = [self.queue.get()]
+		size = len(requests[0].lines)
+
+		# Waiting once for the other requests, since Queue.get() with a timeout polls the queue in Python 2.
+		if size < self.manager.batch_size and self.max_wait > 0:
+			time.sleep(self.max_wait)
+
+		while size < self.manager.batch_size:
+			try:
+				request = self.queue.get_nowait()
+			except Empty:
+				break
+			requests.append(request)
+			size += len(request.lines)
+
+		return requests
+
+	def parse_lines(self, lines, tus, tu_ids):
+		"""
+		Makes the TUs of the lines of a request and adds them to the TUs of the batch.
+
+		@rtype: list
+		@return: returns an entry for each line, which is either the index of its TU in the batch or the record of
+		the skipped line.
+		"""
+		manager = self.manager
+		records = []
+		for line_no, line in lines:
+			tu_id, tu, fields = manager.parse_stream_line(line_no, line)
+			if tu is None:
+				records.append(manager.format_skipped_log_record(fields))
+				continue
+			records.append(len(tus))
+			tus.append(tu)
+			tu_ids.append(tu_id)
+		return records
+
+	def decide_requests(self):
+		manager = self.manager
+		while True:
+			requests = self.next_requests()
+
+			try:
+				tus = []
+				tu_ids = []
+				records = [self.parse_lines(request.lines, tus, tu_ids) for request in requests]
+				decisions = list(manager.iter_decisions(tus))
+			except Exception, e:
+				print "There is a problem with the decisions of a batch of requests."
+				print "The Exception:"
+				print repr(e)
+				for request in requests:
+					request.error = e
+					request.done.set()
+				continue
+
+			for request, request_records in zip(requests, records):
+				for i in range(len(request_records)):
+					if isinstance(request_records[i], int):
+						tu, answers, results = decisions[request_records[i]]
+						request_records[i] = manager.format_log_record(tu_ids[request_records[i]], answers, results)
+				request.records = request_records
+				request.done.set()
+
+
+class DecisionRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	"""
+	POST /decide: the body has a TU in each line, in the formats of the pipe mode (see TMManager.parse_stream_line()).
+	The response has a line of the decision log for each line of the body, in the same order.
+	GET /health: returns 'ok' when the filters are ready.
+	The handlers only split the body into lines, and the TUs are made and decided by the DecisionBatcher.
+	"""
+
+	def do_GET(self):
+		if self.path != "/health":
+			self.send_error(404)
+			return
+		self.send_text("ok\n")
+
+	def do_POST(self):
+		if self.path != "/decide":
+			self.send_error(404)
+			return
+
+		length = int(self.headers.getheader('content-length', 0))
+		body = self.rfile.read(length)
+
+		lines = [(line_no + 1, line) for line_no, line in enumerate(body.splitlines()) if line.strip()]
+
+		records = []
+		if len(lines) > 0:
+			try:
+				records = self.server.batcher.decide(lines)
+			except Exception, e:
+				self.send_error(500, repr(e))
+				return
+
+		self.send_text("".join(records))
+
+	def send_text(self, text):
+		self.send_response(200)
+		if self.server.manager.log_format == 'jsonl':
+			self.send_header("Content-Type", "application/x-ndjson")
+		else:
+			self.send_header("Content-Type", "text/plain; charset=utf-8")
+		self.send_header("Content-Length", str(len(text)))
+		self.end_headers()
+		self.wfile.write(text)
+
+	def address_string(self):
+		# The clients of the Unix socket have no address.
+		if isinstance(self.client_address, tuple):
+			return self.client_address[0]
+		return "unix"
+
+	def log_message(self, format, *args):
+		return
+
+
+class DecisionHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+	# Many clients could connect at once, e.g. a CAT tool sending each segment in a request.
+	request_queue_size = 128
+
+
+class DecisionUnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+	daemon_threads = True
+	request_queue_size = 128
+
+	def server_bind(self):
+		if os.path.exists(self.server_address):
+			os.remove(self.server_address)
+		SocketServer.UnixStreamServer.server_bind(self)
+		# BaseHTTPRequestHandler uses these names in its responses.
+		self.server_name = "localhost"
+		self.server_port = 0
+
+
+def make_server(manager):
+	"""
+	Makes the server of a started manager. The server listens on the Unix socket of the 'server socket' option,
+	or on the 'server port' of localhost if there is no socket.
+	"""
+	if manager.server_socket:
+		server = DecisionUnixServer(manager.server_socket, DecisionRequestHandler)
+	else:
+		server = DecisionHTTPServer(("127.0.0.1", manager.server_port), DecisionRequestHandler)
+
+	server.manager = manager
+	server.batcher = DecisionBatcher(manager, manager.server_max_wait / 1000.0)
+	return server
+
+
+def serve(manager):
+	"""
+	Loads the filters once and serves the decisions until the process is stopped.
+
+	@rtype: bool
+	@return: returns False if the manager could not be started.
+	"""
+	if not manager.start_stream():
+		return False
+
+	server = make_server(manager)
+	if manager.server_socket:
+		print "Serving the decisions on the Unix socket", manager.server_socket
+	else:
+		print "Serving the decisions on http://127.0.0.1:" + str(manager.server_port) + "/decide"
+	sys.stdout.flush()
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		print "Stopping the server."
+	finally:
+		server.server_close()
+		if manager.server_socket and os.path.exists(manager.server_socket):
+			os.remove(manager.server_socket)
+	return True
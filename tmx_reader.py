@@ -0,0 +1,182 @@
+import sys
+from compression import open_input
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+try:
+	import xml.etree.cElementTree as ElementTree
+except ImportError:
+	import xml.etree.ElementTree as ElementTree
+
+# The name of the 'xml:lang' attribute after parsing. The TMX files before version 1.4 have 'lang' instead.
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+
+def local_name(tag):
+	"""
+	Returns the name of a tag without its namespace.
+	"""
+	if tag[:1] == "{":
+		return tag.split("}", 1)[1]
+	return tag
+
+
+def same_language(tmx_language, language):
+	"""
+	Checks if a language of the TMX file (e.g. 'en-US') is the given language of the config file (e.g. 'en').
+	The languages are compared without their regions, if the language of the config file has no region.
+	"""
+	tmx_language = tmx_language.lower().replace("_", "-")
+	language = language.lower().replace("_", "-")
+
+	if tmx_language == language:
+		return True
+	return "-" not in language and tmx_language.split("-")[0] == language
+
+
+def segment_text(tuv):
+	"""
+	Returns the text of the segment of a <tuv> element, with the text of its inline elements.
+	The tabs and the new lines are replaced with spaces, so the segment fits in a line of the input format.
+	"""
+	for child in tuv:
+		if local_name(child.tag) == "seg":
+			text = u"".join(child.itertext())
+			return text.replace(u"\t", u" ").replace(u"\r", u" ").replace(u"\n", u" ")
+	return None
+
+
+class TMXReader(object):
+	"""
+	Reads the translation units of a TMX file as the lines of the input format of the manager ('id<tab>source<tab>
+	target'). The file is parsed incrementally and every <tu> element is removed after it is read, so the memory does
+	not grow with the size of the file.
+	The segments are chosen by the languages of their <tuv> elements. If a language has more than one segment in a TU,
+	the first one is used. The TUs without one of the languages give lines without that field, which are invalid
+	for the manager. The TUs without 'tuid' are numbered by their position in the file.
+	"""
+
+	def __init__(self, tmx_file, source_language, target_language, skip=0):
+		"""
+		@type tmx_file: str or file
+		@param tmx_file: The name of the TMX file or an open file. The compressed files are decompressed while they
+		are read (see compression.open_input()).
+
+		@type skip: int
+		@param skip: The number of TUs to skip from the start of the file.
+		"""
+		self.tmx_file = tmx_file
+		self.source_language = source_language
+		self.target_language = target_language
+		self.skip = skip
+
+		self.lines = None
+
+	def __iter__(self):
+		"""
+		@rtype: generator
+		@return: yields the lines of the TUs, encoded in UTF-8 and ended with a new line.
+		"""
+		self.lines = self.read_lines()
+		return self.lines
+
+	def read_lines(self):
+		tmx_file = self.tmx_file
+		if isinstance(tmx_file, basestring):
+			tmx_file = open_input(tmx_file)
+
+		try:
+			# The parent of the TUs. The TUs are removed from it after they are read.
+			body = None
+			tu_number = 0
+			for event, element in ElementTree.iterparse(tmx_file, events=("start", "end")):
+				tag = local_name(element.tag)
+
+				if event == "start":
+					if tag == "body":
+						body = element
+					continue
+
+				if tag != "tu":
+					continue
+
+				tu_number += 1
+				if tu_number > self.skip:
+					yield self.format_tu(element, tu_number)
+
+				if body is not None:
+					body.clear()
+				else:
+					element.clear()
+		finally:
+			if tmx_file is not self.tmx_file:
+				tmx_file.close()
+
+	def format_tu(self, tu, tu_number):
+		tu_id = tu.get("tuid")
+		if not tu_id:
+			tu_id = str(tu_number)
+
+		source = None
+		target = None
+		for tuv in tu:
+			if local_name(tuv.tag) != "tuv":
+				continue
+
+			language = tuv.get(XML_LANG) or tuv.get("lang") or ""
+			if source is None and same_language(language, self.source_language):
+				source = segment_text(tuv)
+			elif target is None and same_language(language, self.target_language):
+				target = segment_text(tuv)
+
+		fields = [tu_id.replace("\t", " ")] + [x for x in [source, target] if x is not None]
+		fields = [x.encode("utf-8") if type(x) == unicode else x for x in fields]
+		return "\t".join(fields) + "\n"
+
+	def close(self):
+		"""
+		Stops reading. The file is closed if it is opened by the reader.
+		"""
+		if self.lines is not None:
+			self.lines.close()
+		self.lines = None
+
+
+if __name__ == "__main__":
+	# Converting a TMX file to the input format of the manager:
+	# python tmx_reader.py <file> <source language> <target language>
+	if len(sys.argv) < 4:
+		print "Usage: python tmx_reader.py <file> <source language> <target language>"
+		sys.exit(1)
+
+	for l in TMXReader(sys.argv[1], sys.argv[2], sys.argv[3]):
+		sys.stdout.write(l)
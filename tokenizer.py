@@ -0,0 +1,111 @@
+import re
+import threading
+from bounded_cache import BoundedCache
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# The tokens are the parentheses, the words, the amounts of dollars and the other sequences of non-space characters.
+# '[()]' is the same as the '\(|\)' alternatives of the first tokenizer, with one test instead of two.
+DEFAULT_PATTERN = r"[()]|\w+|\$[\d\.]+|\S+"
+
+# The patterns of the languages which are tokenized differently. The other languages use DEFAULT_PATTERN.
+LANGUAGE_PATTERNS = {}
+
+# The compiled patterns of the languages.
+_compiled_patterns = {}
+
+
+def get_pattern(language):
+	"""
+	Returns the compiled pattern of the given language. The patterns are compiled once for each language.
+	"""
+	language = language.lower()
+	if language not in _compiled_patterns:
+		_compiled_patterns[language] = re.compile(LANGUAGE_PATTERNS.get(language, DEFAULT_PATTERN))
+	return _compiled_patterns[language]
+
+
+class Tokenizer(object):
+	"""
+	Splits the phrases of a language into lowercased tokens. It is used when there is no token file.
+	The tokens of the recently seen phrases are kept in a cache, so the phrases which are repeated in the TM (headings,
+	boilerplate, UI strings) and the phrases read again in the next scans of the file are not tokenized again.
+	"""
+
+	def __init__(self, language, cache_size=100000, eviction="lru"):
+		"""
+		@type language: str
+		@param language: The code of the language of the phrases (e.g. 'en').
+
+		@type cache_size: int
+		@param cache_size: The maximum number of phrases in the cache. 0 means no cache.
+
+		@type eviction: str
+		@param eviction: The eviction policy of the cache (see bounded_cache.BoundedCache).
+		"""
+		self.language = language
+		self.pattern = get_pattern(language)
+
+		# The cache is not thread safe (a hit of the LRU cache moves its entry), so it is used under a lock when the
+		# tokenizer is shared by threads.
+		self.cache = None
+		self.lock = threading.Lock()
+		if cache_size > 0:
+			self.cache = BoundedCache(cache_size, eviction)
+
+	def tokenize(self, phrase):
+		"""
+		@type phrase: unicode
+		@param phrase: The phrase, which is lowercased before splitting it.
+
+		@rtype: tuple
+		@return: returns the tokens of the phrase. The tuples of the cache are shared, like the tokens of the TUs.
+		"""
+		if self.cache is None:
+			return tuple(self.pattern.findall(phrase.lower()))
+
+		with self.lock:
+			tokens = self.cache.get(phrase)
+		if tokens is None:
+			tokens = tuple(self.pattern.findall(phrase.lower()))
+			with self.lock:
+				self.cache.put(phrase, tokens)
+		return tokens
+
+	def counters(self):
+		"""
+		@rtype: tuple
+		@return: returns the number of the hits, the misses and the evictions of the cache (see BoundedCache.counters()).
+		"""
+		if self.cache is None:
+			return 0, 0, 0
+		return self.cache.counters()
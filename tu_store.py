@@ -0,0 +1,274 @@
+import os
+import json
+import mmap
+import shutil
+import numpy as np
+"""
+TMoP - Translation Memory Open-Source Purifier by Matteo Negri, Masoud Jalili Sabet and Marco Turchi, October 2015
+
+Based on research by Matteo Negri, Masoud Jalili Sabet and Marco Turchi.
+
+Copyright 2015 Matteo Negri, Masoud Jalili Sabet and Marco Turchi.  <negri@fbk.eu>, <jalili.masoud@gmail.com> and <turchi@fbk.eu>. All rights reserved.
+
+Redistribution and use in source and binary forms, with or without modification, are
+permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice, this list of
+      conditions and the following disclaimer.
+
+   2. Redistributions in binary form must reproduce the above copyright notice, this list
+      of conditions and the following disclaimer in the documentation and/or other materials
+      provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDER ``AS IS'' AND ANY EXPRESS OR IMPLIED
+WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The views and conclusions contained in the software and documentation are those of the
+authors and should not be interpreted as representing official policies, either expressed
+or implied, of the copyright holder.
+"""
+
+# For every line of the input there is one record in the index.
+# The offsets are the end offsets of the record in the other columns, the start offsets are the end offsets of the
+# previous record.
+INDEX_DTYPE = np.dtype([
+	('line_no', np.int64),
+	('status', np.int64),
+	('line_end', np.int64),
+	('src_tokens_end', np.int64),
+	('trg_tokens_end', np.int64),
+	('alignment_end', np.int64)])
+
+# The status of the records.
+STATUS_OK = 0
+STATUS_INVALID = 1
+STATUS_CORRUPTED = 2
+
+# Number of records written or read at once.
+BLOCK_SIZE = 10000
+
+
+class TUStoreWriter(object):
+	"""
+	Writes the parsed translation units in a columnar store.
+	The store is a folder with these files:
+		index:		the records of INDEX_DTYPE.
+		lines:		the lines of the input file, as they are written in the output files.
+		tokens:		the source and the target tokens of each TU, separated by spaces.
+		alignment:	the alignment pairs of all TUs as int32 numbers.
+		info:		the information about the store and the messages of the corrupted TUs.
+	"""
+
+	def __init__(self, path):
+		if os.path.isdir(path):
+			shutil.rmtree(path)
+		os.makedirs(path)
+		self.path = path
+
+		self.index_file = open(os.path.join(path, "index"), "wb")
+		self.lines_file = open(os.path.join(path, "lines"), "wb")
+		self.tokens_file = open(os.path.join(path, "tokens"), "wb")
+		self.alignment_file = open(os.path.join(path, "alignment"), "wb")
+
+		self.records = []
+		self.alignments = []
+
+		self.line_end = 0
+		self.tokens_end = 0
+		self.alignment_end = 0
+
+		# The tokens are decoded when they are read from the store, if they were unicode objects.
+		self.unicode_tokens = False
+		# The error messages of the corrupted TUs. The keys are the record numbers.
+		self.errors = {}
+		self.size = 0
+
+	def add(self, line_no, line, tu, error):
+		"""
+		Adds a record to the store.
+
+		@type line: list
+		@param line: The fields of the line. For the valid TUs, the phrases are already stripped.
+
+		@type tu: TU
+		@param tu: The translation unit made from the line. It is None for the invalid or corrupted lines.
+
+		@type error: str
+		@param error: The error message for the corrupted lines.
+		"""
+		line = "\t".join(line)
+		self.lines_file.write(line)
+		self.line_end += len(line)
+
+		if tu is not None:
+			status = STATUS_OK
+
+			src_tokens = " ".join(tu.src_tokens)
+			trg_tokens = " ".join(tu.trg_tokens)
+			if type(src_tokens) == unicode or type(trg_tokens) == unicode:
+				self.unicode_tokens = True
+				src_tokens = src_tokens.encode("utf-8")
+				trg_tokens = trg_tokens.encode("utf-8")
+
+			self.tokens_file.write(src_tokens)
+			self.tokens_end += len(src_tokens)
+			src_tokens_end = self.tokens_end
+
+			self.tokens_file.write(trg_tokens)
+			self.tokens_end += len(trg_tokens)
+
+			self.alignments.extend(tu.alignment)
+			self.alignment_end += len(tu.alignment)
+		else:
+			src_tokens_end = self.tokens_end
+			if error is not None:
+				status = STATUS_CORRUPTED
+				self.errors[self.size] = error
+			else:
+				status = STATUS_INVALID
+
+		self.records.append((line_no, status, self.line_end, src_tokens_end, self.tokens_end, self.alignment_end))
+		self.size += 1
+
+		if len(self.records) >= BLOCK_SIZE:
+			self.flush()
+
+	def flush(self):
+		np.array(self.records, dtype=INDEX_DTYPE).tofile(self.index_file)
+		self.records = []
+
+		if len(self.alignments) > 0:
+			np.array(self.alignments, dtype=np.int32).tofile(self.alignment_file)
+		self.alignments = []
+
+	def close(self):
+		self.flush()
+
+		self.index_file.close()
+		self.lines_file.close()
+		self.tokens_file.close()
+		self.alignment_file.close()
+
+		info = {"size": self.size, "unicode tokens": self.unicode_tokens, "errors": self.errors}
+		f = open(os.path.join(self.path, "info"), "w")
+		json.dump(info, f)
+		f.close()
+
+
+class TUStore(object):
+	"""
+	Reads the translation units from a store made by TUStoreWriter.
+	The files are memory-mapped, so the store could be shared between the processes of the decision section.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+
+		f = open(os.path.join(path, "info"))
+		info = json.load(f)
+		f.close()
+
+		self.size = info["size"]
+		self.unicode_tokens = info["unicode tokens"]
+		self.errors = dict((int(k), v) for k, v in info["errors"].iteritems())
+
+		self.index = self.map_array("index", INDEX_DTYPE)
+		self.alignment = self.map_array("alignment", np.int32).reshape(-1, 2)
+		self.lines = self.map_bytes("lines")
+		self.tokens = self.map_bytes("tokens")
+
+	def map_array(self, name, dtype):
+		file_name = os.path.join(self.path, name)
+		if os.path.getsize(file_name) == 0:
+			return np.zeros(0, dtype=dtype)
+		return np.memmap(file_name, dtype=dtype, mode="r")
+
+	def map_bytes(self, name):
+		f = open(os.path.join(self.path, name), "rb")
+		try:
+			if os.fstat(f.fileno()).st_size == 0:
+				return ""
+			return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			f.close()
+
+	def __len__(self):
+		return self.size
+
+	def count_lines(self, max_lines):
+		"""
+		Returns the number of records for the first 'max_lines' lines. Negative values mean the whole store.
+		"""
+		if max_lines < 0:
+			return self.size
+		return int(np.searchsorted(self.index['line_no'], max_lines, side='right'))
+
+	def iter_records(self, start=0, end=None):
+		"""
+		Yields the records in the given range in the same form as they were added to the store.
+
+		@rtype: generator
+		@return: yields tuples of the form (line_no, line, tu, error).
+		"""
+		from abstract_filter import TU
+
+		if end is None:
+			end = self.size
+
+		for block_start in xrange(start, end, BLOCK_SIZE):
+			block_end = min(block_start + BLOCK_SIZE, end)
+
+			records = self.index[block_start:block_end].tolist()
+			if block_start > 0:
+				previous = self.index[block_start - 1].tolist()
+			else:
+				previous = (0, 0, 0, 0, 0, 0)
+
+			alignment_start = previous[5]
+			alignment = self.alignment[alignment_start:records[-1][5]].tolist()
+
+			line_start = previous[2]
+			tokens_start = previous[4]
+			record_no = block_start
+			for line_no, status, line_end, src_tokens_end, trg_tokens_end, alignment_end in records:
+				line = self.lines[line_start:line_end].split("\t")
+
+				tu = None
+				error = None
+				if status == STATUS_OK:
+					tu = TU(
+						line[1].decode("utf-8"),
+						line[2].decode("utf-8"),
+						self.split_tokens(tokens_start, src_tokens_end),
+						self.split_tokens(src_tokens_end, trg_tokens_end),
+						[tuple(x) for x in alignment[alignment_start - previous[5]:alignment_end - previous[5]]])
+				elif status == STATUS_CORRUPTED:
+					error = self.errors[record_no]
+
+				yield line_no, line, tu, error
+
+				line_start = line_end
+				tokens_start = trg_tokens_end
+				alignment_start = alignment_end
+				record_no += 1
+
+	def split_tokens(self, start, end):
+		if start == end:
+			return ()
+
+		tokens = self.tokens[start:end]
+		if self.unicode_tokens:
+			tokens = tokens.decode("utf-8")
+		return tokens.split(" ")
+
+	@staticmethod
+	def remove(path):
+		if os.path.isdir(path):
+			shutil.rmtree(path)
@@ -0,0 +1,123 @@
+# Input:   A TM file like the input of the TMOP (ID, source phrase and target phrase separated by tabs).
+# Output:  The throughput of the first regex tokenizer of the TMOP and of tokenizer.Tokenizer with and without its cache.
+#
+# python tokenizer_benchmark.py [TM file] [number of scans]
+# The phrases are tokenized once in each scan, as they are tokenized in the scans of the TMOP when there is no token
+# file. The tokens of all tokenizers are compared, so the benchmark also checks that they are the same.
+# At the end, the phrases are tokenized by many threads sharing a tokenizer with a small cache, as in the server,
+# and the tokens of each thread are compared too.
+
+import gc
+import os
+import re
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tokenizer import Tokenizer
+from bounded_cache import format_cache_report
+
+# Input
+tm_file_name = '../data/sample_en_it.csv'
+# Number of times the phrases are tokenized
+num_of_scans = 4
+# The size of the cache of the tokenizer (see the 'tokenizer cache size' option)
+cache_size = 100000
+# The number of threads sharing a tokenizer and the size of its cache, which is small so the entries are evicted
+# while the other threads use them
+num_of_threads = 16
+shared_cache_size = 100
+
+if len(sys.argv) > 1:
+	tm_file_name = sys.argv[1]
+if len(sys.argv) > 2:
+	num_of_scans = int(sys.argv[2])
+
+phrases = []
+tmf = open(tm_file_name)
+for line in tmf:
+	line = line.split("\t")
+	if len(line) != 3:
+		continue
+	try:
+		phrases.append((line[1].strip().decode("utf-8"), line[2].strip().decode("utf-8")))
+	except UnicodeDecodeError:
+		continue
+tmf.close()
+
+print "TUs:", len(phrases), "- scans:", num_of_scans
+print "Distinct phrases:", len(set(x[0] for x in phrases)) + len(set(x[1] for x in phrases))
+print
+
+#------------------------------------------------------------------
+
+regex = re.compile(r"\(|\)|\w+|\$[\d\.]+|\S+")
+
+
+def regex_tokenize(phrase):
+	return regex.findall(phrase.lower())
+
+src_tokenizer = Tokenizer('en', cache_size=0)
+trg_tokenizer = Tokenizer('it', cache_size=0)
+src_cached_tokenizer = Tokenizer('en', cache_size=cache_size)
+trg_cached_tokenizer = Tokenizer('it', cache_size=cache_size)
+
+tokenizers = [
+	("First regex", regex_tokenize, regex_tokenize),
+	("Tokenizer without cache", src_tokenizer.tokenize, trg_tokenizer.tokenize),
+	("Tokenizer with cache", src_cached_tokenizer.tokenize, trg_cached_tokenizer.tokenize)]
+
+results = []
+for name, tokenize_src, tokenize_trg in tokenizers:
+	# The garbage collector is disabled while measuring, like in timeit, so the tokens kept from the previous
+	# tokenizers don't make the next ones slower.
+	tokens = []
+	gc.collect()
+	gc.disable()
+	start = time.time()
+	for scan in range(num_of_scans):
+		tokens = [(tokenize_src(src), tokenize_trg(trg)) for src, trg in phrases]
+	elapsed = max(time.time() - start, 1e-9)
+	gc.enable()
+
+	results.append([(tuple(x), tuple(y)) for x, y in tokens])
+	print "%-30s%10.3f s%15.0f phrases/s" % (name, elapsed, 2 * len(phrases) * num_of_scans / elapsed)
+
+print
+for i in range(1, len(results)):
+	if results[i] != results[0]:
+		print "The tokens of '" + tokenizers[i][0] + "' are not the same as the tokens of the first regex!"
+		sys.exit(1)
+print "The tokens of all tokenizers are the same."
+
+counters = [x + y for x, y in zip(src_cached_tokenizer.counters(), trg_cached_tokenizer.counters())]
+print "Tokenizer cache:", format_cache_report(*counters)
+
+#------------------------------------------------------------------
+
+shared_tokenizer = Tokenizer('en', cache_size=shared_cache_size)
+expected = [tuple(x) for x, y in results[0]]
+errors = []
+
+
+def tokenize_in_thread():
+	try:
+		for scan in range(num_of_scans):
+			if [shared_tokenizer.tokenize(src) for src, trg in phrases] != expected:
+				errors.append("different tokens")
+				return
+	except Exception, e:
+		errors.append(repr(e))
+
+threads = [threading.Thread(target=tokenize_in_thread) for i in range(num_of_threads)]
+for thread in threads:
+	thread.start()
+for thread in threads:
+	thread.join()
+
+print
+if len(errors) > 0:
+	print "The tokenizer shared by", num_of_threads, "threads failed in", len(errors), "threads:", errors[0]
+	sys.exit(1)
+print "The tokens of the tokenizer shared by", num_of_threads, "threads are the same."